@@ -1,6 +1,10 @@
 import os
 from os.path import isdir
 from Compsta import Compsta
+from utils.shard import Shard
+from utils.telemetry import Telemetry
+from utils.preprocess import Preprocessor
+from objects.summary import MetricSummary
 from rich.console import Console
 from rich.style import Style
 import csv
@@ -8,23 +12,60 @@ import csv
 class Comclass:
     def __init__(self):
         self.all_mean_metrics = []
+        self.all_summaries = []
         self.dir_names = []
 
-    def parse_folder(self, dir_name: str, csv_name: str):
-        """Analisa todas as subpastas e coleta métricas"""
-        for file in os.listdir(dir_name):
+    def parse_folder(self, dir_name: str, csv_name: str, shard: Shard | None = None,
+                     files_dir: str | None = None, telemetry: Telemetry | None = None,
+                     preprocessor: Preprocessor | None = None):
+        """Analisa todas as subpastas e coleta métricas
+
+        Args:
+            dir_name: Pasta com uma subpasta por exercício.
+            csv_name: Caminho do CSV consolidado.
+            shard: `Shard` opcional; só os arquivos dele são analisados.
+            files_dir: Pasta opcional onde os CSVs por arquivo de cada subpasta
+                são exportados. Em execuções com `shard` o padrão é o caminho
+                de `csv_name` sem extensão, para que `Compsta.merge_shards`
+                possa juntar os shards depois.
+            telemetry: `Telemetry` opcional, com o progresso de todas as pastas.
+            preprocessor: `Preprocessor` opcional; os `.c` são pré-processados
+                em memória, sem arquivos `.i`.
+        """
+        if shard is not None and files_dir is None:
+            files_dir = os.path.splitext(csv_name)[0]
+
+        if shard is not None:
+            shard.write_manifest(files_dir)
+
+        folders = [file for file in sorted(os.listdir(dir_name))
+                   if os.path.isdir(os.path.join(dir_name, file))]
+
+        if telemetry is not None:
+            for file in folders:
+                telemetry.expect(Compsta.count_files(os.path.join(dir_name, file), shard,
+                                                     recursive=False,
+                                                     extension=".c" if preprocessor else ".i"))
+
+        for file in folders:
             file_path = os.path.join(dir_name, file)
             if os.path.isdir(file_path):
                 file_path = f"{file_path}/"
-                compsta = Compsta(file_path)
+                compsta = Compsta(file_path, shard=shard, telemetry=telemetry,
+                                  preprocessor=preprocessor)
+
+                if files_dir is not None:
+                    compsta.export_csv(os.path.join(files_dir, file, ""), file)
                 
                 # Adiciona métricas médias à lista
                 self.all_mean_metrics.append(compsta.mean_metrics)
+                self.all_summaries.append(compsta.summaries)
                 self.dir_names.append(file.capitalize())
                 
                 Console().print(f"Processed {file.capitalize()}", style="bold green")
 
         self.export_consolidated_metrics(dir_name, csv_name)
+        self.export_summary_csv(csv_name)
 
     def export_consolidated_metrics(self, base_dir: str, csv_name: str):
         """Exporta todas as médias para um único CSV"""
@@ -38,7 +79,8 @@ class Comclass:
             row = [ name[:2], name] + list(metrics.values())
             data.append(row)
 
-        os.makedirs(csv_name, exist_ok=True)
+        if os.path.dirname(csv_name):
+            os.makedirs(os.path.dirname(csv_name), exist_ok=True)
 
         with open(csv_name, mode="w", newline="", encoding="utf-8") as file:
             writer = csv.writer(file)
@@ -46,3 +88,95 @@ class Comclass:
 
         Console().print(f"\nCREATE {csv_name}.csv", style="bold green")
 
+    #==> Resumos <==###########################################################
+
+    SUMMARY_HEADER = ["Folder", "Metric", "Count", "Mean", "Std", "Min",
+                      "P50", "P90", "P99", "Max"]
+
+    @staticmethod
+    def merge_summaries(summaries) -> dict[str, MetricSummary]:
+        """Mescla resumos de várias pastas, sem reler os arquivos"""
+        merged: dict[str, MetricSummary] = dict()
+
+        for folder_summaries in summaries:
+            for attr, summary in folder_summaries.items():
+                merged.setdefault(attr, MetricSummary()).merge(summary)
+
+        return merged
+
+    @staticmethod
+    def get_summary_rows(folder: str, summaries: dict[str, MetricSummary]):
+        """Linhas do CSV de resumo de uma pasta, uma por métrica"""
+        return [[folder, attr, summary.count, summary.total / summary.count,
+                 summary.std, summary.minimum, summary.quantile(0.5),
+                 summary.quantile(0.9), summary.quantile(0.99), summary.maximum]
+                for attr, summary in summaries.items() if summary.count > 0]
+
+    def export_summary_csv(self, csv_name: str):
+        """Exporta a dispersão de cada métrica por pasta e do total
+
+        O total é a mescla dos resumos das pastas, sem reler os arquivos.
+        """
+        if not self.all_summaries:
+            return
+
+        data = [self.SUMMARY_HEADER]
+        for name, summaries in zip(self.dir_names, self.all_summaries):
+            data += self.get_summary_rows(name, summaries)
+
+        data += self.get_summary_rows("All", self.merge_summaries(self.all_summaries))
+
+        self.write_csv(f"{os.path.splitext(csv_name)[0]}_summary.csv", data)
+
+    @staticmethod
+    def merge_tree(base_output_dir: str) -> dict[str, dict[str, MetricSummary]]:
+        """Mescla os resumos de uma saída de `Compsta.process_directory`
+
+        Cada pasta recebe a mescla do seu `*_summary.json` e das suas
+        subpastas. As pastas são visitadas da mais funda para a raiz, e cada
+        uma é mesclada uma única vez na pasta pai: O(pastas), não O(arquivos).
+
+        Returns:
+            Resumos por caminho relativo a `base_output_dir` ("." é a raiz).
+        """
+        tree: dict[str, dict[str, MetricSummary]] = {".": dict()}
+
+        for root, dirs, files in os.walk(base_output_dir):
+            relative_path = os.path.relpath(root, base_output_dir)
+            summaries = tree.setdefault(relative_path, dict())
+
+            for file in sorted(files):
+                if file.endswith("_summary.json"):
+                    own = Compsta.read_summary_json(os.path.join(root, file))
+                    for attr, summary in own.items():
+                        summaries.setdefault(attr, MetricSummary()).merge(summary)
+
+        for relative_path in sorted(tree, key=lambda path: path.count(os.sep), reverse=True):
+            if relative_path == ".":
+                continue
+
+            parent = os.path.dirname(relative_path) or "."
+            for attr, summary in tree[relative_path].items():
+                tree.setdefault(parent, dict()).setdefault(attr, MetricSummary()).merge(summary)
+
+        return tree
+
+    def export_tree_summary(self, base_output_dir: str, csv_name: str):
+        """Exporta os resumos mesclados de todas as pastas de uma saída"""
+        tree = self.merge_tree(base_output_dir)
+
+        data = [self.SUMMARY_HEADER]
+        for relative_path in sorted(tree):
+            data += self.get_summary_rows(relative_path, tree[relative_path])
+
+        self.write_csv(csv_name, data)
+
+    @staticmethod
+    def write_csv(csv_name: str, data):
+        if os.path.dirname(csv_name):
+            os.makedirs(os.path.dirname(csv_name), exist_ok=True)
+
+        with open(csv_name, mode="w", newline="", encoding="utf-8") as file:
+            csv.writer(file).writerows(data)
+
+        Console().print(f"CREATE {csv_name}", style="bold green")
@@ -1,9 +1,20 @@
 from ast import parse
 from sys import exception
-from typing import final, Any
+from typing import final, Any, TextIO
 from Comvis import ParsedCode
+from utils.batch import BatchRunner, analyze_file
+from utils.shard import Shard
+from utils.telemetry import Telemetry
+from utils.preprocess import Preprocessor
+from objects.summary import MetricSummary
+from objects.function_cache import FunctionCache
+from utils.ast_cache import ASTCache
+from objects.plugins import MetricPlugin, get_plugin_spec, load_plugin
+from objects.line_profile import LineVolumeReport, export_line_profiles, read_line_profiles
+from types import SimpleNamespace
 from pathlib import Path
 import os
+import sys
 from os import listdir, makedirs
 from rich.console import Console
 from rich.columns import Columns
@@ -11,6 +22,12 @@ from rich.table import Table
 from rich import box
 from rich.style import Style
 import csv
+import json
+import time
+import multiprocessing
+from multiprocessing.pool import AsyncResult
+from queue import Empty
+from functools import partial
 
 class Compsta:
     """A comprehensive class for batch analysis and export of code metrics from multiple files.
@@ -22,10 +39,26 @@ class Compsta:
     Attributes:
         dir_name: Directory containing preprocessed `.i` files.
         ATTRIBUTES: List of metric attribute names to calculate means for.
-        parsed_files: List of ParsedCode objects for each processed file.
+        parsed_files: List of ParsedCode objects for each processed file, with
+            their metrics only (see `ParsedCode.release`).
         number_of_files: Count of successfully parsed files.
         metrics: Human-readable names for CSV export columns.
         mean_metrics: Dictionary containing mean values of all metrics.
+        summaries: Mergeable `MetricSummary` of every metric in `ATTRIBUTES`.
+        consumers: Objects notified with every successfully parsed file
+            through their `add_file(parsed_code)` method (e.g. `SymbolIndex`).
+        runner: Optional `BatchRunner` analyzing the files in worker
+            processes. Files are analyzed in this process when it is None.
+        shard: Optional `Shard`; only the files of that shard are analyzed.
+        telemetry: Optional `Telemetry` notified of every analyzed file.
+        preprocessor: Optional `Preprocessor`. The `.c` files are then
+            preprocessed in memory and no `.i` file is needed.
+        function_cache: Optional `FunctionCache` shared by the files analyzed
+            in this process.
+        ast_cache: Optional `ASTCache` of the files analyzed in this process.
+        plugins: `MetricPlugin` classes run on every file.
+        columns: `COLUMNS` followed by the columns of the plugins.
+        attributes: `ATTRIBUTES` followed by the attributes of the plugins.
     """
     
     ATTRIBUTES: list[str] = [
@@ -48,49 +81,123 @@ class Compsta:
         "delivered_bugs",
         "avg_line_volume",
         "total_func_calls", 
+        "total_cognitive_complexity",
         ]
 
-    def __init__(self, dir_name: str):
+    ###########################################################################
+    # |> constant: COLUMNS
+    #
+    # Columns of the per-file CSV after "Index" and "Filename".
+    #
+    # Items: Tuple (CSV header, ParsedCode attribute).
+    ###########################################################################
+    COLUMNS: list[tuple[str, str]] = [
+        ("Effective Lines",                   "effective_lines"),
+        ("Number of distinct operators (n1)", "n1"),
+        ("Number of distinct operands (n2)",  "n2"),
+        ("Total number of operators (N1)",    "N1"),
+        ("Total number of operands (N2)",     "N2"),
+        ("Vocabulary",                        "vocabulary"),
+        ("Length",                            "length"),
+        ("Estimated length",                  "estimated_len"),
+        ("Volume",                            "volume"),
+        ("Difficulty",                        "difficulty"),
+        ("Estimated level",                   "estimated_level"),
+        ("Intelligence",                      "intelligence"),
+        ("Effort",                            "effort"),
+        ("Time Required",                     "time_required"),
+        ("Delivered bugs",                    "delivered_bugs"),
+        ("Total McCabe",                      "total_mcc"),
+        ("Average line volume",               "avg_line_volume"),
+        ("Functions Call",                    "total_func_calls"),
+        ("Number of Functions",               "number_of_functions"),
+        ("Total Cognitive Complexity",        "total_cognitive_complexity"),
+        ("Peak RSS (MB)",                     "peak_rss_mb"),
+        ("Max Fan-in",                        "max_fan_in"),
+        ("Max Fan-out",                       "max_fan_out"),
+        ("Max Call Depth",                    "max_call_depth"),
+        ("Recursive Functions",               "recursive_functions"),
+        ("Call Cycles",                       "call_cycles"),
+        ("Line Volume p50",                   "line_volume_p50"),
+        ("Line Volume p90",                   "line_volume_p90"),
+        ("Max Line Volume",                   "max_line_volume"),
+        ("Densest Line",                      "densest_line"),
+    ]
+
+    def __init__(self, dir_name: str, consumers: list[Any] | None = None,
+                 runner: BatchRunner | None = None, shard: Shard | None = None,
+                 parsed_files: list[Any] | None = None,
+                 telemetry: Telemetry | None = None,
+                 preprocessor: Preprocessor | None = None,
+                 function_cache: FunctionCache | None = None,
+                 ast_cache: ASTCache | None = None,
+                 plugins: list[type[MetricPlugin]] | None = None,
+                 sequences: bool = False):
         """Initialize Compsta with a directory path and load preprocessed files.
         
         Args:
             dir_name: Directory path containing preprocessed `.i` files.
+            consumers: Objects with an `add_file(parsed_code)` method, called
+                as soon as each file is parsed.
+            runner: Optional `BatchRunner` analyzing the files in worker
+                processes.
+            shard: Optional `Shard`; files of other shards are skipped.
+            parsed_files: Already computed files (e.g. rows read back with
+                `read_csv`). When given, the directory is not scanned.
+            telemetry: Optional `Telemetry` of the run. The caller sets the
+                expected number of files (see `count_files`).
+            preprocessor: Optional `Preprocessor` of the `.c` files. With a
+                `runner`, the runner's own preprocessor is used.
+            function_cache: Optional `FunctionCache`. With a `runner`, the
+                runner's own cache is used.
+            ast_cache: Optional `ASTCache`. With a `runner`, the runner's own
+                cache is used.
+            plugins: Optional `MetricPlugin` classes, run in the traversal of
+                every file. Their metrics are added to the CSV, mean and
+                summary exports. With a `runner`, the runner's own plugins
+                are used.
+            sequences: Record the token sequences of the functions, for
+                consumers such as `DuplicateDetector`. With a `runner`, the
+                runner's own setting is used.
         """
-        self.dir_name: str = dir_name
+        self.dir_name : str                = dir_name
+        self.consumers: list[Any]          = consumers if consumers is not None else []
+        self.runner   : BatchRunner | None = runner
+        self.shard    : Shard | None       = shard
+        self.telemetry: Telemetry | None   = telemetry
+
+        self.preprocessor  : Preprocessor | None  = preprocessor
+        self.function_cache: FunctionCache | None = function_cache
+        self.ast_cache     : ASTCache | None      = ast_cache
+
+        if runner is not None:
+            plugins   = runner.plugins
+            sequences = runner.sequences
+
+        self.sequences : bool                     = sequences
+        self.plugins   : list[type[MetricPlugin]] = plugins or []
+        self.columns   : list[tuple[str, str]]    = self.COLUMNS + [column for plugin in self.plugins
+                                                                    for column in plugin.COLUMNS]
+        self.attributes: list[str]                = self.ATTRIBUTES + [attr for plugin in self.plugins
+                                                                       for _, attr in plugin.COLUMNS]
 
         # ==> Files <======================================================== #
         self.parsed_files: list[ParsedCode] = list()
         self.number_of_files: int = 0
 
         #==> Metrics <==#
-        self.metrics: list[str] = [
-            "Index",
-            "Filename",
-            "Effective Lines",
-            "Number of distinct operators (n1)",
-            "Number of distinct operands (n2)",
-            "Total number of operators (N1)",
-            "Total number of operands (N2)",
-            "Vocabulary",
-            "Length",
-            "Estimated length",
-            "Volume",
-            "Difficulty",
-            "Estimated level",
-            "Intelligence",
-            "Effort",
-            "Time Required",
-            "Delivered bugs",
-            "Total McCabe",
-            "Average line volume",
-            "Functions Call",
-            "Number of Functions",
-        ]
+        self.metrics: list[str] = ["Index", "Filename"] + [header for header, _ in self.columns]
 
-        self.mean_metrics: dict[str, Any] = dict()
+        self.mean_metrics: dict[str, Any]           = dict()
+        self.summaries   : dict[str, MetricSummary] = dict()
 
         #==> Run <==#
-        self.parse_files()
+        if parsed_files is None:
+            self.parse_files()
+        else:
+            self.parsed_files    = parsed_files
+            self.number_of_files = len(parsed_files)
+
         self.parse_mean()
 
     #==> Methods <==###########################################################
@@ -122,9 +229,11 @@ class Compsta:
             - Halstead metrics (n1, n2, N1, N2, vocabulary, length, estimated_len, etc.)
             - avg_line_volume
             - total_func_calls
+            - total_cognitive_complexity
 
         Side Effects:
             - Modifies `self.mean_metrics` in-place.
+            - Fills `self.summaries` with the spread of every metric.
         """
         #######################################################################
         # This implementation is slower than the previous version because for 
@@ -132,7 +241,7 @@ class Compsta:
         # For readability and scalability reasons, I'll keep this version.
         #######################################################################
         if self.number_of_files > 0:
-            for attr in self.ATTRIBUTES:
+            for attr in self.attributes:
                 ###############################################################
                 # variable: total
                 #
@@ -144,33 +253,203 @@ class Compsta:
 
                 self.mean_metrics[f"mean_{attr}"] = total / self.number_of_files
 
+                self.summaries[attr] = MetricSummary(getattr(parsed_file, attr)
+                                                     for parsed_file in self.parsed_files)
+
     def get_precompiled_files(self) -> list[ParsedCode]:
         """Scan the directory for `.i` files and parse them into `ParsedCode` objects.
 
         Returns:
             List of parsed files with extracted metrics.
         """
+        filenames: list[str] = self.list_files()
+
+        if self.runner is not None:
+            on_result = self.telemetry.file_done if self.telemetry is not None else None
+            results   = self.runner.run([(filename, self.dir_name) for filename in filenames],
+                                        on_result)
+        else:
+            results = (self.analyze_file(filename) for filename in filenames)
+
         parsed_files: list[ParsedCode] = []
-        for filename in listdir(self.dir_name):
-            if filename.endswith(".i"):
-                filename = filename[:-2]  # Remove `.i` extension
-                try:
-                    parsed_code = ParsedCode(filename, self.dir_name)
+        for filename, (parsed_code, error) in zip(filenames, results):
+            if error is not None:
+                Console().print(f"ERROR PROCESSING '{filename}': {error}",
+                                style="bold yellow")
+
+            elif not parsed_code.has_errors:
+                parsed_files.append(parsed_code)
+
+                for consumer in self.consumers:
+                    consumer.add_file(parsed_code)
+
+                parsed_code.release()
 
-                    if not parsed_code.has_errors:
-                        parsed_files.append(parsed_code)
-                
-                except Exception as e:
-                    Console().print(f"ERROR PROCESSING '{filename}': {str(e)}",
-                                    style="bold yellow")
         return parsed_files
 
-    def print_files_metrics(self) -> None:
-        """Display a formatted table of code metrics using Rich.
+    def notify_directory(self) -> None:
+        """Passes the finished directory to the consumers that store whole
+        directories (those with an `add_directory(compsta)` method, e.g.
+        `ResultStore`)."""
+        for consumer in self.consumers:
+            if hasattr(consumer, "add_directory"):
+                consumer.add_directory(self)
+
+    def analyze_file(self, filename: str) -> tuple[ParsedCode | None, str | None]:
+        """Analyzes a file in this process, reporting it to the telemetry."""
+        started: float = time.monotonic()
+        result         = analyze_file(filename, self.dir_name, preprocessor=self.preprocessor,
+                                      function_cache=self.function_cache,
+                                      ast_cache=self.ast_cache,
+                                      plugins=self.plugins,
+                                      sequences=self.sequences)
+
+        if self.telemetry is not None:
+            self.telemetry.file_done(*result, time.monotonic() - started)
+
+        return result
+
+    def list_files(self) -> list[str]:
+        """Lists the files of the directory in this shard, without extension.
+
+        These are the `.i` files, or the `.c` files with a preprocessor. The
+        shard of a file is always decided by its `.i` path, so both modes
+        split a corpus the same way.
+        """
+        preprocess: bool = (self.preprocessor is not None or
+                            (self.runner is not None and self.runner.preprocessor is not None))
+        extension : str  = ".c" if preprocess else ".i"
+
+        #######################################################################
+        # Files are sorted so that the CSV rows, and the order in which the
+        # means are summed, do not depend on the file system.
+        #######################################################################
+        filenames: list[str] = sorted(filename[:-2]  # Remove extension
+                                      for filename in listdir(self.dir_name)
+                                      if filename.endswith(extension))
+
+        if self.shard is not None:
+            filenames = [filename for filename in filenames
+                         if self.shard.contains(os.path.join(self.dir_name, f"{filename}.i"))]
+
+        return filenames
+
+    @staticmethod
+    def count_files(dir_name: str, shard: Shard | None = None, recursive: bool = True,
+                    extension: str = ".i") -> int:
+        """Counts the files that a run over `dir_name` will analyze.
+
+        Used to give the `Telemetry` an ETA before the first file is parsed.
+        """
+        total: int = 0
+
+        for root, dirs, files in os.walk(dir_name):
+            for filename in files:
+                if not filename.endswith(extension):
+                    continue
+
+                path: str = os.path.join(root, f"{filename[:-2]}.i")
+                if shard is None or shard.contains(path):
+                    total += 1
+
+            if not recursive:
+                break
+
+        return total
+
+    ###########################################################################
+    # |> constant: PRINT_COLUMNS
+    #
+    # Columns of the per-file table, abbreviated for readability.
+    #
+    # Items: Tuple (header, ParsedCode attribute, rounded to 2 digits).
+    ###########################################################################
+    PRINT_COLUMNS: list[tuple[str, str, bool]] = [
+        ("EL",  "effective_lines",            False),  # Effective Lines
+        ("n1",  "n1",                         False),  # Distinct operators
+        ("n2",  "n2",                         False),  # Distinct operands
+        ("N1",  "N1",                         False),  # Total operators
+        ("N2",  "N2",                         False),  # Total operands
+        ("n",   "vocabulary",                 True),   # Vocabulary
+        ("N",   "length",                     True),   # Length
+        ("^N",  "estimated_len",              True),   # Estimated Length
+        ("V",   "volume",                     True),   # Program Volume
+        ("D",   "difficulty",                 True),   # Difficulty
+        ("L*",  "estimated_level",            True),   # Estimated level
+        ("I",   "intelligence",               True),   # Intelligence
+        ("E",   "effort",                     True),   # Effort
+        ("T",   "time_required",              True),   # Time Required
+        ("B",   "delivered_bugs",             True),   # Delivered Bugs
+        ("CC",  "total_mcc",                  False),  # McCabe Complexity
+        ("LC",  "avg_line_volume",            True),   # Avg Line Volume
+        ("FC",  "total_func_calls",           False),  # Number of funtions calls
+        ("CoC", "total_cognitive_complexity", False),  # Cognitive Complexity
+    ]
+
+    ###########################################################################
+    # |> constant: PRINT_FORMATS
+    #
+    # rich : Rich table (one table per page when `page_size` is given).
+    # plain: Fixed-width text, with the widths measured once per page.
+    # tsv  : Tab-separated rows streamed as they are formatted.
+    # quiet: Nothing is printed per file.
+    ###########################################################################
+    PRINT_FORMATS: tuple[str, ...] = ("rich", "plain", "tsv", "quiet")
+
+    def get_print_row(self, file: Any) -> list[str]:
+        """Formats the cells of a file in the per-file table."""
+        nDigits: int = 2
+
+        return [file.filename] + [str(round(getattr(file, attr), nDigits) if rounded
+                                      else getattr(file, attr))
+                                  for _, attr, rounded in self.PRINT_COLUMNS]
+
+    def print_files_metrics(self, format: str = "rich", page_size: int | None = None,
+                            output: TextIO | None = None, header: bool = True) -> None:
+        """Display a formatted table of code metrics.
         
         Shows a comprehensive table with all metrics for each parsed file
-        using abbreviated column headers for better readability.
+        using abbreviated column headers for better readability. Rich
+        measures every cell before printing, which is slow for tens of
+        thousands of files; the "plain" and "tsv" formats avoid it.
+
+        Args:
+            format: One of `PRINT_FORMATS`.
+            page_size: Rows per page. Rich and plain tables are printed one
+                page at a time, so the first rows show up immediately and no
+                more than a page is ever measured. Defaults to all rows for
+                rich and to 1000 rows for plain.
+            output: Stream of the "tsv" rows, `sys.stdout` by default.
+            header: Print the "tsv" header line. Runs over several
+                directories only print it before the first one.
         """
+        if format not in self.PRINT_FORMATS:
+            raise ValueError(f"Unknown print format '{format}', expected one of {self.PRINT_FORMATS}")
+
+        if page_size is not None and page_size < 1:
+            raise ValueError(f"Page size must be at least 1, got {page_size}")
+
+        if format == "quiet":
+            return
+
+        if format == "tsv":
+            self.print_files_tsv(output, header)
+            return
+
+        if page_size is None:
+            page_size = 1000 if format == "plain" else max(len(self.parsed_files), 1)
+
+        for start in range(0, max(len(self.parsed_files), 1), page_size):
+            rows: list[list[str]] = [self.get_print_row(file)
+                                     for file in self.parsed_files[start:start + page_size]]
+
+            if format == "plain":
+                self.print_plain_page(rows)
+            else:
+                self.print_rich_page(rows)
+
+    def print_rich_page(self, rows: list[list[str]]) -> None:
+        """Prints a page of the per-file table with Rich."""
         console: Console = Console()
         title: str = f"[bold][#00ffae]{self.dir_name}[/]"
         border_style: Style = Style(color="#000000", bold=True)
@@ -184,55 +463,43 @@ class Compsta:
             border_style=border_style,
         )
 
-        # Define columns (abbreviated for readability)
+        # Define columns
         table.add_column("Filename", style="cyan", justify="left")
-        table.add_column("EL", justify="left", style="#1cffa0")  # Effective Lines
-        table.add_column("n1", justify="left", style="#1cffa0")  # Distinct operators
-        table.add_column("n2", justify="left", style="#1cffa0")  # Distinct operands
-        table.add_column("N1", justify="left", style="#1cffa0")  # Total operators
-        table.add_column("N2", justify="left", style="#1cffa0")  # Total operands
-        table.add_column("n", justify="left", style="#1cffa0")   # Vocabulary
-        table.add_column("N", justify="left", style="#1cffa0")   # Length
-        table.add_column("^N", justify="left", style="#1cffa0")  # Estimated Length
-        table.add_column("V", justify="left", style="#1cffa0")   # Program Volume
-        table.add_column("D", justify="left", style="#1cffa0")   # Difficulty
-        table.add_column("L*", justify="left", style="#1cffa0")  # Estimated level
-        table.add_column("I", justify="left", style="#1cffa0")   # Intelligence
-        table.add_column("E", justify="left", style="#1cffa0")   # Effort
-        table.add_column("T", justify="left", style="#1cffa0")   # Time Required
-        table.add_column("B", justify="left", style="#1cffa0")   # Delivered Bugs
-        table.add_column("CC", justify="left", style="#1cffa0")  # McCabe Complexity
-        table.add_column("LC", justify="left", style="#1cffa0")  # Avg Line Volume
-        table.add_column("FC", justify="left", style="#1cffa0")  # Number of funtions calls
-        
+        for header, _, _ in self.PRINT_COLUMNS:
+            table.add_column(header, justify="left", style="#1cffa0")
 
         # Populate rows
-        nDigits: int = 2
-        for file in self.parsed_files:
-            table.add_row(
-                file.filename,
-                str(file.effective_lines),
-                str(file.n1),
-                str(file.n2),
-                str(file.N1),
-                str(file.N2),
-                str(round(file.vocabulary, nDigits)),
-                str(round(file.length, nDigits)),
-                str(round(file.estimated_len, nDigits)),
-                str(round(file.volume, nDigits)),
-                str(round(file.difficulty, nDigits)),
-                str(round(file.estimated_level, nDigits)),
-                str(round(file.intelligence, nDigits)),
-                str(round(file.effort, nDigits)),
-                str(round(file.time_required, nDigits)),
-                str(round(file.delivered_bugs, nDigits)),
-                str(file.total_mcc),
-                str(round(file.avg_line_volume, nDigits)),
-                str(file.total_func_calls),
-            )
+        for row in rows:
+            table.add_row(*row)
         
         console.print(table)
 
+    def print_plain_page(self, rows: list[list[str]]) -> None:
+        """Prints a page of the per-file table as fixed-width text."""
+        header : list[str] = ["Filename"] + [header for header, _, _ in self.PRINT_COLUMNS]
+        widths : list[int] = [max(len(cell) for cell in column) for column in zip(header, *rows)]
+        pattern: str       = "  ".join(f"{{:<{width}}}" for width in widths) + "\n"
+
+        sys.stdout.write(f"{self.dir_name}\n")
+        sys.stdout.write(pattern.format(*header))
+        sys.stdout.write("".join(pattern.format(*row) for row in rows))
+        sys.stdout.flush()
+
+    def print_files_tsv(self, output: TextIO | None = None, header: bool = True) -> None:
+        """Streams the per-file table as tab-separated rows to `output`
+        (`sys.stdout` by default). Every row starts with the directory, so
+        the rows of several directories can be concatenated under a single
+        header."""
+        directory: str = os.path.normpath(self.dir_name)
+        output = output or sys.stdout
+
+        if header:
+            output.write("\t".join(["Directory", "Filename"] + [column for column, _, _
+                                                              in self.PRINT_COLUMNS]) + "\n")
+        for file in self.parsed_files:
+            output.write("\t".join([directory] + self.get_print_row(file)) + "\n")
+        output.flush()
+
     def print_mean_metrics(self) -> None:
         """Display a formatted table of mean metrics using Rich.
         
@@ -277,29 +544,7 @@ class Compsta:
 
         for file in self.parsed_files:
             # Ordem reorganizada para seguir exatamente a mesma ordem do print
-            row = [
-                index,
-                file.filename,
-                file.effective_lines,           # EL
-                file.n1,                        # n1
-                file.n2,                        # n2
-                file.N1,                        # N1
-                file.N2,                        # N2
-                file.vocabulary,                # Vocabulary
-                file.length,                    # Length
-                file.estimated_len,             # Estimated length
-                file.volume,                    # Volume
-                file.difficulty,                # Difficulty
-                file.estimated_level,           # Estimated level
-                file.intelligence,              # Intelligence
-                file.effort,                    # Effort
-                file.time_required,             # Time Required
-                file.delivered_bugs,            # Delivered bugs
-                file.total_mcc,                 # Total McCabe (CC)
-                file.avg_line_volume,           # Average line volume (LC)
-                file.total_func_calls,          # Functions Call (FC)
-                file.number_of_functions,       # Number of Functions
-            ]
+            row = [index, file.filename] + [getattr(file, attr) for _, attr in self.columns]
             data.append(row)
             index += 1
 
@@ -339,8 +584,68 @@ class Compsta:
         
         Console().print(f"Created mean CSV: {file_name}", style="bold green")
 
+    def export_summary_json(self, dir: str, filename: str) -> None:
+        """Exports the mergeable summaries of the metrics to a JSON file.
+
+        `Comclass.merge_tree` combines these files up the directory tree
+        without reading the per-file data again.
+
+        Args:
+            dir: Output directory path.
+            filename: Output filename without extension.
+        """
+        file_name: str = f"{dir}{filename}_summary"
+
+        makedirs(dir, exist_ok=True)
+
+        with open(f"{file_name}.json", mode="w") as file:
+            json.dump({attr: summary.as_dict() for attr, summary in self.summaries.items()},
+                      file)
+
+        Console().print(f"Created summary JSON: {file_name}", style="bold green")
+
+    def export_line_volume_csv(self, dir: str, filename: str) -> None:
+        """Exports the line-volume histogram and the densest lines of the directory.
+
+        See `objects.line_profile.LineVolumeReport`. Files without a
+        `LineProfile` (e.g. rows read back with `read_csv`) are skipped.
+
+        Args:
+            dir: Output directory path.
+            filename: Output filename without extension.
+        """
+        LineVolumeReport(self.parsed_files).export_csv(dir, filename)
+
+    def export_line_profiles(self, dir: str, filename: str) -> None:
+        """Saves the `LineProfile` of every file, so `merge_shards` can
+        rebuild the line-volume CSVs of a sharded run.
+
+        Args:
+            dir: Output directory path.
+            filename: Output filename without extension.
+        """
+        export_line_profiles(dir, filename, self.parsed_files)
+
+    @staticmethod
+    def read_summary_json(path: str) -> dict[str, MetricSummary]:
+        """Reads the summaries written by `export_summary_json`."""
+        with open(path) as file:
+            return {attr: MetricSummary.from_dict(data)
+                    for attr, data in json.load(file).items()}
+
     @staticmethod
-    def process_directory(base_input_dir: str, base_output_dir: str) -> None:
+    def process_directory(base_input_dir: str, base_output_dir: str,
+                          consumers: list[Any] | None = None,
+                          runner: BatchRunner | None = None,
+                          shard: Shard | None = None, format: str = "rich",
+                          page_size: int | None = None,
+                          telemetry: Telemetry | None = None,
+                          preprocessor: Preprocessor | None = None,
+                          function_cache: FunctionCache | None = None,
+                          ast_cache: ASTCache | None = None,
+                          plugins: list[type[MetricPlugin]] | None = None,
+                          output: TextIO | None = None,
+                          sequences: bool = False) -> None:
         """Process all exercise directories recursively and generate CSV files.
         
         This static method walks through a directory tree, processes all
@@ -350,16 +655,64 @@ class Compsta:
         Args:
             base_input_dir: Base directory containing the exercise folders.
             base_output_dir: Base output directory for CSV files.
+            consumers: Objects notified with every parsed file, shared by all
+                directories (see `Compsta.__init__`).
+            runner: Optional `BatchRunner` shared by all directories.
+            shard: Optional `Shard` of `base_input_dir`. Only its files are
+                analyzed, and the output can later be combined with the
+                other shards by `Compsta.merge_shards`.
+            format: Format of the per-file tables (see `PRINT_FORMATS`). The
+                mean tables are only printed with "rich" and "plain", so the
+                "tsv" output stays machine-readable.
+            page_size: Rows per page of the per-file tables.
+            telemetry: Optional `Telemetry`, reporting the progress of the
+                whole tree.
+            preprocessor: Optional `Preprocessor`; directories with `.c`
+                files are then analyzed without `.i` files.
+            function_cache: Optional `FunctionCache` shared by the whole
+                tree. The number of functions reused from it is printed at
+                the end.
+            ast_cache: Optional `ASTCache` shared by the whole tree.
+            plugins: Optional `MetricPlugin` classes run on every file.
+            output: Stream of the "tsv" rows (see `print_files_metrics`).
+            sequences: Record the token sequences of the functions (see
+                `Compsta.__init__`).
         """
+        if runner is not None and runner.preprocessor is not None:
+            preprocessor = runner.preprocessor
+
+        functions: int  = 0  # Functions analyzed, and reused from the cache
+        reused   : int  = 0
+        loaded   : int  = 0  # Files whose AST came from the AST cache
+        parsed   : int  = 0
+        header   : bool = True  # The "tsv" header is printed once per run
+
+        extension: str = ".c" if preprocessor is not None else ".i"
+
         console = Console()
         
         # Ensure the base output directory exists
         Path(base_output_dir).mkdir(parents=True, exist_ok=True)
         
+        if runner is not None:
+            plugins = runner.plugins
+
+        if shard is not None:
+            shard.write_manifest(base_output_dir, [get_plugin_spec(plugin)
+                                                   for plugin in plugins or []],
+                                 line_profiles=True)
+
+        if telemetry is not None:
+            telemetry.expect(Compsta.count_files(base_input_dir, shard, extension=extension))
+            if runner is not None:
+                telemetry.attach(runner)
+
         # Walk through all subdirectories
         for root, dirs, files in os.walk(base_input_dir):
-            # Skip directories that don't contain .i files
-            if not any(f.endswith('.i') for f in files):
+            dirs.sort()  # Deterministic order
+
+            # Skip directories that don't contain files to analyze
+            if not any(f.endswith(extension) for f in files):
                 continue
                 
             # Process each directory with .i files
@@ -369,18 +722,284 @@ class Compsta:
             # Create Compsta instance for this directory
             try:
                 console.print(f"\nProcessing: [bold cyan]{root}[/]", style="bold")
-                compsta = Compsta(root + "/")  # Ensure trailing slash
+                compsta = Compsta(root + "/", consumers, runner, shard,  # Ensure trailing slash
+                                  telemetry=telemetry, preprocessor=preprocessor,
+                                  function_cache=function_cache, ast_cache=ast_cache,
+                                  plugins=plugins, sequences=sequences)
+
+                functions += sum(file.number_of_functions for file in compsta.parsed_files)
+                reused    += sum(file.function_cache_hits for file in compsta.parsed_files)
+                loaded    += sum(file.ast_cache_hit is True for file in compsta.parsed_files)
+                parsed    += sum(file.ast_cache_hit is False for file in compsta.parsed_files)
                 
                 # Generate CSV name from directory name
                 csv_name = os.path.basename(root)
                 
                 # Print metrics and export CSVs
-                compsta.print_files_metrics()
-                compsta.print_mean_metrics()
+                compsta.print_files_metrics(format, page_size, output, header)
+                header = False
+                if format in ("rich", "plain"):
+                    compsta.print_mean_metrics()
                 compsta.export_csv(output_dir + "/", csv_name)
                 compsta.export_mean_csv(output_dir + "/", csv_name)
+                compsta.export_summary_json(output_dir + "/", csv_name)
+                compsta.export_line_volume_csv(output_dir + "/", csv_name)
+                if shard is not None:
+                    compsta.export_line_profiles(output_dir + "/", csv_name)
+                compsta.notify_directory()
                 
                 console.print(f"Successfully processed [green]{root}[/]", style="bold")
             except Exception as e:
                 console.print(f"Error processing {root}: {str(e)}", style="bold red")
 
+        if runner is not None and runner.quarantine:
+            runner.export_quarantine(os.path.join(base_output_dir, ""))
+
+        if function_cache is not None or (runner is not None and runner.function_cache is not None):
+            console.print(f"Function cache: reused {reused} of {functions} functions "
+                          f"({reused / functions if functions else 0:.0%})", style="bold")
+
+        if ast_cache is not None or (runner is not None and runner.ast_cache is not None):
+            console.print(f"AST cache: loaded {loaded} ASTs, parsed {parsed}", style="bold")
+
+    @staticmethod
+    def process_archives(archives: list[str], base_output_dir: str,
+                         consumers: list[Any] | None = None, workers: int | None = None,
+                         preprocessor: Preprocessor | None = None, format: str = "rich",
+                         page_size: int | None = None,
+                         telemetry: Telemetry | None = None,
+                         output: TextIO | None = None) -> None:
+        """Analyzes zip/tar archives of submissions without extracting them.
+
+        Archives are analyzed in parallel, one per worker process (see
+        `utils.archive.iter_archive`). The results are streamed back file by
+        file (see `utils.archive.stream_archive`), and every directory inside
+        an archive is exported like `process_directory` does once the whole
+        archive is analyzed, under
+        `<base_output_dir>/<archive name>/<in-archive directory>` (see
+        `utils.archive.get_output_names`). Archives are exported in the order
+        they complete.
+
+        Args:
+            archives: Paths of the archives.
+            base_output_dir: Base output directory for CSV files.
+            consumers: Objects notified with every parsed file.
+            workers: Number of archives analyzed at the same time. Defaults
+                to the number of CPUs.
+            preprocessor: Optional `Preprocessor` of the `.c` members. Without
+                it, every `.c` member needs its `.i` member in the archive.
+            format: Format of the per-file tables (see `PRINT_FORMATS`).
+            page_size: Rows per page of the per-file tables.
+            telemetry: Optional `Telemetry` notified of every analyzed file.
+            output: Stream of the "tsv" rows (see `print_files_metrics`).
+        """
+        from utils.archive import (ARCHIVE_ERRORS, count_files, get_output_names, init_worker,
+                                   stream_archive)
+
+        names   = get_output_names(archives)  # Fails before any archive is analyzed
+        console = Console()
+        workers = workers or os.cpu_count() or 1
+        analyze = partial(stream_archive, preprocessor=preprocessor)
+        queue   = multiprocessing.Queue()
+        header  = True  # The "tsv" header is printed once per run
+
+        if telemetry is not None:
+            for archive in archives:
+                try:
+                    telemetry.expect(count_files(archive, preprocessor))
+                except ARCHIVE_ERRORS:
+                    telemetry.expect(1)  # Reported as one error (see `stream_archive`)
+
+        # Files of the archives being analyzed, by in-archive directory
+        directories: dict[int, dict[str, list[ParsedCode]]] = {index: dict()
+                                                              for index in range(len(archives))}
+
+        with multiprocessing.Pool(min(workers, max(len(archives), 1)),
+                                  initializer=init_worker, initargs=(queue,)) as pool:
+            pending  : AsyncResult = pool.map_async(analyze, enumerate(archives))
+            remaining: int         = len(archives)
+
+            while remaining:
+                try:
+                    index, result = queue.get(timeout=1)
+                except Empty:
+                    if pending.ready():
+                        pending.get()  # Raises the error of a worker, if any
+                    continue
+
+                archive: str = archives[index]
+
+                #==> Group the files by in-archive directory <==#
+                if result is not None:
+                    member_dir, parsed_code, error = result
+                    files = directories[index].setdefault(member_dir, [])
+
+                    if telemetry is not None:
+                        telemetry.file_done(parsed_code, error)
+
+                    if error is not None:
+                        Console().print(f"ERROR PROCESSING '{archive}/{member_dir}': {error}",
+                                        style="bold yellow")
+
+                    elif not parsed_code.has_errors:
+                        files.append(parsed_code)
+
+                        for consumer in consumers or []:
+                            consumer.add_file(parsed_code)
+
+                        parsed_code.release()
+                    continue
+
+                #==> The archive is complete <==#
+                remaining -= 1
+                console.print(f"\nProcessing: [bold cyan]{archive}[/]", style="bold")
+
+                for member_dir, files in sorted(directories.pop(index).items()):
+                    name      : str = names[index]
+                    csv_name  : str = os.path.basename(member_dir) or name
+                    output_dir: str = os.path.join(base_output_dir, name, member_dir, "")
+
+                    compsta = Compsta(os.path.join(archive, member_dir, ""), consumers,
+                                      parsed_files=sorted(files, key=lambda file: file.filename))
+
+                    compsta.print_files_metrics(format, page_size, output, header)
+                    header = False
+                    if format in ("rich", "plain"):
+                        compsta.print_mean_metrics()
+                    compsta.export_csv(output_dir, csv_name)
+                    compsta.export_mean_csv(output_dir, csv_name)
+                    compsta.export_summary_json(output_dir, csv_name)
+                    compsta.export_line_volume_csv(output_dir, csv_name)
+                    compsta.notify_directory()
+
+                console.print(f"Successfully processed [green]{archive}[/]", style="bold")
+
+    #==> Shards <==############################################################
+
+    @staticmethod
+    def read_csv(path: str, columns: list[tuple[str, str]] | None = None) -> list[SimpleNamespace]:
+        """Reads back the rows of a per-file CSV written by `export_csv`.
+
+        Args:
+            path: Path of the CSV.
+            columns: Columns to read, `COLUMNS` by default. Runs with plugins
+                also need the columns of the plugins.
+
+        Returns:
+            One object per row, with the same attributes as a `ParsedCode`
+            for every column in `columns`.
+        """
+        attributes: dict[str, str] = dict(columns if columns is not None else Compsta.COLUMNS)
+        rows: list[SimpleNamespace] = []
+
+        with open(path, newline="") as file:
+            for record in csv.DictReader(file):
+                row = SimpleNamespace(filename=record["Filename"])
+
+                for header, value in record.items():
+                    if header in attributes:
+                        setattr(row, attributes[header], Compsta.parse_value(value))
+
+                rows.append(row)
+
+        return rows
+
+    @staticmethod
+    def parse_value(value: str) -> int | float:
+        """Parses a CSV value back to the int or float that was written."""
+        try:
+            return int(value)
+        except ValueError:
+            return float(value)
+
+    @staticmethod
+    def merge_shards(shard_dirs: list[str], base_output_dir: str,
+                     consolidated_csv: str | None = None) -> None:
+        """Combines the outputs of a sharded run into a single-run output.
+
+        The per-file rows of every directory are gathered from all shards and
+        sorted like a single-machine run sorts them, so the per-directory and
+        consolidated means are recomputed exactly.
+
+        Args:
+            shard_dirs: Output directories of every shard of the run.
+            base_output_dir: Output directory of the merged CSV files.
+            consolidated_csv: Optional path of a consolidated CSV with the
+                means of every folder of the corpus root, as written by
+                `Comclass.parse_folder`.
+
+        The line-volume CSVs are rebuilt too when the shards saved the line
+        profiles of their files (see `export_line_profiles`).
+
+        Raises:
+            ValueError: If the shards do not cover the whole corpus, or if the
+                line profiles of a directory are missing.
+        """
+        console = Console()
+
+        manifests = Shard.read_manifests(shard_dirs)
+        base_name: str = str(manifests[0]["name"])
+
+        plugins: list[type[MetricPlugin]] = [load_plugin(spec)
+                                             for spec in manifests[0].get("plugins", [])]
+        columns: list[tuple[str, str]]    = Compsta.COLUMNS + [column for plugin in plugins
+                                                               for column in plugin.COLUMNS]
+
+        line_profiles: bool = bool(manifests[0].get("line_profiles", False))
+
+        #==> Gather the rows of every directory <==#
+        rows: dict[str, list[SimpleNamespace]] = dict()
+        for shard_dir in shard_dirs:
+            for root, dirs, files in os.walk(shard_dir):
+                relative_path: str = os.path.relpath(root, shard_dir)
+                csv_name     : str = (base_name if relative_path == "."
+                                      else os.path.basename(root))
+
+                if f"{csv_name}.csv" not in files:
+                    continue
+
+                shard_rows: list[SimpleNamespace] = Compsta.read_csv(
+                    os.path.join(root, f"{csv_name}.csv"), columns)
+
+                if line_profiles:
+                    if f"{csv_name}_line_profiles.npz" not in files:
+                        raise ValueError(f"Missing line profiles of {root}: "
+                                         f"{csv_name}_line_profiles.npz")
+
+                    profiles = read_line_profiles(os.path.join(root, f"{csv_name}_line_profiles.npz"))
+                    for row in shard_rows:
+                        if row.filename in profiles:
+                            vars(row).update(vars(profiles[row.filename]))
+
+                rows.setdefault(relative_path, []).extend(shard_rows)
+
+        #==> Write every directory as a single run would <==#
+        from Comclass import Comclass
+        comclass = Comclass()
+
+        for relative_path in sorted(rows):
+            csv_name  : str = base_name if relative_path == "." else os.path.basename(relative_path)
+            output_dir: str = os.path.join(base_output_dir, relative_path, "")
+
+            compsta = Compsta(relative_path,
+                              parsed_files=sorted(rows[relative_path],
+                                                  key=lambda row: row.filename),
+                              plugins=plugins)
+            compsta.export_csv(output_dir, csv_name)
+            compsta.export_mean_csv(output_dir, csv_name)
+            compsta.export_summary_json(output_dir, csv_name)
+            if line_profiles:
+                compsta.export_line_volume_csv(output_dir, csv_name)
+
+            # The consolidated CSV has one row per folder of the corpus root
+            if relative_path != "." and os.sep not in relative_path:
+                comclass.all_mean_metrics.append(compsta.mean_metrics)
+                comclass.all_summaries.append(compsta.summaries)
+                comclass.dir_names.append(csv_name.capitalize())
+
+        if consolidated_csv is not None:
+            comclass.export_consolidated_metrics(base_output_dir, consolidated_csv)
+            comclass.export_summary_csv(consolidated_csv)
+
+        console.print(f"Merged {len(shard_dirs)} shards into [green]{base_output_dir}[/]",
+                      style="bold")
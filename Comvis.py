@@ -1,7 +1,18 @@
 import pycparser
 from pycparser        import plyparser
 from objects.function import Function
+from objects.call_graph import CallGraph
+from objects.function_cache import CachedFunction, FunctionCache
+from utils.prelude    import get_parser
+from utils.preprocess import Preprocessor, rename_main_file
+from utils.ast_cache  import ASTCache
+from objects.plugins  import MetricPlugin
+from objects.line_profile import LineProfile
+from utils.alloc_profile  import AllocationProfiler
+from contextlib       import AbstractContextManager, nullcontext
 from ast              import parse
+from hashlib          import blake2b
+from io               import StringIO
 from os               import sep
 from typing           import Any, List, Tuple
 from pycparser        import parse_file, c_ast
@@ -26,8 +37,17 @@ class ParsedCode(c_ast.NodeVisitor):
         file_pre_compiled: Path to the pre-compiled file.
         file_source: Path to the source code file.
         has_errors: Boolean indicating if parsing encountered errors.
+        content_hash: Hash of the pre-compiled file contents.
+        prelude_cache_hit: Whether the fake-libc prelude came from the cache
+            of `utils.prelude`, or None when the file has no prelude.
+        ast_cache_hit: Whether the AST was loaded from the `ASTCache`, or None
+            without a cache.
+        peak_rss_mb: Peak resident memory while analyzing the file, in MB,
+            when measured by the caller (see `utils.batch`).
         current_node_type: Type of the current node being visited.
         current_func: Current function being processed.
+        loop_depth: Number of loops enclosing the node being visited.
+        nesting_level: Cognitive complexity nesting of the node being visited.
         operands: Dictionary storing operands and their occurrence lines.
         operators: Dictionary storing operators and their occurrence lines.
         functions: Set of Function objects representing parsed functions.
@@ -38,17 +58,58 @@ class ParsedCode(c_ast.NodeVisitor):
         total_lines: Total lines in the source file.
         effective_lines: Count of non-empty, non-comment lines.
         Various Halstead metrics (n1, n2, N1, N2, vocabulary, length, etc.)
-        cognitive_statement_weight: Dictionary for cognitive complexity weights.
+        line_profile: `LineProfile` with the operators and operands per line.
+        line_volume_p50, line_volume_p90: Percentiles of the volume of the
+            lines with tokens.
+        max_line_volume, densest_line: Volume and number of the densest line.
         total_cognitive_complexity: Total cognitive complexity score.
+        call_graph: `CallGraph` of the calls between functions of the file.
+        max_fan_in, max_fan_out, max_call_depth: Maxima over the functions
+            defined in the file.
+        recursive_functions: Functions that call themselves, directly or
+            through a cycle.
+        call_cycles: Number of call cycles (including direct recursion).
+        function_cache: Optional `FunctionCache` of already visited functions.
+        function_cache_hits: Functions of this file restored from the cache.
+        current_calls: Functions called by the function being visited.
+        plugins: `MetricPlugin` instances fed by the visit of this file. Their
+            results become attributes of the object.
+        plugin_dispatch: Node class name -> plugins interested in it.
+        profiler: Optional `AllocationProfiler` of the phases of the analysis.
         ast: Abstract Syntax Tree representation of the parsed code.
     """
     
-    def __init__(self, filename: str, file_dir: str = "Examples") -> None:
+    def __init__(self, filename: str, file_dir: str = "Examples",
+                 preprocessor: Preprocessor | None = None, source: str | None = None,
+                 pre_compiled: str | None = None,
+                 function_cache: FunctionCache | None = None,
+                 ast_cache: ASTCache | None = None,
+                 plugins: list[type[MetricPlugin]] | None = None,
+                 profiler: AllocationProfiler | None = None,
+                 sequences: bool = False) -> None:
         """Initializes the ParsedCode object and starts the parsing process.
         
         Args:
             filename: Name of the file to be analyzed, without extension.
             file_dir: Path to the directory containing the file.
+            preprocessor: Optional `Preprocessor`. When given, the `.c` file
+                is preprocessed in memory instead of reading its `.i` file.
+            source: Optional contents of the `.c` file, for files that are not
+                on disk (e.g. archive members, see `utils.archive`).
+            pre_compiled: Optional contents of the `.i` file, used instead of
+                reading or preprocessing it. Its line markers are renamed to
+                the `.c` path of this object.
+            function_cache: Optional `FunctionCache`. Function definitions
+                found in it are not visited again.
+            ast_cache: Optional `ASTCache`. The AST is loaded from it instead
+                of parsing the file when the `.i` text was already parsed.
+            plugins: Optional `MetricPlugin` classes, run in the same
+                traversal. The `function_cache` is not used with plugins,
+                since a reused function is not visited.
+            profiler: Optional `AllocationProfiler`, measuring the memory
+                allocated by every phase of the analysis.
+            sequences: Record the token sequence of every function (see
+                `Function.sequence`), for the `DuplicateDetector`.
         """
         #--> File <-- #########################################################
         self.filename         : str = filename                         
@@ -58,10 +119,25 @@ class ParsedCode(c_ast.NodeVisitor):
         self.file_source      : str = f"{self.file_fullpath}.c"          
 
         #--> Global states <-- ################################################
-        self.has_errors: bool = False
+        self.has_errors       : bool        = False
+        self.content_hash     : str         = ""
+        self.peak_rss_mb      : float       = 0
+        self.prelude_cache_hit: bool | None = None
+        self.ast_cache_hit    : bool | None = None
 
         self.current_node_type: str | None = None
         self.current_func: Function | None = None  
+        self.loop_depth  : int             = 0
+
+        self.function_cache     : FunctionCache | None = function_cache if not plugins else None
+        self.function_cache_hits: int                  = 0
+        self.current_calls      : list[str]            = list()
+        self.sequences          : bool                 = sequences
+
+        #==> Cognitive complexity states <==#
+        self.nesting_level: int        = 0     # Nesting increment of the current structure.
+        self.is_else_if   : bool       = False # The next visited If is an `else if`.
+        self.logical_op   : str | None = None  # Logical operator of the enclosing sequence.
 
         ####################################################################### 
         # |> variable: self.operands
@@ -94,6 +170,17 @@ class ParsedCode(c_ast.NodeVisitor):
         #==> Ciclomatic Complexity <==#
         self.total_mcc: int = 0 # Total McCabe Complexity
 
+        #==> Cognitive Complexity <==#
+        self.total_cognitive_complexity: int = 0
+
+        #==> Call Graph <==#
+        self.call_graph         : CallGraph = CallGraph()
+        self.max_fan_in         : int       = 0
+        self.max_fan_out        : int       = 0
+        self.max_call_depth     : int       = 0
+        self.recursive_functions: int       = 0
+        self.call_cycles        : int       = 0
+
         #==> Number of lines <==#
         self.total_lines    : int = 0
         self.effective_lines: int = 0
@@ -117,24 +204,117 @@ class ParsedCode(c_ast.NodeVisitor):
 
         self.avg_line_volume: float = 0
 
+        #==> Line Volume <==#
+        self.line_profile   : LineProfile | None = None
+        self.line_volume_p50: float              = 0  # Median volume of the lines with tokens.
+        self.line_volume_p90: float              = 0
+        self.max_line_volume: float              = 0
+        self.densest_line   : int                = 0  # Line of `max_line_volume`.
+
+        #==> Plugins <==#
+        self.plugins        : list[MetricPlugin]            = [plugin(self) for plugin in plugins or []]
+        self.plugin_dispatch: dict[str, list[MetricPlugin]] = dict()
+
+        for plugin in self.plugins:
+            for node_type in plugin.NODE_TYPES:
+                self.plugin_dispatch.setdefault(node_type, []).append(plugin)
+
+        if self.plugin_dispatch:
+            self.visit = self.visit_with_plugins
+
+        self.profiler: AllocationProfiler | None = profiler
+
         #--> Initialization <-- ###############################################
-        self.run_parser()
+        self.run_parser(preprocessor, source, pre_compiled, ast_cache)
 
         #==> Calculate Metrics <==#
 
 ##=== ===|> Methods <|=== === #################################################
 
-    def run_parser(self) -> None:
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickles the object without its AST.
+
+        Results sent back by worker processes carry only the collected
+        metrics; the AST is by far the largest part of the object.
+        """
+        state: dict[str, Any] = self.__dict__.copy()
+        state.pop("ast", None)
+        state.pop("_method_cache", None)
+        state.pop("function_cache", None)
+        state.pop("visit", None)
+        state.pop("plugins", None)
+        state.pop("plugin_dispatch", None)
+        state.pop("profiler", None)
+
+        return state
+
+    def release(self) -> None:
+        """Drops the AST, the `Function` objects (with their token sequences)
+        and the call graph, keeping only the metrics of the file.
+
+        `Compsta` keeps every file of a directory until its CSVs are written,
+        but only needs their metrics by then: it calls this once the
+        consumers have seen the file.
+        """
+        self.__dict__.pop("ast", None)
+        self.functions  = set()
+        self.call_graph = CallGraph()
+
+    def run_parser(self, preprocessor: Preprocessor | None = None,
+                   source: str | None = None, pre_compiled: str | None = None,
+                   ast_cache: ASTCache | None = None) -> None:
         """Runs the parser to generate AST and process the code.
         
         This method attempts to parse the pre-compiled file and visit all nodes
         in the AST. If parsing fails, it sets the has_errors flag and prints
         an error message.
+
+        The fake-libc prelude of the file is not parsed again when another file
+        with the same headers was already parsed (see `utils.prelude`).
+
+        Args:
+            preprocessor: Optional `Preprocessor` whose output is parsed
+                instead of the `.i` file. Its errors are raised.
+            source: Optional contents of the `.c` file.
+            pre_compiled: Optional contents of the `.i` file.
+            ast_cache: Optional `ASTCache`, keyed by `content_hash`.
         """
+        if pre_compiled is not None:
+            text: str = rename_main_file(pre_compiled, self.file_source)
+        elif preprocessor is not None:
+            text = preprocessor.run(self.file_source, self.file_pre_compiled, source)
+        else:
+            with open(self.file_pre_compiled) as file:
+                text = file.read()
+
         try:
-            self.ast: c_ast.FileAST = parse_file(self.file_pre_compiled, use_cpp=False)
-            self.visit(self.ast)
-            self.calculate_metrics()
+            with self.measure("parse"):
+                self.content_hash = blake2b(text.encode(), digest_size=16).hexdigest()
+
+                ast: c_ast.FileAST | None = None
+                if ast_cache is not None:
+                    ast = ast_cache.get(self.content_hash)
+                    self.ast_cache_hit = ast is not None
+
+                if ast is None:
+                    parser = get_parser()
+                    hits, misses = parser.hits, parser.misses
+
+                    ast = parser.parse_text(text, self.file_pre_compiled)
+
+                    if (parser.hits, parser.misses) != (hits, misses):
+                        self.prelude_cache_hit = parser.hits > hits
+
+                    if ast_cache is not None:
+                        ast_cache.put(self.content_hash, ast)
+
+                self.ast: c_ast.FileAST = ast
+
+            with self.measure("visit"):
+                self.visit(self.ast)
+                self.collect_plugins()
+
+            self.calculate_metrics(source)
             self.number_of_functions = len(self.functions)
 
         except plyparser.ParseError as e:
@@ -144,53 +324,88 @@ class ParsedCode(c_ast.NodeVisitor):
 
     ## ==> Metric methods <== #############################################
 
-    def calculate_metrics(self) -> None:
+    def collect_plugins(self) -> None:
+        """Stores the results of every plugin as attributes of the object.
+
+        Raises:
+            ValueError: When a plugin result would replace a metric of
+                `ParsedCode` (or of another plugin).
+        """
+        for plugin in self.plugins:
+            for attr, value in plugin.get_results().items():
+                if attr in self.__dict__:
+                    raise ValueError(f"Plugin {type(plugin).__name__} overrides '{attr}'")
+
+                setattr(self, attr, value)
+
+    def calculate_metrics(self, source: str | None = None) -> None:
         """Calculates all software metrics for the parsed code.
         
         This method coordinates the calculation of line counts, Halstead metrics,
-        and McCabe cyclomatic complexity.
-        """
-        self.count_lines()
-        self.calculate_halstead()
-        self.calculate_total_McC()
+        McCabe cyclomatic complexity, cognitive complexity and the call graph.
 
-    def count_lines(self) -> None:
+        Args:
+            source: Contents of the `.c` file when it is not on disk.
+        """
+        with self.measure("lines"):
+            self.count_lines(source)
+
+        with self.measure("aggregation"):
+            self.calculate_halstead()
+            self.calculate_line_profile()
+            self.calculate_total_McC()
+            self.calculate_total_CoC()
+            self.calculate_call_graph()
+
+    def measure(self, phase: str) -> AbstractContextManager:
+        """Returns a context measuring the allocations of a phase with the
+        `profiler`, or doing nothing without one."""
+        return self.profiler.phase(phase) if self.profiler is not None else nullcontext()
+
+    def count_lines(self, source: str | None = None) -> None:
         """Counts total lines and effective lines of code.
         
         Effective lines exclude empty lines, comments, and lines containing
         only braces. Stores results in total_lines and effective_lines attributes.
+
+        Args:
+            source: Contents of the `.c` file. It is read from disk when None.
         """
-        with open(self.file_source) as file:
-            lines            = file.readlines()
-            self.total_lines = len(lines)
-            in_block_comment = False
-
-            for line in lines:
-                stripped_line = line.strip()
-                
-                # Stop block comments if in one.
-                if in_block_comment:
-                    # Found the end of the block comments.
-                    if "*/" in stripped_line:
-                        in_block_comment = False
-                    continue
-                
-                # Remove one line block comments
-                if stripped_line[:2] == "/*" and stripped_line[-2:] == "*/":
-                    continue
-                
-                # Start a block comments.
-                if "/*" in stripped_line:
-                    in_block_comment = True
-                    continue
-                # Identify a one line commentary.
-                if not stripped_line or stripped_line.startswith("//"):
-                    continue
-                # Identify lines with just '{' or '}'    
-                if stripped_line == '{' or stripped_line == '}':
-                    continue
-                
-                self.effective_lines += 1
+        if source is None:
+            with open(self.file_source) as file:
+                source = file.read()
+
+        # Same line splitting as reading the file in text mode
+        lines            = StringIO(source, newline=None).readlines()
+        self.total_lines = len(lines)
+        in_block_comment = False
+
+        for line in lines:
+            stripped_line = line.strip()
+            
+            # Stop block comments if in one.
+            if in_block_comment:
+                # Found the end of the block comments.
+                if "*/" in stripped_line:
+                    in_block_comment = False
+                continue
+            
+            # Remove one line block comments
+            if stripped_line[:2] == "/*" and stripped_line[-2:] == "*/":
+                continue
+            
+            # Start a block comments.
+            if "/*" in stripped_line:
+                in_block_comment = True
+                continue
+            # Identify a one line commentary.
+            if not stripped_line or stripped_line.startswith("//"):
+                continue
+            # Identify lines with just '{' or '}'    
+            if stripped_line == '{' or stripped_line == '}':
+                continue
+            
+            self.effective_lines += 1
 
     def calculate_halstead(self) -> None:
         """Calculates all Halstead metrics for the parsed code.
@@ -226,6 +441,29 @@ class ParsedCode(c_ast.NodeVisitor):
         for function in self.functions:
             function.calculate_halstead()
 
+    def calculate_line_profile(self) -> None:
+        """Builds the `LineProfile` of the file and its line-volume metrics.
+
+        Must be called after `calculate_halstead`, since the volume of a line
+        uses the vocabulary of the file.
+        """
+        nDigits: int = 2
+
+        self.line_profile = LineProfile.from_occurrences(
+            [self.operators, *(function.operators for function in self.functions)],
+            [self.operands, *(function.operands for function in self.functions)],
+            self.total_lines, self.vocabulary,
+        )
+
+        self.line_volume_p50, self.line_volume_p90 = (
+            round(float(value), nDigits) for value in self.line_profile.get_percentiles((50, 90))
+        )
+
+        densest: list[tuple[int, float]] = self.line_profile.get_densest(1)
+        if densest:
+            self.densest_line    = densest[0][0]
+            self.max_line_volume = round(densest[0][1], nDigits)
+
     def calculate_total_McC(self) -> None:
         """Calculates the total McCabe cyclomatic complexity.
         
@@ -235,6 +473,48 @@ class ParsedCode(c_ast.NodeVisitor):
         for function in self.functions:
             self.total_mcc += function.total_mcc
     
+    def calculate_total_CoC(self) -> None:
+        """Calculates the total cognitive complexity.
+
+        Sums the cognitive complexity of all functions in the code and stores
+        the result in total_cognitive_complexity attribute.
+        """
+        for function in self.functions:
+            self.total_cognitive_complexity += function.cognitive_complexity
+
+    def calculate_call_graph(self) -> None:
+        """Computes the call graph metrics of every function and of the file."""
+        self.call_graph.finalize()
+
+        for function in self.functions:
+            for metric, value in self.call_graph.get_metrics(function.func_name).items():
+                setattr(function, metric, value)
+
+            self.max_fan_in          = max(self.max_fan_in, function.fan_in)
+            self.max_fan_out         = max(self.max_fan_out, function.fan_out)
+            self.max_call_depth      = max(self.max_call_depth, function.call_depth)
+            self.recursive_functions += function.recursive
+
+        self.call_cycles = self.call_graph.number_of_cycles
+
+    def add_CoComplexity(self, nesting: bool = True) -> None:
+        """Increments the cognitive complexity for the current function.
+
+        Structures that break the linear flow add 1. Those that can be nested
+        (if, loops, switch, ternary) also add the current nesting level.
+
+        Args:
+            nesting: Whether the nesting increment applies to the structure.
+        """
+        if self.current_func is not None:
+            self.current_func.add_CoC(1 + self.nesting_level if nesting else 1)
+
+    def visit_nested(self, node: c_ast.Node) -> None:
+        """Visits a node one cognitive nesting level deeper."""
+        self.nesting_level += 1
+        self.visit(node)
+        self.nesting_level -= 1
+
     def add_McComplexity(self) -> None:
         """Increments the cyclomatic complexity for the current function.
         
@@ -260,6 +540,9 @@ class ParsedCode(c_ast.NodeVisitor):
         if self.current_func is not None:
             self.current_func.add_operator(operator, line)
 
+            if self.loop_depth > 0:
+                self.current_func.add_loop_occurrence("operator", operator, line)
+
         #==> If not <==#
         else:
             if operator in self.operators.keys():
@@ -283,6 +566,9 @@ class ParsedCode(c_ast.NodeVisitor):
         if self.current_func is not None:
             self.current_func.add_operand(operand, line)
 
+            if self.loop_depth > 0:
+                self.current_func.add_loop_occurrence("operand", operand, line)
+
         #==> If not <==#
         else:
             if operand in self.operands.keys():
@@ -290,6 +576,24 @@ class ParsedCode(c_ast.NodeVisitor):
             else:
                 self.operands.update({operand: [line]})
 
+    def append_statement(self, statement: str, node: c_ast.Node) -> None:
+        """Stores a control statement that is not a Halstead operator.
+
+        Statements are only recorded inside functions, where they can occur.
+
+        Args:
+            statement: The statement keyword (goto, break, continue, switch).
+            node: The AST node of the statement.
+        """
+        if self.current_func is None:
+            return
+
+        line: int = self.get_node_line(node)
+        self.current_func.add_statement(statement, line)
+
+        if self.loop_depth > 0:
+            self.current_func.add_loop_occurrence("statement", statement, line)
+
     ## ==> Auxiliar methods <== ###############################################
 
     def print_complexities(self) -> None:
@@ -340,12 +644,24 @@ class ParsedCode(c_ast.NodeVisitor):
         table.add_row("[bold]CYCLOMATIC COMPLEXITY[/]", "")
         table.add_row("Total Cyclomatic Complexity", str(self.total_mcc))
 
+        table.add_row("─" * 20, "─" * 10, style="dim")
+        table.add_row("[bold]COGNITIVE COMPLEXITY[/]", "")
+        table.add_row("Total Cognitive Complexity", str(self.total_cognitive_complexity))
+
         table.add_row("─" * 20, "─" * 10, style="dim")
         table.add_row("[bold]OTHERS[/]", "")
         table.add_row("Average line volume", str(round(self.avg_line_volume)))
 
         table.add_row("Number of functions calls", str(self.total_func_calls))
 
+        table.add_row("─" * 20, "─" * 10, style="dim")
+        table.add_row("[bold]CALL GRAPH[/]", "")
+        table.add_row("Max fan-in", str(self.max_fan_in))
+        table.add_row("Max fan-out", str(self.max_fan_out))
+        table.add_row("Max call depth", str(self.max_call_depth))
+        table.add_row("Recursive functions", str(self.recursive_functions))
+        table.add_row("Call cycles", str(self.call_cycles))
+
         # Imprimir a tabela
         console.print(table)
 
@@ -516,9 +832,7 @@ class ParsedCode(c_ast.NodeVisitor):
         table.add_column("Time", justify="right", style="#1cffa0")
         table.add_column("Bugs", justify="right", style="#1cffa0")
         table.add_column("McCabe", justify="right", style="#1cffa0")
-
-        # table.add_column("Cognitive", justify="right", style="#1cffa0") ==>
-        # Not Implemented yeet
+        table.add_column("Cognitive", justify="right", style="#1cffa0")
 
         for function in self.functions:
             table.add_row(
@@ -538,7 +852,7 @@ class ParsedCode(c_ast.NodeVisitor):
                 f"{function.time_required:.1f}",
                 f"{function.delivered_bugs:.1f}",
                 str(function.total_mcc),
-                # str(function.cognitive_complexity),
+                str(function.cognitive_complexity),
             )
         
         console.print(table)
@@ -558,6 +872,25 @@ class ParsedCode(c_ast.NodeVisitor):
 
     ## ==> Visit nodes <== ################################################
 
+    def visit_with_plugins(self, node: c_ast.Node) -> None:
+        """Visits a node, calling the plugins interested in its type around it.
+
+        Replaces `visit` when the file has plugins, so the plugins run in the
+        same traversal without slowing down the files analyzed without them.
+        """
+        plugins: list[MetricPlugin] | None = self.plugin_dispatch.get(node.__class__.__name__)
+
+        if plugins is None:
+            return c_ast.NodeVisitor.visit(self, node)
+
+        for plugin in plugins:
+            plugin.enter(node)
+
+        c_ast.NodeVisitor.visit(self, node)
+
+        for plugin in plugins:
+            plugin.leave(node)
+
     def visit_FileAST(self, node: c_ast.FileAST) -> None:
         self.visit(node.ext)
 
@@ -616,12 +949,15 @@ class ParsedCode(c_ast.NodeVisitor):
             node: A c_ast.DoWhile node representing a do-while loop.
         """
         self.add_McComplexity() # McCabe Complexity
+        self.add_CoComplexity() # Cognitive Complexity
 
         self.append_operator(node) # Halstead Metric
         
         #>>> Visit <<<#
+        self.loop_depth += 1
         self.visit(node.cond)
-        self.visit(node.stmt)
+        self.visit_nested(node.stmt)
+        self.loop_depth -= 1
 
     def visit_While(self, node: c_ast.While) -> None:
         """Visits a While node and processes it for metrics.
@@ -633,12 +969,15 @@ class ParsedCode(c_ast.NodeVisitor):
             node: A c_ast.While node representing a while loop.
         """
         self.add_McComplexity() # McCabe Complexity
+        self.add_CoComplexity() # Cognitive Complexity
 
         self.append_operator(node) # Halstead Metric
 
         #>>> Visit <<<#
+        self.loop_depth += 1
         self.visit(node.cond)
-        self.visit(node.stmt) 
+        self.visit_nested(node.stmt) 
+        self.loop_depth -= 1
 
     def visit_For(self, node: c_ast.For) -> None:
         """Visits a For node and processes it for metrics.
@@ -650,10 +989,13 @@ class ParsedCode(c_ast.NodeVisitor):
             node: A c_ast.For node representing a for loop.
         """
         self.add_McComplexity() # McCabe Complexity
+        self.add_CoComplexity() # Cognitive Complexity
 
         self.append_operator(node) # Halstead Metric
 
         #>>> Visit <<<#
+        self.loop_depth += 1
+
         if not node.init is None:
             self.visit(node.init)
 
@@ -663,28 +1005,100 @@ class ParsedCode(c_ast.NodeVisitor):
         if not node.next is None:
             self.visit(node.next)
 
-        self.visit(node.stmt)
+        self.visit_nested(node.stmt)
+
+        self.loop_depth -= 1
 
     def visit_If(self, node: c_ast.If) -> None:
         """Visits an If node and processes it for metrics.
         
         If statements are considered operators and contribute to
         cyclomatic complexity.
+
+        For cognitive complexity, an `else if` is a continuation of the
+        previous `if`: it adds 1 without the nesting increment, and so does a
+        final `else`.
         
         Args:
             node: A c_ast.If node representing an if statement.
         """
         self.add_McComplexity() # McCabe Complexity
 
+        # Cognitive Complexity
+        self.add_CoComplexity(nesting=not self.is_else_if)
+        self.is_else_if = False
+
         self.append_operator(node) # Halstead Metric
 
         #>>> Visit <<<#
         self.visit(node.cond)
 
         if node.iftrue != None:
-            self.visit(node.iftrue)
+            self.visit_nested(node.iftrue)
         if node.iffalse != None:
-            self.visit(node.iffalse)
+            if isinstance(node.iffalse, c_ast.If):
+                self.is_else_if = True
+                self.visit(node.iffalse)
+            else:
+                self.add_CoComplexity(nesting=False) # Cognitive Complexity
+                self.visit_nested(node.iffalse)
+
+    def visit_Switch(self, node: c_ast.Switch) -> None:
+        """Visits a Switch node.
+
+        Switch statements are not Halstead operators, they are only recorded
+        as control statements of the current function.
+
+        Args:
+            node: A c_ast.Switch node representing a switch statement.
+        """
+        self.append_statement("switch", node)
+        self.add_CoComplexity() # Cognitive Complexity
+
+        #>>> Visit <<<#
+        self.visit(node.cond)
+        self.visit_nested(node.stmt)
+
+    def visit_TernaryOp(self, node: c_ast.TernaryOp) -> None:
+        """Visits a TernaryOp node.
+
+        The ternary operator only contributes to cognitive complexity, as a
+        nestable conditional.
+
+        Args:
+            node: A c_ast.TernaryOp node representing a `?:` expression.
+        """
+        self.add_CoComplexity() # Cognitive Complexity
+
+        #>>> Visit <<<#
+        self.visit(node.cond)
+        self.visit_nested(node.iftrue)
+        self.visit_nested(node.iffalse)
+
+    def visit_Goto(self, node: c_ast.Goto) -> None:
+        """Visits a Goto node and records it as a control statement.
+
+        Args:
+            node: A c_ast.Goto node representing a goto statement.
+        """
+        self.append_statement("goto", node)
+        self.add_CoComplexity(nesting=False) # Cognitive Complexity
+
+    def visit_Break(self, node: c_ast.Break) -> None:
+        """Visits a Break node and records it as a control statement.
+
+        Args:
+            node: A c_ast.Break node representing a break statement.
+        """
+        self.append_statement("break", node)
+
+    def visit_Continue(self, node: c_ast.Continue) -> None:
+        """Visits a Continue node and records it as a control statement.
+
+        Args:
+            node: A c_ast.Continue node representing a continue statement.
+        """
+        self.append_statement("continue", node)
 
     def visit_Assignment(self, node: c_ast.Assignment) -> None:
         """Visits an Assignment node and processes it for metrics.
@@ -740,13 +1154,62 @@ class ParsedCode(c_ast.NodeVisitor):
             node: A c_ast.FuncDef node representing a function definition.
         """
         function_name: str      = self.get_node_value(node)
-        function     : Function = Function(function_name)
+        fingerprint  : str      = ""
+
+        #==> Reuse an identical function already visited <==#
+        if self.function_cache is not None:
+            fingerprint = FunctionCache.fingerprint(node, self.file_source,
+                                                    (self.current_node_type, self.sequences))
+            cached: CachedFunction | None = self.function_cache.get(fingerprint)
+
+            if cached is not None:
+                self.function_cache_hits += 1
+                self.reuse_function(cached, node.coord.line)
+                return
+
+        function: Function = Function(function_name, self.sequences)
+        function.fingerprint = fingerprint
         self.current_func = function
+        self.current_calls = []
         self.initialize_function(function)
 
+        #==> Reset cognitive complexity states <==#
+        self.nesting_level = 0
+        self.is_else_if    = False
+        self.logical_op    = None
+
         #>>> Visit <<<#
         self.visit(node.body)
 
+        if self.function_cache is not None:
+            self.function_cache.add(fingerprint,
+                                    CachedFunction(function.copy(-node.coord.line),
+                                                   self.current_calls, self.current_node_type))
+
+    def reuse_function(self, cached: CachedFunction, line: int) -> None:
+        """Adds a function from the `FunctionCache` as if it was visited.
+
+        The calls of the function are replayed into the call totals and the
+        call graph of the file.
+
+        Args:
+            cached: The cached result of an identical definition.
+            line: First line of the definition in this file.
+        """
+        function: Function = cached.function.copy(line)
+        self.current_func = function
+        self.initialize_function(function)
+
+        for callee in cached.calls:
+            self.total_func_calls += 1
+            self.distict_func_calls.add(callee)
+            self.call_graph.add_call(function.func_name, callee)
+
+        self.current_node_type = cached.node_type
+        self.nesting_level     = 0
+        self.is_else_if        = False
+        self.logical_op        = None
+
     def visit_PtrDecl(self, node: c_ast.PtrDecl) -> None:
         """Visits a PtrDecl node and processes it for metrics.
         
@@ -845,16 +1308,30 @@ class ParsedCode(c_ast.NodeVisitor):
         """Visits a BinaryOp node and processes it for metrics.
         
         Binary operators are considered operators.
+
+        For cognitive complexity, each sequence of like logical operators
+        adds 1: `a && b && c` adds 1, `a && b || c` adds 2.
         
         Args:
             node: A c_ast.BinaryOp node representing a binary operation.
         """
         self.append_operator(node) # Halstead Metric
+
+        # Cognitive Complexity
+        is_logical: bool       = node.op == "&&" or node.op == "||"
+        enclosing : str | None = self.logical_op
+
+        if is_logical and node.op != enclosing:
+            self.add_CoComplexity(nesting=False)
+
+        self.logical_op = node.op if is_logical else None
         
         #>>> Visit <<<#
         self.visit(node.left)
         self.visit(node.right)
 
+        self.logical_op = enclosing
+
     def visit_Constant(self, node: c_ast.Constant) -> None:
         """Visits a Constant node and processes it for metrics.
         
@@ -879,6 +1356,16 @@ class ParsedCode(c_ast.NodeVisitor):
         self.total_func_calls += 1
         self.distict_func_calls.add(self.get_node_value(node))
 
+        # |> Recursion, for cognitive complexity
+        if (self.current_func is not None and
+                self.get_node_value(node) == self.current_func.func_name):
+            self.add_CoComplexity(nesting=False)
+
+        # |> Call graph edge
+        if self.current_func is not None:
+            self.call_graph.add_call(self.current_func.func_name, self.get_node_value(node))
+            self.current_calls.append(self.get_node_value(node))
+
         self.append_operator(node) # Halstead Metric
 
         # |> Function call as operand
@@ -888,12 +1375,17 @@ class ParsedCode(c_ast.NodeVisitor):
         # |> Function args as operands
         self.current_node_type = "FuncCall"
 
+        #==> Arguments start new logical sequences <==#
+        enclosing: str | None = self.logical_op
+        self.logical_op = None
+
         #>>> Visit <<<#
         if node.args != None:
             for arg in node.args:
                 self.visit(arg)
 
         self.current_node_type = ""
+        self.logical_op        = enclosing
 
     def visit_ID(self, node: c_ast.ID) -> None:
         """Visits an ID node and processes it for metrics.
@@ -958,6 +1450,40 @@ class ParsedCode(c_ast.NodeVisitor):
         """
         return node.__class__.__name__
 
+    def get_callee_name(self, node: c_ast.Node) -> str:
+        """Extracts the name of the function called through an expression.
+
+        - ID: the function name (`f(x)`)
+        - StructRef: the member name (`o.f(x)`, `o->f(x)`)
+        - ArrayRef: the array name (`table[i](x)`)
+        - UnaryOp/Cast: the called pointer (`(*fp)(x)`)
+        - FuncCall: the function returning the pointer (`get()(x)`)
+
+        Any other expression is named by its node type.
+
+        Args:
+            node: The `name` of a FuncCall node.
+
+        Returns:
+            The name of the called function, always a string.
+        """
+        match(self.get_node_type(node)):
+
+            case "ID":
+                return node.name
+
+            case "StructRef":
+                return node.field.name
+
+            case "ArrayRef" | "FuncCall":
+                return self.get_callee_name(node.name)
+
+            case "UnaryOp" | "Cast":
+                return self.get_callee_name(node.expr)
+
+            case _:
+                return self.get_node_type(node)
+
     def get_node_value(self, node: c_ast.Node) -> str:
         """Extracts the value/name from a node.
         
@@ -992,7 +1518,7 @@ class ParsedCode(c_ast.NodeVisitor):
                 return node.name
 
             case "FuncCall":
-                return node.name.name
+                return self.get_callee_name(node.name)
 
             case "Constant":
                 return node.value
@@ -0,0 +1,437 @@
+import argparse
+import os
+import sys
+from contextlib       import ExitStack, redirect_stdout
+from typing           import Any, TextIO
+from Compsta          import Compsta
+from Comclass         import Comclass
+from utils.batch      import BatchRunner
+from utils.shard      import Shard
+from utils.telemetry  import Telemetry
+from utils.preprocess import Preprocessor
+from objects.function_cache import FunctionCache
+from utils.ast_cache  import ASTCache
+from objects.plugins  import MetricPlugin, load_plugin
+
+def get_parser() -> argparse.ArgumentParser:
+    """Builds the command line parser of the analyzer."""
+    parser = argparse.ArgumentParser(description="C Complexity Analyzer")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    #==> analyze <==#
+    analyze = commands.add_parser("analyze", help="Analyze a directory tree of `.i` files")
+    analyze.add_argument("input", help="Base directory of the exercises")
+    analyze.add_argument("output", help="Base output directory of the CSV files")
+    analyze.add_argument("--shard", metavar="i/N",
+                         help="Only analyze the i-th of N deterministic shards")
+    analyze.add_argument("--index", metavar="DB", help="Update the symbol index in DB")
+    analyze.add_argument("--functions", metavar="PATH",
+                         help="Stream per-function records to a .jsonl or .csv file")
+    analyze.add_argument("--format", choices=Compsta.PRINT_FORMATS, default="rich",
+                         help="Format of the per-file tables (default: rich)")
+    analyze.add_argument("--page-size", type=get_page_size,
+                         help="Print the per-file tables in pages of this many rows")
+    analyze.add_argument("--hotspots", type=int, metavar="K",
+                         help="Report the K most complex functions and files per metric")
+    analyze.add_argument("--store", metavar="DB",
+                         help="Upsert the file, function and directory metrics into DB")
+    analyze.add_argument("--duplicates", metavar="CSV",
+                         help="Report near-duplicate functions (to CSV) and files "
+                              "(to CSV_files.csv)")
+    analyze.add_argument("--function-cache", nargs="?", const="", metavar="DB",
+                         help="Reuse the metrics of identical functions across files, "
+                              "and across runs when DB is given")
+    analyze.add_argument("--ast-cache", metavar="DIR",
+                         help="Load the parsed ASTs from DIR, and store the new ones there")
+    analyze.add_argument("--plugin", action="append", default=[], metavar="NAME",
+                         help="Run a metric plugin in the same traversal: a built-in "
+                              "(nesting, pointers) or module:Class (repeatable)")
+    add_runner_arguments(analyze)
+    add_telemetry_arguments(analyze)
+    add_preprocess_arguments(analyze)
+
+    #==> consolidate <==#
+    consolidate = commands.add_parser("consolidate",
+                                      help="Export the means of every exercise folder to one CSV")
+    consolidate.add_argument("input", help="Directory with one folder per exercise")
+    consolidate.add_argument("csv", help="Path of the consolidated CSV")
+    consolidate.add_argument("--shard", metavar="i/N",
+                             help="Only analyze the i-th of N deterministic shards")
+    consolidate.add_argument("--files-dir",
+                             help="Also export the per-file CSVs of every folder here")
+    add_telemetry_arguments(consolidate)
+    add_preprocess_arguments(consolidate)
+
+    #==> archives <==#
+    archives = commands.add_parser("archives",
+                                   help="Analyze zip/tar archives without extracting them")
+    archives.add_argument("output", help="Base output directory of the CSV files")
+    archives.add_argument("archives", nargs="+", help="Archives, or directories of archives")
+    archives.add_argument("--workers", type=int, help="Archives analyzed at the same time")
+    archives.add_argument("--format", choices=Compsta.PRINT_FORMATS, default="rich",
+                          help="Format of the per-file tables (default: rich)")
+    archives.add_argument("--page-size", type=get_page_size,
+                          help="Print the per-file tables in pages of this many rows")
+    archives.add_argument("--store", metavar="DB",
+                          help="Upsert the file, function and directory metrics into DB")
+    add_telemetry_arguments(archives)
+    add_preprocess_arguments(archives)
+
+    #==> merge <==#
+    merge = commands.add_parser("merge", help="Merge the outputs of a sharded run")
+    merge.add_argument("output", help="Output directory of the merged CSV files")
+    merge.add_argument("shards", nargs="+", help="Output directories of every shard")
+    merge.add_argument("--consolidated", metavar="CSV",
+                       help="Also write the consolidated CSV of the merged run")
+
+    #==> query <==#
+    query = commands.add_parser("query", help="Run a SQL query on a results store")
+    query.add_argument("store", help="Path of the results store (see --store)")
+    query.add_argument("sql", help="SQL query, e.g. on the files, functions or directories table")
+
+    #==> find <==#
+    find = commands.add_parser("find", help="Find the occurrences of a symbol in a symbol index")
+    find.add_argument("index", help="Path of the symbol index (see --index)")
+    find.add_argument("symbol", help="Operator, operand or statement, e.g. malloc or while")
+    find.add_argument("--kind", choices=("operator", "operand", "statement"),
+                      help="Only match the symbol as this kind")
+    find.add_argument("--in-loop", action="store_true",
+                      help="Only report occurrences inside a loop")
+    find.add_argument("--files-only", action="store_true",
+                      help="Only list the files where the symbol occurs")
+
+    #==> diff <==#
+    diff = commands.add_parser("diff", help="Compare the functions of two versions of a file")
+    diff.add_argument("old", help="Old version (.c or .i file)")
+    diff.add_argument("new", help="New version (.c or .i file)")
+    diff.add_argument("--changed-only", action="store_true",
+                      help="Only report added, removed and changed functions")
+    diff.add_argument("--csv", metavar="PATH", help="Also export the deltas to a CSV file")
+    add_preprocess_arguments(diff)
+
+    #==> lex <==#
+    lex = commands.add_parser("lex", help="Approximate Halstead metrics from the tokens only")
+    lex.add_argument("input", help="Base directory of the `.i` files")
+    lex.add_argument("output", help="Path of the CSV with one row per file")
+    lex.add_argument("--accuracy", action="store_true",
+                     help="Instead, compare with the AST mode on INPUT (a reference corpus) "
+                          "and write the per-file values to OUTPUT")
+
+    #==> profile <==#
+    profile = commands.add_parser("profile",
+                                  help="Measure the memory allocated by every phase of the analysis")
+    profile.add_argument("input", help="Base directory of the `.i` files")
+    profile.add_argument("output", help="Base output directory of the CSV files")
+    profile.add_argument("--top", type=int, default=10, metavar="K",
+                         help="Allocation sites reported per file, phase and directory")
+    profile.add_argument("--frames", type=int, default=1,
+                         help="Frames stored per allocation by tracemalloc")
+
+    #==> stress <==#
+    stress = commands.add_parser("stress",
+                                 help="Check that time and memory grow linearly with the input")
+    stress.add_argument("--shape", action="append", metavar="NAME",
+                        help="Only run this ParsedCode shape (repeatable): functions, "
+                             "nesting, expression or file")
+    stress.add_argument("--no-directory", action="store_true",
+                        help="Skip the Compsta case")
+    stress.add_argument("--repeat", type=int, default=3,
+                        help="Runs per size; the fastest one is kept")
+    stress.add_argument("--time-threshold", type=float, default=1.3,
+                        help="Maximum fitted exponent of the runtime")
+    stress.add_argument("--memory-threshold", type=float, default=1.2,
+                        help="Maximum fitted exponent of the peak memory")
+    stress.add_argument("--csv", help="Also write the measures of every size to this CSV")
+
+    #==> summarize <==#
+    summarize = commands.add_parser("summarize",
+                                    help="Merge the metric summaries up an output tree")
+    summarize.add_argument("output", help="Output directory of an `analyze` run")
+    summarize.add_argument("csv", help="Path of the CSV with the summary of every folder")
+
+    return parser
+
+def get_page_size(value: str) -> int:
+    """Parses `--page-size`, which must be a positive number of rows."""
+    page_size: int = int(value)
+    if page_size < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {page_size}")
+
+    return page_size
+
+def add_runner_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the options of the `BatchRunner`."""
+    parser.add_argument("--workers", type=int,
+                        help="Analyze files in this many worker processes")
+    parser.add_argument("--timeout", type=float,
+                        help="Quarantine files taking longer than this many seconds")
+    parser.add_argument("--max-files-per-worker", type=int, default=200)
+    parser.add_argument("--max-rss-mb", type=float)
+    parser.add_argument("--huge-file-mb", type=float)
+
+def add_telemetry_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the options of the `Telemetry`."""
+    parser.add_argument("--progress", type=float, metavar="SECONDS",
+                        help="Print files/sec, ETA, utilization and errors every SECONDS")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="Write the same counters to a Prometheus textfile")
+
+def add_preprocess_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the options of the `Preprocessor`."""
+    parser.add_argument("--preprocess", metavar="FAKE_HEADERS",
+                        help="Analyze the .c files, piping gcc -E into the parser "
+                             "(FAKE_HEADERS is pycparser's fake_libc_include)")
+    parser.add_argument("--cc", default="gcc", help="Preprocessor command (default: gcc)")
+    parser.add_argument("--keep-i", action="store_true",
+                        help="Also write the .i files when preprocessing")
+
+def get_output(args: argparse.Namespace, stack: ExitStack) -> TextIO:
+    """Returns the stream of the per-file rows.
+
+    With `--format tsv` (or quiet), stdout only carries the rows: every other
+    message (progress, created CSVs, reports) is sent to stderr.
+    """
+    output: TextIO = sys.stdout
+    if args.format in ("tsv", "quiet"):
+        stack.enter_context(redirect_stdout(sys.stderr))
+
+    return output
+
+def get_preprocessor(args: argparse.Namespace) -> Preprocessor | None:
+    if args.preprocess is None:
+        return None
+
+    return Preprocessor(args.preprocess, args.cc, write_i=args.keep_i)
+
+def get_telemetry(args: argparse.Namespace) -> Telemetry | None:
+    """Creates a `Telemetry` when progress or a metrics file is requested."""
+    if args.progress is None and args.metrics_file is None:
+        return None
+
+    return Telemetry(args.metrics_file, args.progress or 10.0, show=args.progress is not None)
+
+def get_function_cache(args: argparse.Namespace) -> FunctionCache | None:
+    if args.function_cache is None:
+        return None
+
+    return FunctionCache(args.function_cache or None)
+
+def get_runner(args: argparse.Namespace, function_cache: FunctionCache | None = None,
+               ast_cache: ASTCache | None = None,
+               plugins: list[type[MetricPlugin]] | None = None,
+               sequences: bool = False) -> BatchRunner | None:
+    """Creates a `BatchRunner` when any of its options is given."""
+    if args.workers is None and args.timeout is None:
+        return None
+
+    return BatchRunner(workers=args.workers,
+                       max_files_per_worker=args.max_files_per_worker,
+                       max_rss_mb=args.max_rss_mb,
+                       huge_file_mb=args.huge_file_mb,
+                       timeout=args.timeout,
+                       preprocessor=get_preprocessor(args),
+                       function_cache=function_cache,
+                       ast_cache=ast_cache,
+                       plugins=plugins,
+                       sequences=sequences)
+
+def analyze(args: argparse.Namespace) -> None:
+    shard: Shard | None = Shard.parse(args.shard, args.input) if args.shard else None
+
+    with ExitStack() as stack:
+        output: TextIO = get_output(args, stack)
+
+        function_cache: FunctionCache | None = get_function_cache(args)
+        if function_cache is not None:
+            stack.enter_context(function_cache)
+
+        plugins  : list[type[MetricPlugin]] = [load_plugin(spec) for spec in args.plugin]
+        ast_cache: ASTCache | None          = ASTCache(args.ast_cache) if args.ast_cache else None
+        runner   : BatchRunner | None       = get_runner(args, function_cache, ast_cache, plugins,
+                                                         sequences=bool(args.duplicates))
+        consumers: list[Any]                = []
+
+        if runner is not None:
+            stack.enter_context(runner)
+
+        telemetry: Telemetry | None = get_telemetry(args)
+        if telemetry is not None:
+            stack.enter_context(telemetry)
+
+        if args.index:
+            from objects.symbol_index import SymbolIndex
+            consumers.append(stack.enter_context(SymbolIndex(args.index)))
+
+        if args.functions:
+            from objects.function_stream import FunctionStream
+            consumers.append(stack.enter_context(FunctionStream(args.functions)))
+
+        if args.store:
+            from objects.results_store import ResultStore
+            consumers.append(stack.enter_context(ResultStore(args.store)))
+
+        hotspots = None
+        if args.hotspots:
+            from objects.hotspots import HotspotTracker
+            hotspots = HotspotTracker(args.hotspots)
+            consumers.append(hotspots)
+
+        duplicates = None
+        if args.duplicates:
+            from objects.duplicates import DuplicateDetector
+            duplicates = DuplicateDetector()
+            consumers.append(duplicates)
+
+        Compsta.process_directory(args.input, args.output, consumers, runner, shard,
+                                  args.format, args.page_size, telemetry,
+                                  get_preprocessor(args), function_cache, ast_cache, plugins,
+                                  output, sequences=bool(args.duplicates))
+
+        if hotspots is not None:
+            hotspots.print_report()
+            hotspots.export_csv(os.path.join(args.output, ""), "hotspots")
+
+        if duplicates is not None:
+            directory, name = os.path.split(args.duplicates)
+            name = os.path.splitext(name)[0]
+
+            duplicates.print_pairs("function")
+            duplicates.print_pairs("file")
+            duplicates.export_csv(os.path.join(directory, ""), name, "function")
+            duplicates.export_csv(os.path.join(directory, ""), f"{name}_files", "file")
+
+def consolidate(args: argparse.Namespace) -> None:
+    shard: Shard | None = Shard.parse(args.shard, args.input) if args.shard else None
+
+    with ExitStack() as stack:
+        telemetry: Telemetry | None = get_telemetry(args)
+        if telemetry is not None:
+            stack.enter_context(telemetry)
+
+        Comclass().parse_folder(args.input, args.csv, shard, args.files_dir, telemetry,
+                                get_preprocessor(args))
+
+def analyze_archives(args: argparse.Namespace) -> None:
+    from utils.archive import is_archive
+
+    paths: list[str] = []
+    for path in args.archives:
+        if os.path.isdir(path):
+            paths += [os.path.join(path, name) for name in sorted(os.listdir(path))
+                      if is_archive(os.path.join(path, name))]
+        else:
+            paths.append(path)
+
+    with ExitStack() as stack:
+        output   : TextIO    = get_output(args, stack)
+        consumers: list[Any] = []
+
+        telemetry: Telemetry | None = get_telemetry(args)
+        if telemetry is not None:
+            stack.enter_context(telemetry)
+
+        if args.store:
+            from objects.results_store import ResultStore
+            consumers.append(stack.enter_context(ResultStore(args.store)))
+
+        Compsta.process_archives(paths, args.output, consumers, workers=args.workers,
+                                 preprocessor=get_preprocessor(args), format=args.format,
+                                 page_size=args.page_size, telemetry=telemetry,
+                                 output=output)
+
+def merge(args: argparse.Namespace) -> None:
+    Compsta.merge_shards(args.shards, os.path.join(args.output, ""), args.consolidated)
+
+def query(args: argparse.Namespace) -> None:
+    from objects.results_store import ResultStore
+
+    with ResultStore(args.store) as store:
+        store.print_query(args.sql)
+
+def find(args: argparse.Namespace) -> None:
+    from objects.symbol_index import SymbolIndex
+
+    if not os.path.isfile(args.index):
+        raise ValueError(f"No symbol index at '{args.index}'")
+
+    with SymbolIndex(args.index) as index:
+        if args.files_only:
+            for path in index.files_with(args.symbol, args.kind, args.in_loop):
+                print(path)
+        else:
+            index.print_matches(args.symbol, args.kind, args.in_loop)
+
+def diff(args: argparse.Namespace) -> None:
+    from objects.function_diff import FunctionDiff
+
+    function_diff = FunctionDiff.from_files(args.old, args.new, get_preprocessor(args))
+    function_diff.print_report(args.changed_only)
+
+    if args.csv:
+        directory, name = os.path.split(args.csv)
+        function_diff.export_csv(os.path.join(directory, ""), os.path.splitext(name)[0])
+
+def lex(args: argparse.Namespace) -> None:
+    from utils.lexer_halstead import LexerAccuracy, lex_directory
+
+    if not args.accuracy:
+        lex_directory(args.input, args.output)
+        return
+
+    accuracy = LexerAccuracy(args.input)
+    accuracy.print_report()
+
+    directory, name = os.path.split(args.output)
+    accuracy.export_csv(os.path.join(directory, ""), os.path.splitext(name)[0])
+
+def profile(args: argparse.Namespace) -> None:
+    from utils.alloc_profile import profile_directory
+
+    profile_directory(args.input, args.output, args.top, args.frames)
+
+def stress(args: argparse.Namespace) -> None:
+    from utils.stress import DIRECTORY_SIZES, StressSuite
+
+    suite = StressSuite(args.shape, args.repeat, args.time_threshold, args.memory_threshold,
+                        None if args.no_directory else DIRECTORY_SIZES)
+    suite.run()
+    suite.print_report()
+
+    if args.csv:
+        directory, name = os.path.split(args.csv)
+        suite.export_csv(os.path.join(directory, ""), os.path.splitext(name)[0])
+
+    if not suite.passed:
+        raise SystemExit(1)
+
+def summarize(args: argparse.Namespace) -> None:
+    Comclass().export_tree_summary(args.output, args.csv)
+
+def main() -> None:
+    parser = get_parser()
+    args   = parser.parse_args()
+
+    # A trailing slash (`analyze Examples/ Output/`) would be doubled in the
+    # file paths, which then no longer match the line markers of the `.i`
+    # files
+    if getattr(args, "input", None) is not None:
+        args.input = os.path.normpath(args.input)
+
+    try:
+        {"analyze"    : analyze,
+         "consolidate": consolidate,
+         "archives"   : analyze_archives,
+         "merge"      : merge,
+         "query"      : query,
+         "find"       : find,
+         "diff"       : diff,
+         "lex"        : lex,
+         "profile"    : profile,
+         "stress"     : stress,
+         "summarize"  : summarize}[args.command](args)
+
+    except ValueError as e:  # Invalid shard specification or incomplete merge
+        parser.error(str(e))
+
+if __name__ == "__main__":
+    main()
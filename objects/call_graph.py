@@ -0,0 +1,221 @@
+from array  import array
+from typing import Any
+
+class CallGraph:
+    """Compact call graph of a file.
+
+    Calls are recorded during the AST traversal as (caller, callee) pairs of
+    node ids. `finalize` turns them into a CSR (compressed sparse row)
+    adjacency: the distinct callees of node `v` are
+    `targets[offsets[v]:offsets[v + 1]]`. All arrays are `array("i")`, so the
+    graph is small when pickled next to the other metrics.
+
+    Every metric is computed in O(V + E):
+        - fan_out: number of distinct functions called by a function.
+        - fan_in: number of distinct functions calling a function.
+        - scc: strongly connected component of every node (Tarjan).
+        - recursive: the function calls itself, directly or through a cycle.
+        - call_depth: longest chain of calls starting at the function, in the
+          graph of components (a cycle counts as a single step).
+
+    Callees that are not defined in the file (e.g. `printf`) are nodes too, so
+    they count in fan-out and call depth.
+
+    Attributes:
+        names: Name of every node.
+        ids: Node id of every name.
+        sources: Caller of every recorded call.
+        destinations: Callee of every recorded call.
+        offsets: CSR row offsets, `len(names) + 1` items.
+        targets: CSR distinct callees.
+        fan_in, fan_out, scc, recursive, call_depth: Per-node metrics.
+        number_of_cycles: Components with a cycle (including self-calls).
+    """
+
+    def __init__(self) -> None:
+        self.names: list[str]      = list()
+        self.ids  : dict[str, int] = dict()
+
+        self.sources     : array = array("i")
+        self.destinations: array = array("i")
+
+        self.offsets   : array = array("i", [0])
+        self.targets   : array = array("i")
+        self.fan_in    : array = array("i")
+        self.fan_out   : array = array("i")
+        self.scc       : array = array("i")
+        self.recursive : array = array("b")
+        self.call_depth: array = array("i")
+
+        self.number_of_cycles: int = 0
+
+    def __getstate__(self) -> dict[str, Any]:
+        state: dict[str, Any] = self.__dict__.copy()
+        state.pop("ids", None)  # Rebuilt from `names`
+
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.ids = {name: node for node, name in enumerate(self.names)}
+
+    def get_id(self, name: str) -> int:
+        node: int | None = self.ids.get(name)
+
+        if node is None:
+            node = self.ids[name] = len(self.names)
+            self.names.append(name)
+
+        return node
+
+    def add_call(self, caller: str, callee: str) -> None:
+        self.sources.append(self.get_id(caller))
+        self.destinations.append(self.get_id(callee))
+
+    #==> Build <==#############################################################
+
+    def finalize(self) -> None:
+        """Builds the CSR adjacency and computes every metric."""
+        size: int = len(self.names)
+
+        #==> Distinct edges, grouped by caller (counting sort) <==#
+        edges: list[tuple[int, int]] = list(dict.fromkeys(zip(self.sources, self.destinations)))
+
+        self.offsets = array("i", [0]) * (size + 1)
+        for source, _ in edges:
+            self.offsets[source + 1] += 1
+        for node in range(size):
+            self.offsets[node + 1] += self.offsets[node]
+
+        position: array = self.offsets[:-1]
+        self.targets = array("i", [0]) * len(edges)
+        for source, destination in edges:
+            self.targets[position[source]] = destination
+            position[source] += 1
+
+        #==> Fan-in and fan-out <==#
+        self.fan_out = array("i", [self.offsets[node + 1] - self.offsets[node]
+                                   for node in range(size)])
+        self.fan_in  = array("i", [0]) * size
+        for target in self.targets:
+            self.fan_in[target] += 1
+
+        self.find_components()
+        self.calculate_depth()
+
+    def find_components(self) -> None:
+        """Tarjan's strongly connected components, without recursion.
+
+        Components are numbered in the order Tarjan completes them, which is a
+        reverse topological order: a component only calls components with a
+        lower number (or itself).
+        """
+        size    : int        = len(self.names)
+        index   : list[int]  = [-1] * size
+        lowlink : list[int]  = [0] * size
+        on_stack: list[bool] = [False] * size
+        stack   : list[int]  = []
+        counter : int        = 0
+
+        self.scc = array("i", [-1]) * size
+        components: int = 0
+
+        for root in range(size):
+            if index[root] != -1:
+                continue
+
+            #==> Iterative DFS: (node, position of the next edge) <==#
+            work: list[list[int]] = [[root, self.offsets[root]]]
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+
+            while work:
+                frame = work[-1]
+                node, edge = frame
+
+                if edge < self.offsets[node + 1]:
+                    frame[1] += 1
+                    target: int = self.targets[edge]
+
+                    if index[target] == -1:
+                        index[target] = lowlink[target] = counter
+                        counter += 1
+                        stack.append(target)
+                        on_stack[target] = True
+                        work.append([target, self.offsets[target]])
+
+                    elif on_stack[target]:
+                        lowlink[node] = min(lowlink[node], index[target])
+                    continue
+
+                work.pop()
+                if work:
+                    parent: int = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                if lowlink[node] == index[node]:
+                    while True:
+                        member: int = stack.pop()
+                        on_stack[member] = False
+                        self.scc[member] = components
+                        if member == node:
+                            break
+                    components += 1
+
+        #==> Recursion: component with several nodes, or a self-call <==#
+        component_size: list[int] = [0] * components
+        for component in self.scc:
+            component_size[component] += 1
+
+        cyclic: list[bool] = [count > 1 for count in component_size]
+        for node in range(size):
+            if node in self.targets[self.offsets[node]:self.offsets[node + 1]]:
+                cyclic[self.scc[node]] = True
+
+        self.recursive        = array("b", [cyclic[self.scc[node]] for node in range(size)])
+        self.number_of_cycles = sum(cyclic)
+
+    def calculate_depth(self) -> None:
+        """Longest call chain from every node, in the graph of components."""
+        size      : int       = len(self.names)
+        components: int       = max(self.scc, default=-1) + 1
+        depth     : list[int] = [0] * components
+
+        members: list[list[int]] = [[] for _ in range(components)]
+        for node in range(size):
+            members[self.scc[node]].append(node)
+
+        # Callees always have a lower component number (see find_components)
+        for component in range(components):
+            for node in members[component]:
+                for target in self.targets[self.offsets[node]:self.offsets[node + 1]]:
+                    if self.scc[target] != component:
+                        depth[component] = max(depth[component], depth[self.scc[target]] + 1)
+
+        self.call_depth = array("i", [depth[self.scc[node]] for node in range(size)])
+
+    #==> Queries <==###########################################################
+
+    def callees(self, name: str) -> list[str]:
+        """Returns the distinct functions called by `name`."""
+        node: int | None = self.ids.get(name)
+        if node is None:
+            return []
+
+        return [self.names[target]
+                for target in self.targets[self.offsets[node]:self.offsets[node + 1]]]
+
+    def get_metrics(self, name: str) -> dict[str, int]:
+        """Returns fan-in, fan-out, recursion and call depth of a function."""
+        node: int | None = self.ids.get(name)
+        if node is None:  # Never calls nor is called
+            return {"fan_in": 0, "fan_out": 0, "recursive": 0, "call_depth": 0}
+
+        return {
+            "fan_in"    : self.fan_in[node],
+            "fan_out"   : self.fan_out[node],
+            "recursive" : self.recursive[node],
+            "call_depth": self.call_depth[node],
+        }
@@ -0,0 +1,254 @@
+import csv
+import re
+from os           import makedirs
+from random       import Random
+from hashlib      import blake2b
+from typing       import Any, Iterable
+from rich.console import Console
+from rich.table   import Table
+from rich.style   import Style
+from rich         import box
+from objects.function import Function
+
+###############################################################################
+# |> constants: MinHash parameters
+#
+# MERSENNE_PRIME: Modulus of the universal hash family (2^61 - 1).
+# MAX_HASH      : Shingle hashes are truncated to 32 bits, so the products
+#                 a * h stay small enough to be fast.
+###############################################################################
+MERSENNE_PRIME: int = (1 << 61) - 1
+MAX_HASH      : int = (1 << 32) - 1
+
+IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+
+class DuplicateDetector:
+    """Near-duplicate detection of functions and files with MinHash and LSH.
+
+    Every function is reduced to the set of shingles (k consecutive tokens) of
+    its ordered operator/operand stream (`Function.sequence`). A file is the
+    union of the shingles of its functions. Each set is summarized by a MinHash
+    signature, and signatures are split in bands: items that share any band
+    land in the same LSH bucket and become candidate pairs. Only candidates are
+    compared, so a corpus is processed in roughly linear time instead of
+    comparing every pair.
+
+    The detector is a `Compsta` consumer: it keeps only the signatures, never
+    the parsed files. The files must be analyzed with `sequences=True` (see
+    `Compsta`), since the sequences are not recorded otherwise.
+
+    Attributes:
+        num_perm: Signature length (number of hash functions).
+        bands: Number of LSH bands. `num_perm` must be a multiple of it.
+        rows: Signature values per band.
+        shingle_size: Number of consecutive tokens in a shingle.
+        threshold: Minimum estimated Jaccard similarity of a reported pair.
+        min_tokens: Functions with fewer tokens are ignored (trivial functions
+            such as getters would match everywhere).
+        normalize_operands: Replace identifier operands by a placeholder, so
+            renaming variables does not hide a copy.
+        max_bucket_size: Buckets with more items are treated as boilerplate
+            (e.g. starter code) and do not generate candidates.
+        functions: Function signatures keyed by (file, function name).
+        files: File signatures keyed by file.
+    """
+
+    def __init__(self,
+                 num_perm          : int   = 64,
+                 bands             : int   = 16,
+                 shingle_size      : int   = 4,
+                 threshold         : float = 0.8,
+                 min_tokens        : int   = 20,
+                 normalize_operands: bool  = False,
+                 max_bucket_size   : int   = 1000,
+                 seed              : int   = 1) -> None:
+        if num_perm % bands != 0:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+
+        self.num_perm          : int   = num_perm
+        self.bands             : int   = bands
+        self.rows              : int   = num_perm // bands
+        self.shingle_size      : int   = shingle_size
+        self.threshold         : float = threshold
+        self.min_tokens        : int   = min_tokens
+        self.normalize_operands: bool  = normalize_operands
+        self.max_bucket_size   : int   = max_bucket_size
+
+        #==> Hash family: h_i(x) = (a_i * x + b_i) mod p <==#
+        random = Random(seed)
+        self.permutations: list[tuple[int, int]] = [
+            (random.randrange(1, MERSENNE_PRIME), random.randrange(0, MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+        #==> Signatures <==#
+        self.functions: dict[tuple[str, str], tuple[int, ...]] = dict()
+        self.files    : dict[str, tuple[int, ...]]             = dict()
+
+    #==> Consumer <==##########################################################
+
+    def add_file(self, parsed_code: Any) -> None:
+        """Computes the signatures of a parsed file and of its functions.
+
+        Args:
+            parsed_code: A `ParsedCode` object without errors.
+        """
+        file_shingles: set[int] = set()
+
+        for function in parsed_code.functions:
+            if function.sequence is None:
+                raise ValueError(f"'{parsed_code.file_source}' was analyzed without "
+                                 "token sequences (see `ParsedCode` sequences)")
+
+            if len(function.sequence) < self.min_tokens:
+                continue
+
+            shingles: set[int] = self.get_shingles(function)
+            file_shingles |= shingles
+
+            key: tuple[str, str] = (parsed_code.file_source, function.func_name)
+            self.functions[key] = self.get_signature(shingles)
+
+        if file_shingles:
+            self.files[parsed_code.file_source] = self.get_signature(file_shingles)
+
+    #==> MinHash <==###########################################################
+
+    def get_tokens(self, function: Function) -> list[str]:
+        """Returns the token stream of a function, normalized if requested."""
+        if not self.normalize_operands:
+            return function.sequence
+
+        return ["$id" if kind == Function.OPERAND and IDENTIFIER.fullmatch(token)
+                else token
+                for token, kind in zip(function.sequence, function.sequence_kinds)]
+
+    def get_shingles(self, function: Function) -> set[int]:
+        """Hashes every run of `shingle_size` consecutive tokens to 32 bits."""
+        tokens  : list[str] = self.get_tokens(function)
+        size    : int       = min(self.shingle_size, len(tokens))
+        shingles: set[int]  = set()
+
+        for start in range(len(tokens) - size + 1):
+            shingle: bytes = "\x1f".join(tokens[start:start + size]).encode()
+            shingles.add(int.from_bytes(blake2b(shingle, digest_size=4).digest(), "little"))
+
+        return shingles
+
+    def get_signature(self, shingles: Iterable[int]) -> tuple[int, ...]:
+        """Computes the MinHash signature of a set of shingle hashes."""
+        hashes: list[int] = list(shingles)
+
+        return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) & MAX_HASH
+                     for a, b in self.permutations)
+
+    def similarity(self, first: tuple[int, ...], second: tuple[int, ...]) -> float:
+        """Estimates the Jaccard similarity of two signatures."""
+        return sum(x == y for x, y in zip(first, second)) / self.num_perm
+
+    #==> LSH <==###############################################################
+
+    def ranked_pairs(self, level: str = "function") -> list[tuple[Any, Any, float]]:
+        """Finds the near-duplicate pairs of functions or files.
+
+        Args:
+            level: "function" or "file".
+
+        Returns:
+            A list of (first, second, similarity) tuples sorted by decreasing
+            similarity, then by name. Functions of the same file are never
+            paired.
+        """
+        signatures: dict[Any, tuple[int, ...]] = (self.functions if level == "function"
+                                                  else self.files)
+        keys      : list[Any]                  = list(signatures)
+
+        #==> Bucket every band of every signature <==#
+        buckets: dict[tuple, list[int]] = dict()
+        for index, key in enumerate(keys):
+            signature: tuple[int, ...] = signatures[key]
+            for band in range(self.bands):
+                start: int = band * self.rows
+                buckets.setdefault((band, signature[start:start + self.rows]), []).append(index)
+
+        #==> Candidates share at least one bucket <==#
+        candidates: set[tuple[int, int]] = set()
+        for members in buckets.values():
+            if len(members) < 2 or len(members) > self.max_bucket_size:
+                continue
+
+            for i, first in enumerate(members):
+                for second in members[i + 1:]:
+                    candidates.add((first, second))
+
+        #==> Verify candidates with the full signature <==#
+        pairs: list[tuple[Any, Any, float]] = []
+        for first, second in candidates:
+            if level == "function" and keys[first][0] == keys[second][0]:
+                continue
+
+            score: float = self.similarity(signatures[keys[first]], signatures[keys[second]])
+            if score >= self.threshold:
+                pairs.append((keys[first], keys[second], score))
+
+        pairs.sort(key=lambda pair: (-pair[2], self.format_key(pair[0]), self.format_key(pair[1])))
+
+        return pairs
+
+    #==> Report <==############################################################
+
+    def print_pairs(self, level: str = "function", limit: int = 50) -> None:
+        """Prints the most similar pairs in a formatted table.
+
+        Args:
+            level: "function" or "file".
+            limit: Maximum number of pairs to show.
+        """
+        title: str = f"[bold][#00ffae]Near-duplicate {level}s[/]"
+        border_style: Style = Style(color="#000000", bold=True)
+
+        table = Table(title=title,
+                      box=box.ROUNDED,
+                      show_header=True,
+                      header_style="bold #ffee00",
+                      border_style=border_style,
+                      )
+
+        table.add_column("Rank", style="cyan", justify="right")
+        table.add_column("First", style="#1cffa0")
+        table.add_column("Second", style="#1cffa0")
+        table.add_column("Similarity", style="#1cffa0", justify="right")
+
+        for rank, (first, second, score) in enumerate(self.ranked_pairs(level)[:limit], 1):
+            table.add_row(str(rank), self.format_key(first), self.format_key(second),
+                          f"{score:.2f}")
+
+        Console().print(table)
+
+    def export_csv(self, dir: str, filename: str, level: str = "function") -> None:
+        """Exports the ranked pairs to a CSV file.
+
+        Args:
+            dir: Output directory path.
+            filename: Output filename without extension.
+            level: "function" or "file".
+        """
+        file_name: str = f"{dir}{filename}"
+
+        data: list[list[Any]] = [["Rank", "First", "Second", "Similarity"]]
+        for rank, (first, second, score) in enumerate(self.ranked_pairs(level), 1):
+            data.append([rank, self.format_key(first), self.format_key(second), score])
+
+        makedirs(dir, exist_ok=True)
+
+        with open(f"{file_name}.csv", mode="w", newline="") as file:
+            csv.writer(file).writerows(data)
+
+        Console().print(f"Create CSV: {file_name}", style="bold green")
+
+    @staticmethod
+    def format_key(key: Any) -> str:
+        """Formats a file path or a (file, function) key for the reports."""
+        if isinstance(key, tuple):
+            return f"{key[0]}:{key[1]}"
+        return key
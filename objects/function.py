@@ -1,4 +1,5 @@
 from pycparser import c_ast
+from typing    import Any
 from math      import log2
 from rich.console import Console
 from rich.table   import Table
@@ -7,7 +8,11 @@ from rich         import box
 
 class Function:
 
-    def __init__(self, func_name: str) -> None:
+    #==> Sequence kinds <==#
+    OPERATOR: int = 0
+    OPERAND : int = 1
+
+    def __init__(self, func_name: str, sequences: bool = False) -> None:
         #==> Function info <==#
         self.func_name: str = func_name
         self.calls    : int = 0
@@ -32,6 +37,39 @@ class Function:
         ######################################################################
         self.operators: dict[str, list[int]] = dict()
 
+        #######################################################################
+        # |> variable: self.statements
+        #
+        # Dictionary to store control statements that are not Halstead
+        # operators (goto, break, continue, switch).
+        #
+        # Keys  : Statement.
+        # Values: Lists of statement ocurrence lines.
+        #######################################################################
+        self.statements: dict[str, list[int]] = dict()
+
+        #######################################################################
+        # |> variable: self.in_loop
+        #
+        # Dictionary to store the occurrences found inside a loop.
+        #
+        # Keys  : Tuple (kind, symbol), kind is "operator", "operand" or
+        #         "statement".
+        # Values: Lists of ocurrence lines inside a loop.
+        #######################################################################
+        self.in_loop: dict[tuple[str, str], list[int]] = dict()
+
+        #######################################################################
+        # |> variable: self.sequence
+        #
+        # Operators and operands in the order they were visited. The kind of
+        # each entry is kept in `self.sequence_kinds`, one byte per entry:
+        # OPERATOR or OPERAND. Only recorded when `sequences` is set (for the
+        # `DuplicateDetector`); None otherwise.
+        #######################################################################
+        self.sequence      : list[str] | None = list() if sequences else None
+        self.sequence_kinds: bytearray | None = bytearray() if sequences else None
+
         #==> Ciclomatic Complexity <==#
         self.total_mcc: int = 1 # Total McCabe Complexity
 
@@ -58,6 +96,15 @@ class Function:
         #==> Cognitive Complexity <==#
         self.cognitive_complexity: int = 0
 
+        #==> Call Graph (see `objects.call_graph`) <==#
+        self.fan_in    : int = 0  # Distinct functions calling this one.
+        self.fan_out   : int = 0  # Distinct functions called by this one.
+        self.recursive : int = 0  # 1 if it calls itself, directly or not.
+        self.call_depth: int = 0  # Longest chain of calls from this function.
+
+        #==> Structural fingerprint (see `objects.function_cache`) <==#
+        self.fingerprint: str = ""
+
     #===> Utils Methods <=====================================================#
     def table_operators(self) -> Table:
         """
@@ -103,8 +150,69 @@ class Function:
 
         return table
 
+    def as_dict(self) -> dict[str, int | float | str]:
+        """
+        Return the function metrics as a flat dictionary, without the
+        occurrence lists.
+        """
+        return {
+            "function"            : self.func_name,
+            "n1"                  : self.n1,
+            "n2"                  : self.n2,
+            "N1"                  : self.N1,
+            "N2"                  : self.N2,
+            "vocabulary"          : self.vocabulary,
+            "length"              : self.length,
+            "estimated_len"       : self.estimated_len,
+            "volume"              : self.volume,
+            "difficulty"          : self.difficulty,
+            "estimated_level"     : self.estimated_level,
+            "intelligence"        : self.intelligence,
+            "effort"              : self.effort,
+            "time_required"       : self.time_required,
+            "delivered_bugs"      : self.delivered_bugs,
+            "total_mcc"           : self.total_mcc,
+            "cognitive_complexity": self.cognitive_complexity,
+            "fan_in"              : self.fan_in,
+            "fan_out"             : self.fan_out,
+            "recursive"           : self.recursive,
+            "call_depth"          : self.call_depth,
+        }
+
     #===> Metric Methods <====================================================#
 
+    def copy(self, line_offset: int = 0) -> "Function":
+        """
+        Return a copy of the collected occurrences and of the metrics counted
+        while visiting, with every line shifted by `line_offset`. Halstead
+        and call graph metrics are calculated afterwards, so they are not
+        copied.
+
+        :param line_offset: Number added to every occurrence line.
+        """
+        function: Function = Function(self.func_name, self.sequence is not None)
+
+        def shift(symbols: dict[Any, list[int]]) -> dict[Any, list[int]]:
+            return {symbol: [line + line_offset for line in lines]
+                    for symbol, lines in symbols.items()}
+
+        function.operators      = shift(self.operators)
+        function.operands       = shift(self.operands)
+        function.statements     = shift(self.statements)
+        function.in_loop        = shift(self.in_loop)
+        if self.sequence is not None:
+            function.sequence       = self.sequence.copy()
+            function.sequence_kinds = bytearray(self.sequence_kinds)
+
+        function.n1, function.n2 = self.n1, self.n2
+        function.N1, function.N2 = self.N1, self.N2
+
+        function.total_mcc            = self.total_mcc
+        function.cognitive_complexity = self.cognitive_complexity
+        function.fingerprint          = self.fingerprint
+
+        return function
+
     def add_CoC(self, value: int) -> None:
         self.cognitive_complexity += value
 
@@ -139,6 +247,37 @@ class Function:
             self.n1 += 1
             self.N1 += 1
 
+        if self.sequence is not None:
+            self.sequence.append(str(operator))
+            self.sequence_kinds.append(self.OPERATOR)
+
+    def add_statement(self, statement: str, line: int) -> None:
+        """
+        Add a control statement to the function.
+
+        :param statement: The statement keyword.
+        :param line     : The line of the statement ocurrency.
+        """
+        if statement in self.statements.keys():
+            self.statements[statement].append(line)
+        else:
+            self.statements.update({statement: [line]})
+
+    def add_loop_occurrence(self, kind: str, symbol: str, line: int) -> None:
+        """
+        Mark an occurrence of the function as being inside a loop.
+
+        :param kind  : "operator", "operand" or "statement".
+        :param symbol: The string of the symbol.
+        :param line  : The line of the ocurrency.
+        """
+        key: tuple[str, str] = (kind, symbol)
+
+        if key in self.in_loop.keys():
+            self.in_loop[key].append(line)
+        else:
+            self.in_loop.update({key: [line]})
+
     def add_operand(self, operand: str, line: int) -> None:
         """
         Add a operand to the function.
@@ -154,4 +293,8 @@ class Function:
             self.n2 += 1
             self.N2 += 1
 
+        if self.sequence is not None:
+            self.sequence.append(str(operand))
+            self.sequence_kinds.append(self.OPERAND)
+
 
@@ -0,0 +1,262 @@
+import os
+import pickle
+import sqlite3
+import pycparser
+from collections      import OrderedDict
+from hashlib          import blake2b
+from typing           import Any
+from pycparser        import c_ast
+from objects.function import Function
+
+def get_cache_version() -> str:
+    """Hashes the code the cached results depend on.
+
+    The visitor (`Comvis.py`), the `Function` metrics and this module, plus
+    the pycparser version. Any edit of a `visit_*` rule gives new keys, so a
+    persistent store never returns metrics computed by older code.
+    """
+    root  : str     = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest: blake2b = blake2b(pycparser.__version__.encode(), digest_size=8)
+
+    for path in ("Comvis.py", os.path.join("objects", "function.py"),
+                 os.path.join("objects", "function_cache.py")):
+        with open(os.path.join(root, path), "rb") as file:
+            digest.update(file.read())
+
+    return digest.hexdigest()
+
+###############################################################################
+# |> constant: CACHE_VERSION
+#
+# Salt of every fingerprint (see `get_cache_version`).
+###############################################################################
+CACHE_VERSION: str = get_cache_version()
+
+class CachedFunction:
+    """The result of visiting a `FuncDef`, ready to be reused.
+
+    Attributes:
+        function: Copy of the `Function` right after its body was visited,
+            with every line relative to the first line of the definition.
+        calls: Names of the functions called by the body, in visiting order.
+            They are replayed into the totals and the call graph of the file.
+        node_type: `ParsedCode.current_node_type` after the body was visited.
+    """
+
+    def __init__(self, function: Function, calls: list[str], node_type: str | None) -> None:
+        self.function : Function   = function
+        self.calls    : list[str]  = calls
+        self.node_type: str | None = node_type
+
+class FunctionCache:
+    """Visited functions keyed by a structural fingerprint of their `FuncDef`.
+
+    When a `ParsedCode` is given a cache, every function definition is first
+    fingerprinted. If an identical definition was already visited, its
+    `Function` is restored from the cache (with its lines shifted to the new
+    position) instead of visiting the body again; otherwise the body is
+    visited and the result is stored.
+
+    The fingerprint covers the node types, attributes and lines of the whole
+    subtree, relative to the first line of the definition, so a function
+    moved up or down in a file still matches, while any edit does not. Starter
+    code and helper functions copied word for word into many submissions are
+    therefore only visited once per run. It is salted with `CACHE_VERSION`,
+    so entries stored by another version of the visitor are never reused.
+
+    At most `max_entries` entries are kept in memory, the least recently used
+    ones being dropped first; with a store, dropped entries are loaded again
+    from it when needed.
+
+    With a `path`, entries are also kept in a SQLite database (WAL mode,
+    pickled entries, batched inserts), shared by later runs and by the worker
+    processes of a `BatchRunner`. The store is opened on first use, and a
+    pickled cache only carries its `path`, so every process opens its own
+    connection and keeps its own entries.
+
+    Attributes:
+        path: Path of the SQLite store, or None for a cache of this run only.
+        connection: Connection to the store, once opened.
+        commit_every: Number of new entries between commits.
+        max_entries: Maximum number of entries kept in memory.
+        entries: `CachedFunction` of the most recently used fingerprints.
+        pending: New (fingerprint, pickled entry) rows not yet written.
+        hits: Functions restored from the cache.
+        misses: Functions visited and stored.
+    """
+
+    def __init__(self, path: str | None = None, commit_every: int = 200,
+                 max_entries: int = 10000) -> None:
+        self.path        : str | None = path
+        self.commit_every: int        = commit_every
+        self.max_entries : int        = max_entries
+
+        self.entries: OrderedDict[str, CachedFunction] = OrderedDict()
+        self.pending: list[tuple[str, bytes]]          = list()
+        self.hits   : int                              = 0
+        self.misses : int                              = 0
+
+        self.connection: sqlite3.Connection | None = None
+
+    def __enter__(self) -> "FunctionCache":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"path": self.path, "commit_every": self.commit_every,
+                "max_entries": self.max_entries}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def get_connection(self) -> sqlite3.Connection | None:
+        """Returns the connection to the store, opening it on first use."""
+        if self.connection is None and self.path is not None:
+            self.connection = sqlite3.connect(self.path, timeout=30)
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS functions (
+                                           fingerprint TEXT PRIMARY KEY,
+                                           entry       BLOB NOT NULL
+                                       )""")
+            self.connection.commit()
+
+        return self.connection
+
+    def get(self, key: str) -> CachedFunction | None:
+        cached: CachedFunction | None = self.entries.get(key)
+
+        if cached is not None:
+            self.entries.move_to_end(key)
+
+        elif self.get_connection() is not None:
+            row = self.connection.execute(
+                "SELECT entry FROM functions WHERE fingerprint = ?", (key,)
+            ).fetchone()
+
+            if row is not None:
+                cached = pickle.loads(row[0])
+                self.keep(key, cached)
+
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return cached
+
+    def keep(self, key: str, cached: CachedFunction) -> None:
+        """Keeps an entry in memory, dropping the least recently used one."""
+        self.entries[key] = cached
+
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def add(self, key: str, cached: CachedFunction) -> None:
+        self.keep(key, cached)
+
+        if self.path is not None:
+            self.pending.append((key, pickle.dumps(cached, protocol=pickle.HIGHEST_PROTOCOL)))
+
+            if len(self.pending) >= self.commit_every:
+                self.flush()
+
+    def flush(self) -> None:
+        """Writes the new entries to the store."""
+        if not self.pending or self.get_connection() is None:
+            return
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO functions VALUES (?, ?)", self.pending
+            )
+        self.pending.clear()
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.flush()
+            self.connection.close()
+            self.connection = None
+
+    def get_hit_rate(self) -> float:
+        lookups: int = self.hits + self.misses
+
+        return self.hits / lookups if lookups else 0.0
+
+    #==> Fingerprint <==#######################################################
+
+    ###########################################################################
+    # |> variable: LAYOUTS
+    #
+    # Node class -> (class name, attribute names, child slot names), built
+    # the first time a class is fingerprinted.
+    ###########################################################################
+    LAYOUTS: dict[type, tuple[str, tuple[str, ...], tuple[str, ...]]] = dict()
+
+    @classmethod
+    def get_layout(cls, node_class: type) -> tuple[str, tuple[str, ...], tuple[str, ...]]:
+        layout = cls.LAYOUTS.get(node_class)
+
+        if layout is None:
+            attrs   : tuple[str, ...] = tuple(node_class.attr_names)
+            children: tuple[str, ...] = tuple(slot for slot in node_class.__slots__
+                                              if slot not in attrs
+                                              and slot not in ("coord", "__weakref__"))
+            layout = cls.LAYOUTS[node_class] = (node_class.__name__, attrs, children)
+
+        return layout
+
+    @classmethod
+    def fingerprint(cls, node: c_ast.FuncDef, main_file: str, state: Any = None) -> str:
+        """Hashes the structure of a function definition.
+
+        Columns and the absolute position are ignored: lines are relative to
+        the definition, and only kept for nodes of `main_file` (the others
+        are skipped by `ParsedCode`).
+
+        The tree is walked through the slots of every node class instead of
+        `children()`, which builds a list per node; this keeps fingerprinting
+        well below the cost of visiting the function.
+
+        Args:
+            node: The `FuncDef` node.
+            main_file: Path of the analyzed `.c` file.
+            state: Visitor state the result depends on, hashed with the tree.
+
+        Returns:
+            A hex digest.
+        """
+        start : int       = node.coord.line
+        tokens: list[Any] = [CACHE_VERSION, state]
+        stack : list[Any] = [node]
+
+        while stack:
+            item = stack.pop()
+
+            if item is None:
+                tokens.append(None)
+                continue
+
+            if item.__class__ is list:
+                tokens.append(len(item))
+                stack.extend(reversed(item))
+                continue
+
+            name, attrs, children = cls.LAYOUTS.get(item.__class__) or cls.get_layout(item.__class__)
+
+            tokens.append(name)
+            for attr in attrs:
+                tokens.append(getattr(item, attr))
+
+            #==> Lines of headers, and the line 0 of `Typename` nodes, do not move <==#
+            coord = item.coord
+            if coord is not None:
+                inside: bool = coord.file == main_file and coord.line >= start
+                tokens.append(coord.line - start if inside else None)
+
+            for child in reversed(children):
+                stack.append(getattr(item, child))
+
+        return blake2b(repr(tokens).encode(), digest_size=16).hexdigest()
@@ -0,0 +1,164 @@
+import csv
+import os
+from typing       import Any
+from rich.console import Console
+from rich.table   import Table
+from rich.style   import Style
+from rich         import box
+from Comvis                 import ParsedCode
+from objects.function_cache import FunctionCache
+from utils.preprocess       import Preprocessor
+
+class FunctionDiff:
+    """Function-level differences between two versions of a file.
+
+    The old version is analyzed with a `FunctionCache`, and the new version
+    with the same cache: functions whose definition did not change (even if
+    they moved) are restored from the cache instead of being visited again,
+    so only added and changed functions are recomputed.
+
+    Every function is reported as added, removed, changed or unchanged (by
+    comparing the fingerprints of the definitions), with the deltas of its
+    metrics.
+
+    Attributes:
+        old, new: `ParsedCode` of both versions.
+        cache: The `FunctionCache` shared by both analyses.
+        rows: One row per function: name, status, then (old, new, delta) of
+            every metric in `METRICS`.
+    """
+
+    ###########################################################################
+    # |> constant: METRICS
+    #
+    # Items: Tuple (report label, Function attribute).
+    ###########################################################################
+    METRICS: list[tuple[str, str]] = [
+        ("McCabe",               "total_mcc"),
+        ("Cognitive Complexity", "cognitive_complexity"),
+        ("Length",               "length"),
+        ("Volume",               "volume"),
+        ("Effort",               "effort"),
+        ("Fan-out",              "fan_out"),
+    ]
+
+    STATUS_STYLES: dict[str, str] = {
+        "added"    : "bold green",
+        "removed"  : "bold red",
+        "changed"  : "bold yellow",
+        "unchanged": "dim",
+    }
+
+    def __init__(self, old: ParsedCode, new: ParsedCode, cache: FunctionCache) -> None:
+        self.old  : ParsedCode    = old
+        self.new  : ParsedCode    = new
+        self.cache: FunctionCache = cache
+
+        self.rows: list[list[Any]] = self.get_rows()
+
+    @classmethod
+    def from_files(cls, old_path: str, new_path: str,
+                   preprocessor: Preprocessor | None = None) -> "FunctionDiff":
+        """Analyzes two versions of a file and compares them.
+
+        Args:
+            old_path, new_path: Paths of the `.c` (or `.i`) files. The `.i`
+                file is read unless a `preprocessor` is given.
+            preprocessor: Optional `Preprocessor` of the `.c` files.
+        """
+        cache: FunctionCache = FunctionCache()
+        versions: list[ParsedCode] = []
+
+        for path in (old_path, new_path):
+            file_dir, name = os.path.split(path)
+            versions.append(ParsedCode(os.path.splitext(name)[0], os.path.join(file_dir, ""),
+                                       preprocessor, function_cache=cache))
+
+            if versions[-1].has_errors:
+                raise ValueError(f"Could not parse '{path}'")
+
+        return cls(*versions, cache)
+
+    def get_rows(self) -> list[list[Any]]:
+        old: dict[str, Any] = {function.func_name: function for function in self.old.functions}
+        new: dict[str, Any] = {function.func_name: function for function in self.new.functions}
+
+        rows: list[list[Any]] = []
+        for name in sorted(old.keys() | new.keys()):
+            before, after = old.get(name), new.get(name)
+
+            if before is None:
+                status: str = "added"
+            elif after is None:
+                status = "removed"
+            elif before.fingerprint != after.fingerprint:
+                status = "changed"
+            else:
+                status = "unchanged"
+
+            row: list[Any] = [name, status]
+            for _, attr in self.METRICS:
+                value_before: float = getattr(before, attr) if before is not None else 0
+                value_after : float = getattr(after, attr) if after is not None else 0
+                row += [value_before, value_after, value_after - value_before]
+
+            rows.append(row)
+
+        return rows
+
+    #==> Report <==############################################################
+
+    def print_report(self, changed_only: bool = False) -> None:
+        """Prints the deltas of every function.
+
+        Args:
+            changed_only: Skip the unchanged functions.
+        """
+        border_style: Style = Style(color="#000000", bold=True)
+
+        table = Table(title=f"[bold][#00ffae]{self.old.file_source} -> {self.new.file_source}[/]",
+                      box=box.ROUNDED,
+                      show_header=True,
+                      header_style="bold #ffee00",
+                      border_style=border_style,
+                      )
+
+        table.add_column("Function", style="cyan")
+        table.add_column("Status")
+        for label, _ in self.METRICS:
+            table.add_column(f"Δ {label}", style="#1cffa0", justify="right")
+
+        for name, status, *values in self.rows:
+            if changed_only and status == "unchanged":
+                continue
+
+            deltas: list[float] = values[2::3]
+            table.add_row(name, f"[{self.STATUS_STYLES[status]}]{status}[/]",
+                          *(f"{delta:+.2f}".rstrip("0").rstrip(".") for delta in deltas))
+
+        Console().print(table)
+        recomputed: int = len(self.new.functions) - self.cache.hits
+        Console().print(f"Functions reused: {self.cache.hits} | recomputed: {recomputed}",
+                        style="bold", highlight=False)
+
+    def export_csv(self, dir: str, filename: str) -> None:
+        """Exports the old and new values and the deltas to a CSV file.
+
+        Args:
+            dir: Output directory path.
+            filename: Output filename without extension.
+        """
+        file_name: str = f"{dir}{filename}"
+
+        os.makedirs(dir, exist_ok=True)
+
+        header: list[str] = ["Function", "Status"]
+        for label, _ in self.METRICS:
+            header += [f"{label} (old)", f"{label} (new)", f"{label} (delta)"]
+
+        with open(f"{file_name}.csv", mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            writer.writerows(self.rows)
+
+        Console().print(f"Create CSV: {file_name}", style="bold green")
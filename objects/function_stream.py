@@ -0,0 +1,129 @@
+import csv
+import gzip
+import json
+from os      import makedirs
+from os.path import dirname
+from typing  import Any, IO
+
+class FunctionStream:
+    """Streams one record per function to a JSONL or CSV file.
+
+    A `Compsta` consumer: the records of a file are produced as soon as the
+    file is parsed, kept in a small buffer and written in chunks of
+    `chunk_size` records. The stream never retains the `Function` objects,
+    and `Compsta` releases them once every consumer has seen the file (see
+    `ParsedCode.release`), so function-level analysis of a large corpus does
+    not depend on keeping every function in memory until the end of the run.
+
+    The format is taken from the file name: `.jsonl` or `.csv`, optionally
+    followed by `.gz` for gzip compression (e.g. `functions.jsonl.gz`).
+
+    Attributes:
+        path: Output file path.
+        fmt: "jsonl" or "csv".
+        compress: Whether the output is gzip-compressed.
+        chunk_size: Number of buffered records written at once.
+        buffer: Records waiting to be written.
+        number_of_records: Total number of records written so far.
+    """
+
+    FIELDS: list[str] = [
+        "file",
+        "function",
+        "n1",
+        "n2",
+        "N1",
+        "N2",
+        "vocabulary",
+        "length",
+        "estimated_len",
+        "volume",
+        "difficulty",
+        "estimated_level",
+        "intelligence",
+        "effort",
+        "time_required",
+        "delivered_bugs",
+        "total_mcc",
+        "cognitive_complexity",
+        "fan_in",
+        "fan_out",
+        "recursive",
+        "call_depth",
+    ]
+
+    def __init__(self, path: str, chunk_size: int = 1000) -> None:
+        """Opens the output file.
+
+        Args:
+            path: Output path ending in `.jsonl`, `.csv`, `.jsonl.gz` or `.csv.gz`.
+            chunk_size: Number of buffered records written at once.
+
+        Raises:
+            ValueError: If the format can not be inferred from `path`.
+        """
+        self.path      : str  = path
+        self.compress  : bool = path.endswith(".gz")
+        self.chunk_size: int  = chunk_size
+
+        name: str = path[:-3] if self.compress else path
+        if name.endswith(".jsonl"):
+            self.fmt: str = "jsonl"
+        elif name.endswith(".csv"):
+            self.fmt = "csv"
+        else:
+            raise ValueError(f"Unknown function stream format for '{path}' "
+                             "(expected .jsonl, .csv, .jsonl.gz or .csv.gz)")
+
+        self.buffer           : list[dict[str, Any]] = list()
+        self.number_of_records: int                  = 0
+
+        if dirname(path):
+            makedirs(dirname(path), exist_ok=True)
+
+        if self.compress:
+            self.file: IO[str] = gzip.open(path, mode="wt", newline="", encoding="utf-8")
+        else:
+            self.file = open(path, mode="w", newline="", encoding="utf-8")
+
+        if self.fmt == "csv":
+            self.writer = csv.DictWriter(self.file, fieldnames=self.FIELDS)
+            self.writer.writeheader()
+
+    def __enter__(self) -> "FunctionStream":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def add_file(self, parsed_code: Any) -> None:
+        """Buffers one record per function of a parsed file.
+
+        Args:
+            parsed_code: A `ParsedCode` object without errors.
+        """
+        for function in sorted(parsed_code.functions, key=lambda f: f.func_name):
+            record: dict[str, Any] = {"file": parsed_code.file_source}
+            record.update(function.as_dict())
+            self.buffer.append(record)
+
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered records and flushes the file."""
+        if not self.buffer:
+            return
+
+        if self.fmt == "jsonl":
+            self.file.write("".join(json.dumps(record) + "\n" for record in self.buffer))
+        else:
+            self.writer.writerows(self.buffer)
+
+        self.number_of_records += len(self.buffer)
+        self.buffer.clear()
+        self.file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
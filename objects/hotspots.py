@@ -0,0 +1,159 @@
+import csv
+import heapq
+from itertools    import count
+from os           import makedirs
+from typing       import Any
+from rich.console import Console
+from rich.table   import Table
+from rich.style   import Style
+from rich         import box
+
+class TopK:
+    """The K largest items seen in a stream, kept in a min-heap of size K.
+
+    Every new item costs O(log K) and is compared with the smallest kept
+    item only, so memory is proportional to K and not to the stream length.
+    Ties keep the item seen first.
+
+    Attributes:
+        k: Number of items kept.
+        heap: Min-heap of (value, -sequence, key) tuples.
+    """
+
+    def __init__(self, k: int) -> None:
+        self.k   : int                          = k
+        self.heap: list[tuple[float, int, Any]] = []
+
+        self.sequence = count()
+
+    def add(self, value: float, key: Any) -> None:
+        item: tuple[float, int, Any] = (value, -next(self.sequence), key)
+
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif item[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, item)
+
+    def ranked(self) -> list[tuple[Any, float]]:
+        """Returns the kept (key, value) pairs from the largest value down."""
+        return [(key, value) for value, _, key in sorted(self.heap, reverse=True)]
+
+class HotspotTracker:
+    """Streaming report of the most complex functions and files of a corpus.
+
+    A `Compsta` consumer: every parsed file updates one `TopK` per metric, and
+    the file is not retained afterwards. The report is available at any time
+    and only uses memory proportional to `k`.
+
+    Attributes:
+        k: Number of hotspots kept per metric.
+        functions: `TopK` of (file, function) keys per function metric.
+        files: `TopK` of files per file metric.
+    """
+
+    ###########################################################################
+    # |> constants: metrics
+    #
+    # Items: Tuple (report label, attribute).
+    ###########################################################################
+    FUNCTION_METRICS: list[tuple[str, str]] = [
+        ("McCabe",               "total_mcc"),
+        ("Effort",               "effort"),
+        ("Volume",               "volume"),
+        ("Cognitive Complexity", "cognitive_complexity"),
+    ]
+
+    FILE_METRICS: list[tuple[str, str]] = [
+        ("McCabe",               "total_mcc"),
+        ("Effort",               "effort"),
+        ("Volume",               "volume"),
+        ("Cognitive Complexity", "total_cognitive_complexity"),
+    ]
+
+    def __init__(self, k: int = 10) -> None:
+        self.k        : int             = k
+        self.functions: dict[str, TopK] = {attr: TopK(k) for _, attr in self.FUNCTION_METRICS}
+        self.files    : dict[str, TopK] = {attr: TopK(k) for _, attr in self.FILE_METRICS}
+
+    def add_file(self, parsed_code: Any) -> None:
+        """Offers a parsed file and its functions to every top-k.
+
+        Args:
+            parsed_code: A `ParsedCode` object without errors.
+        """
+        for attr, top in self.files.items():
+            top.add(getattr(parsed_code, attr), parsed_code.file_source)
+
+        # `functions` is a set: sorted, ties are ranked the same on every run
+        for function in sorted(parsed_code.functions, key=lambda function: function.func_name):
+            key: tuple[str, str] = (parsed_code.file_source, function.func_name)
+
+            for attr, top in self.functions.items():
+                top.add(getattr(function, attr), key)
+
+    #==> Report <==############################################################
+
+    def get_rows(self) -> list[list[Any]]:
+        """Returns the report rows: level, metric, rank, file, function, value."""
+        rows: list[list[Any]] = []
+
+        for label, attr in self.FUNCTION_METRICS:
+            for rank, ((file, function), value) in enumerate(self.functions[attr].ranked(), 1):
+                rows.append(["function", label, rank, file, function, value])
+
+        for label, attr in self.FILE_METRICS:
+            for rank, (file, value) in enumerate(self.files[attr].ranked(), 1):
+                rows.append(["file", label, rank, file, "", value])
+
+        return rows
+
+    def print_report(self) -> None:
+        """Prints one table per level with the hotspots of every metric."""
+        border_style: Style = Style(color="#000000", bold=True)
+        rows        : list[list[Any]] = self.get_rows()
+
+        for level in ("function", "file"):
+            table = Table(title=f"[bold][#00ffae]Top {self.k} {level} hotspots[/]",
+                          box=box.ROUNDED,
+                          show_header=True,
+                          header_style="bold #ffee00",
+                          border_style=border_style,
+                          )
+
+            table.add_column("Metric", style="cyan")
+            table.add_column("Rank", style="cyan", justify="right")
+            table.add_column("File", style="#1cffa0")
+            if level == "function":
+                table.add_column("Function", style="#1cffa0")
+            table.add_column("Value", style="#1cffa0", justify="right")
+
+            for row_level, label, rank, file, function, value in rows:
+                if row_level != level:
+                    continue
+
+                cells: list[str] = [label, str(rank), file]
+                if level == "function":
+                    cells.append(function)
+                cells.append(f"{value}")
+
+                table.add_row(*cells)
+
+            Console().print(table)
+
+    def export_csv(self, dir: str, filename: str) -> None:
+        """Exports the hotspots to a CSV file.
+
+        Args:
+            dir: Output directory path.
+            filename: Output filename without extension.
+        """
+        file_name: str = f"{dir}{filename}"
+
+        makedirs(dir, exist_ok=True)
+
+        with open(f"{file_name}.csv", mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["Level", "Metric", "Rank", "File", "Function", "Value"])
+            writer.writerows(self.get_rows())
+
+        Console().print(f"Create CSV: {file_name}", style="bold green")
@@ -0,0 +1,233 @@
+import csv
+import numpy as np
+from itertools    import chain
+from os           import makedirs
+from types        import SimpleNamespace
+from typing       import Any, Iterable
+from rich.console import Console
+
+def get_top_indices(values: np.ndarray, k: int) -> np.ndarray:
+    """Returns the indices of the `k` largest values, largest first.
+
+    Uses a partial sort (O(n)) and only sorts the selected values. Ties keep
+    the lowest index first.
+    """
+    k = min(k, len(values))
+
+    if k == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    top: np.ndarray = np.argpartition(values, -k)[-k:]
+
+    return top[np.lexsort((top, -values[top]))]
+
+class LineProfile:
+    """Operators and operands of every line of a file, as NumPy arrays.
+
+    Built once from the occurrences collected by `ParsedCode` (line lists of
+    every operator and operand, global and per function), so the line-level
+    statistics are computed with array operations instead of walking the
+    occurrence dictionaries again. Index `i` of every array is line `i` of
+    the `.c` file; index 0 is unused.
+
+    The volume of a line uses the vocabulary of the whole file, so the
+    volumes of all lines add up to the volume of the file.
+
+    Attributes:
+        operators: Operators per line (int32).
+        operands: Operands per line (int32).
+        vocabulary: Vocabulary (n1 + n2) of the file.
+    """
+
+    def __init__(self, operators: np.ndarray, operands: np.ndarray, vocabulary: int) -> None:
+        self.operators : np.ndarray = operators
+        self.operands  : np.ndarray = operands
+        self.vocabulary: int        = vocabulary
+
+    @classmethod
+    def from_occurrences(cls, operators: Iterable[dict[str, list[int]]],
+                         operands: Iterable[dict[str, list[int]]],
+                         total_lines: int, vocabulary: int) -> "LineProfile":
+        """Counts the occurrences of every line.
+
+        Args:
+            operators, operands: Occurrence dictionaries (symbol -> lines),
+                e.g. the global one of a `ParsedCode` and those of its
+                functions.
+            total_lines: Lines of the `.c` file.
+            vocabulary: Vocabulary of the file.
+        """
+        counts: list[np.ndarray] = []
+
+        for occurrences in (operators, operands):
+            lines: np.ndarray = np.fromiter(
+                chain.from_iterable(line_list for symbols in occurrences
+                                    for line_list in symbols.values()),
+                dtype=np.int64,
+            )
+            counts.append(np.bincount(lines, minlength=total_lines + 1))
+
+        size: int = max(len(count) for count in counts)
+
+        return cls(*(np.pad(count, (0, size - len(count))).astype(np.int32) for count in counts),
+                   vocabulary)
+
+    def get_volumes(self) -> np.ndarray:
+        """Returns the volume of every line: its length times log2(vocabulary)."""
+        length: np.ndarray = self.operators + self.operands
+
+        if self.vocabulary < 2:
+            return np.zeros(len(length))
+
+        return length * np.log2(self.vocabulary)
+
+    def get_active_lines(self) -> np.ndarray:
+        """Returns the numbers of the lines with at least one token."""
+        return np.flatnonzero(self.operators + self.operands)
+
+    def get_percentiles(self, percentiles: Iterable[float] = (50, 90, 99)) -> np.ndarray:
+        """Returns percentiles of the volume of the lines with tokens."""
+        volumes: np.ndarray = self.get_volumes()[self.get_active_lines()]
+
+        if not len(volumes):
+            return np.zeros(len(tuple(percentiles)))
+
+        return np.percentile(volumes, tuple(percentiles))
+
+    def get_histogram(self, bins: int | np.ndarray = 10) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (lines per bin, bin edges) of the volume of the lines with tokens."""
+        return np.histogram(self.get_volumes()[self.get_active_lines()], bins=bins)
+
+    def get_densest(self, k: int = 5) -> list[tuple[int, float]]:
+        """Returns the (line, volume) of the `k` densest lines, densest first."""
+        volumes: np.ndarray = self.get_volumes()
+        active : np.ndarray = self.get_active_lines()
+
+        return [(int(active[index]), float(volumes[active[index]]))
+                for index in get_top_indices(volumes[active], k)]
+
+class LineVolumeReport:
+    """Line-volume distribution of a set of files (e.g. a directory).
+
+    The volumes of the lines of every file are concatenated once, so the
+    histogram uses the same bins for all files and the densest lines are
+    ranked across the whole set.
+
+    Attributes:
+        files: Source path of every file with a `LineProfile`.
+        volumes: Volume of every line with tokens.
+        owners: Index in `files` of the file of every line.
+        lines: Line number of every line.
+    """
+
+    def __init__(self, parsed_files: Iterable[Any]) -> None:
+        self.files: list[str] = []
+
+        volumes: list[np.ndarray] = []
+        lines  : list[np.ndarray] = []
+
+        for parsed_code in parsed_files:
+            profile: LineProfile | None = getattr(parsed_code, "line_profile", None)
+            if profile is None:
+                continue
+
+            active: np.ndarray = profile.get_active_lines()
+            volumes.append(profile.get_volumes()[active])
+            lines.append(active)
+            self.files.append(parsed_code.file_source)
+
+        self.volumes: np.ndarray = np.concatenate(volumes) if volumes else np.zeros(0)
+        self.lines  : np.ndarray = np.concatenate(lines) if lines else np.zeros(0, dtype=np.int64)
+        self.owners : np.ndarray = np.repeat(np.arange(len(lines)), [len(part) for part in lines])
+
+    def get_histogram(self, bins: int = 20) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (lines per bin, bin edges) over all files."""
+        return np.histogram(self.volumes, bins=bins)
+
+    def get_densest(self, k: int = 20) -> list[tuple[str, int, float]]:
+        """Returns the (file, line, volume) of the `k` densest lines, densest first."""
+        return [(self.files[self.owners[index]], int(self.lines[index]),
+                 round(float(self.volumes[index]), 2))
+                for index in get_top_indices(self.volumes, k)]
+
+    def export_csv(self, dir: str, filename: str, bins: int = 20, k: int = 20) -> None:
+        """Exports the histogram and the densest lines to two CSV files.
+
+        Writes `<filename>_line_volume.csv` (one row per bin) and
+        `<filename>_densest_lines.csv` (one row per line).
+
+        Args:
+            dir: Output directory path.
+            filename: Output filename without extension.
+            bins: Number of bins of the histogram.
+            k: Number of densest lines.
+        """
+        file_name: str = f"{dir}{filename}"
+
+        makedirs(dir, exist_ok=True)
+
+        counts, edges = self.get_histogram(bins)
+        with open(f"{file_name}_line_volume.csv", mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["Bin Start", "Bin End", "Lines"])
+            writer.writerows([round(float(start), 2), round(float(end), 2), int(lines)]
+                             for start, end, lines in zip(edges, edges[1:], counts))
+
+        with open(f"{file_name}_densest_lines.csv", mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["Rank", "File", "Line", "Volume"])
+            writer.writerows([rank, *row] for rank, row in enumerate(self.get_densest(k), 1))
+
+        Console().print(f"Create CSV: {file_name}_line_volume", style="bold green")
+
+def export_line_profiles(dir: str, filename: str, parsed_files: Iterable[Any]) -> None:
+    """Saves the `LineProfile` of every file to `<filename>_line_profiles.npz`.
+
+    Sharded runs write it next to the per-file CSV, so `Compsta.merge_shards`
+    can rebuild the `LineVolumeReport` of every directory (see
+    `read_line_profiles`).
+
+    Args:
+        dir: Output directory path.
+        filename: Output filename without extension.
+        parsed_files: Files of the directory; those without a `LineProfile`
+            are skipped.
+    """
+    files: list[Any] = [parsed_code for parsed_code in parsed_files
+                        if getattr(parsed_code, "line_profile", None) is not None]
+
+    makedirs(dir, exist_ok=True)
+
+    np.savez_compressed(
+        f"{dir}{filename}_line_profiles.npz",
+        names=np.array([parsed_code.filename for parsed_code in files], dtype=str),
+        sources=np.array([parsed_code.file_source for parsed_code in files], dtype=str),
+        vocabulary=np.array([parsed_code.line_profile.vocabulary for parsed_code in files],
+                            dtype=np.int64),
+        sizes=np.array([len(parsed_code.line_profile.operators) for parsed_code in files],
+                       dtype=np.int64),
+        operators=np.concatenate([parsed_code.line_profile.operators for parsed_code in files]
+                                 or [np.zeros(0, dtype=np.int32)]),
+        operands=np.concatenate([parsed_code.line_profile.operands for parsed_code in files]
+                                or [np.zeros(0, dtype=np.int32)]),
+    )
+
+def read_line_profiles(path: str) -> dict[str, SimpleNamespace]:
+    """Reads the profiles written by `export_line_profiles`.
+
+    Returns:
+        One object per file, keyed by filename, with its `file_source` and
+        `line_profile`.
+    """
+    with np.load(path) as data:
+        arrays: dict[str, np.ndarray] = dict(data)  # Every key access decompresses again
+
+    offsets: np.ndarray = np.concatenate(([0], np.cumsum(arrays["sizes"])))
+
+    return {str(name): SimpleNamespace(
+                file_source=str(source),
+                line_profile=LineProfile(arrays["operators"][start:end],
+                                         arrays["operands"][start:end], int(vocabulary)))
+            for name, source, vocabulary, start, end
+            in zip(arrays["names"], arrays["sources"], arrays["vocabulary"],
+                   offsets, offsets[1:])}
@@ -0,0 +1,173 @@
+import importlib
+from typing    import Any
+from pycparser import c_ast
+
+class MetricPlugin:
+    """Base class of the metric collectors run during the visit of `ParsedCode`.
+
+    A plugin lists the node types it is interested in (`NODE_TYPES`, names of
+    `c_ast` classes). `ParsedCode` calls `enter` before visiting such a node
+    and `leave` after its children were visited, so every plugin of a file is
+    fed by the same traversal that collects Halstead and McCabe, instead of
+    walking the AST once per metric.
+
+    Plugins see the nodes that `ParsedCode` visits: the code of the analyzed
+    file, without the declarations of the fake-libc headers. Everything else
+    is available through `parsed_code` (e.g. `current_func`, `get_node_line`).
+
+    A new instance is created for every file. After the visit, the values of
+    `get_results` become attributes of the `ParsedCode`, and the `COLUMNS`
+    are added to the exports of `Compsta`.
+    """
+
+    ###########################################################################
+    # |> constant: COLUMNS
+    #
+    # Columns added to the per-file CSV.
+    #
+    # Items: Tuple (CSV header, key of `get_results`).
+    ###########################################################################
+    COLUMNS: list[tuple[str, str]] = []
+
+    NODE_TYPES: tuple[str, ...] = ()
+
+    def __init__(self, parsed_code: Any) -> None:
+        self.parsed_code: Any = parsed_code
+
+    def enter(self, node: c_ast.Node) -> None:
+        """Called before `node` is visited."""
+
+    def leave(self, node: c_ast.Node) -> None:
+        """Called after `node` and its children were visited."""
+
+    def get_results(self) -> dict[str, float]:
+        """Returns the metrics of the file, keyed by the attributes of `COLUMNS`."""
+        return {}
+
+class NestingDepth(MetricPlugin):
+    """Deepest nesting of control structures.
+
+    Loops, `if` and `switch` statements nest; an `else if` continues its `if`
+    instead of nesting in it.
+    """
+
+    COLUMNS: list[tuple[str, str]] = [
+        ("Max Nesting Depth",        "max_nesting_depth"),
+        ("Avg Function Max Nesting", "avg_function_nesting"),
+    ]
+
+    NODE_TYPES: tuple[str, ...] = ("FuncDef", "For", "While", "DoWhile", "If", "Switch")
+
+    def __init__(self, parsed_code: Any) -> None:
+        super().__init__(parsed_code)
+
+        self.depth    : int        = 0
+        self.nests    : list[bool] = []     # Whether each entered node nested
+        self.else_ifs : set[int]   = set()  # Ids of the `else if` nodes
+        self.functions: list[int]  = []     # Max depth of every function
+
+    def enter(self, node: c_ast.Node) -> None:
+        if node.__class__ is c_ast.FuncDef:
+            self.depth = 0
+            self.functions.append(0)
+            self.nests.append(False)
+            return
+
+        nests: bool = id(node) not in self.else_ifs
+        if node.__class__ is c_ast.If and node.iffalse.__class__ is c_ast.If:
+            self.else_ifs.add(id(node.iffalse))
+
+        self.depth += nests
+        self.nests.append(nests)
+
+        if self.functions and self.depth > self.functions[-1]:
+            self.functions[-1] = self.depth
+
+    def leave(self, node: c_ast.Node) -> None:
+        self.depth -= self.nests.pop()
+        self.else_ifs.discard(id(node))
+
+    def get_results(self) -> dict[str, float]:
+        return {
+            "max_nesting_depth"   : max(self.functions, default=0),
+            "avg_function_nesting": (sum(self.functions) / len(self.functions)
+                                     if self.functions else 0),
+        }
+
+class PointerUsage(MetricPlugin):
+    """Pointer declarations, dereferences, address-of operators and `->`.
+
+    Parameters are counted from the `FuncDef`, since `ParsedCode` does not
+    visit the declarator of a function.
+    """
+
+    COLUMNS: list[tuple[str, str]] = [
+        ("Pointer Declarations", "pointer_declarations"),
+        ("Dereferences",         "pointer_dereferences"),
+        ("Address-of",           "address_of_operators"),
+        ("Arrow Accesses",       "arrow_accesses"),
+    ]
+
+    NODE_TYPES: tuple[str, ...] = ("FuncDef", "PtrDecl", "UnaryOp", "StructRef")
+
+    def __init__(self, parsed_code: Any) -> None:
+        super().__init__(parsed_code)
+
+        self.counts: dict[str, int] = {attr: 0 for _, attr in self.COLUMNS}
+
+    def enter(self, node: c_ast.Node) -> None:
+        if node.__class__ is c_ast.FuncDef:
+            args: c_ast.ParamList | None = getattr(node.decl.type, "args", None)
+            for param in args.params if args is not None else []:
+                if getattr(param, "type", None).__class__ is c_ast.PtrDecl:
+                    self.counts["pointer_declarations"] += 1
+        elif node.__class__ is c_ast.PtrDecl:
+            self.counts["pointer_declarations"] += 1
+        elif node.__class__ is c_ast.StructRef:
+            self.counts["arrow_accesses"] += node.type == "->"
+        elif node.op == "*":
+            self.counts["pointer_dereferences"] += 1
+        elif node.op == "&":
+            self.counts["address_of_operators"] += 1
+
+    def get_results(self) -> dict[str, float]:
+        return dict(self.counts)
+
+###############################################################################
+# |> constant: PLUGINS
+#
+# Built-in plugins, by the name given to `load_plugin`.
+###############################################################################
+PLUGINS: dict[str, type[MetricPlugin]] = {
+    "nesting" : NestingDepth,
+    "pointers": PointerUsage,
+}
+
+def get_plugin_spec(plugin: type[MetricPlugin]) -> str:
+    """Returns the spec `load_plugin` loads `plugin` from: its built-in name,
+    or `module:Class`."""
+    for name, builtin in PLUGINS.items():
+        if builtin is plugin:
+            return name
+
+    return f"{plugin.__module__}:{plugin.__qualname__}"
+
+def load_plugin(spec: str) -> type[MetricPlugin]:
+    """Returns a plugin class from a built-in name or a `module:Class` spec.
+
+    Raises:
+        ValueError: When the spec does not name a `MetricPlugin` subclass.
+    """
+    if spec in PLUGINS:
+        return PLUGINS[spec]
+
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown plugin '{spec}' (built-in: {', '.join(PLUGINS)}; "
+                         f"or module:Class)")
+
+    plugin: Any = getattr(importlib.import_module(module_name), class_name, None)
+    if not (isinstance(plugin, type) and issubclass(plugin, MetricPlugin)):
+        raise ValueError(f"'{spec}' is not a MetricPlugin subclass")
+
+    return plugin
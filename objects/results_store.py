@@ -0,0 +1,269 @@
+import sqlite3
+from hashlib      import blake2b
+from typing       import Any
+from rich.console import Console
+from rich.table   import Table
+from rich.style   import Style
+from rich         import box
+from Compsta      import Compsta
+
+class ResultStore:
+    """A SQLite store of the file, function and directory metrics of a corpus.
+
+    A `Compsta` consumer, and an alternative to the per-directory CSVs: the
+    results of every run go to one database, so queries across exercises and
+    semesters are a single SQL statement instead of reloading thousands of
+    CSVs.
+
+    Rows are keyed by path and carry the content hash of the pre-compiled
+    file (see `ParsedCode.content_hash`). A repeated run updates the rows in
+    place (`INSERT ... ON CONFLICT DO UPDATE`), and the functions removed from
+    a file that changed are deleted. Rows are buffered and written with one
+    `executemany` per table every `batch_size` files, and the database is in
+    WAL mode, so readers are not blocked while a run is writing.
+
+    Tables:
+        files: One row per file, with the columns of `Compsta.COLUMNS`.
+        functions: One row per function, with the fields of `Function.as_dict`.
+        directories: One row per directory and metric, with the spread of the
+            metric (see `MetricSummary`).
+
+    Attributes:
+        db_path: Path of the SQLite database.
+        connection: Open connection to the database.
+        batch_size: Number of buffered files written at once.
+        files, functions: Buffered rows of each table.
+        number_of_files: Total number of files written so far.
+    """
+
+    ###########################################################################
+    # |> constants: columns
+    #
+    # Metric attributes stored by every table, after the key columns. The
+    # files table follows the per-file CSV.
+    ###########################################################################
+    FILE_COLUMNS: list[str] = [attr for _, attr in Compsta.COLUMNS]
+
+    FUNCTION_COLUMNS: list[str] = [
+        "n1", "n2", "N1", "N2", "vocabulary", "length", "estimated_len", "volume",
+        "difficulty", "estimated_level", "intelligence", "effort", "time_required",
+        "delivered_bugs", "total_mcc", "cognitive_complexity", "fan_in", "fan_out",
+        "recursive", "call_depth",
+    ]
+
+    DIRECTORY_COLUMNS: list[str] = ["count", "mean", "std", "min", "max", "p50", "p90", "p99"]
+
+    ###########################################################################
+    # |> constant: COLUMN_NAMES
+    #
+    # SQLite column names are case-insensitive, so the Halstead counts are
+    # stored under descriptive names.
+    ###########################################################################
+    COLUMN_NAMES: dict[str, str] = {
+        "n1": "distinct_operators",
+        "n2": "distinct_operands",
+        "N1": "total_operators",
+        "N2": "total_operands",
+    }
+
+    def __init__(self, db_path: str, batch_size: int = 500) -> None:
+        """Opens (or creates) the store in `db_path`.
+
+        Args:
+            db_path: Path of the SQLite database.
+            batch_size: Number of buffered files written at once.
+        """
+        self.db_path   : str                = db_path
+        self.connection: sqlite3.Connection = sqlite3.connect(db_path)
+        self.batch_size: int                = batch_size
+
+        self.files          : list[tuple] = list()
+        self.functions      : list[tuple] = list()
+        self.number_of_files: int         = 0
+
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+
+        for statement in self.get_schema():
+            self.connection.execute(statement)
+        self.add_missing_columns()
+        self.connection.commit()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    #==> Schema <==############################################################
+
+    def get_schema(self) -> list[str]:
+        files    : str = ", ".join(f"{name} NUMERIC" for name in self.get_names(self.FILE_COLUMNS))
+        functions: str = ", ".join(f"{name} NUMERIC" for name in self.get_names(self.FUNCTION_COLUMNS))
+        directory: str = ", ".join(f"{name} NUMERIC" for name in self.DIRECTORY_COLUMNS)
+
+        return [
+            f"""CREATE TABLE IF NOT EXISTS files (
+                    path         TEXT PRIMARY KEY,
+                    directory    TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    {files}
+                )""",
+            f"""CREATE TABLE IF NOT EXISTS functions (
+                    path         TEXT NOT NULL,
+                    function     TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    {functions},
+                    PRIMARY KEY (path, function)
+                )""",
+            f"""CREATE TABLE IF NOT EXISTS directories (
+                    path         TEXT NOT NULL,
+                    metric       TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    {directory},
+                    PRIMARY KEY (path, metric)
+                )""",
+            "CREATE INDEX IF NOT EXISTS files_directory ON files(directory)",
+            "CREATE INDEX IF NOT EXISTS files_hash ON files(content_hash)",
+            "CREATE INDEX IF NOT EXISTS functions_hash ON functions(content_hash)",
+        ]
+
+    def add_missing_columns(self) -> None:
+        """Adds the metric columns a database created by an older version
+        lacks (`CREATE TABLE IF NOT EXISTS` keeps the old table)."""
+        for table, attributes in (("files", self.FILE_COLUMNS),
+                                  ("functions", self.FUNCTION_COLUMNS)):
+            existing: set[str] = {row[1].lower() for row
+                                  in self.connection.execute(f"PRAGMA table_info({table})")}
+
+            for name in self.get_names(attributes):
+                if name.lower() not in existing:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {name} NUMERIC")
+
+    @classmethod
+    def get_names(cls, attributes: list[str]) -> list[str]:
+        """Returns the column names of metric attributes."""
+        return [cls.COLUMN_NAMES.get(attr, attr) for attr in attributes]
+
+    @staticmethod
+    def get_upsert(table: str, keys: list[str], columns: list[str]) -> str:
+        """Builds an `INSERT ... ON CONFLICT DO UPDATE` statement."""
+        names  : str = ", ".join(keys + columns)
+        values : str = ", ".join("?" for _ in keys + columns)
+        updates: str = ", ".join(f"{name} = excluded.{name}" for name in columns)
+
+        return (f"INSERT INTO {table} ({names}) VALUES ({values}) "
+                f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}")
+
+    #==> Update methods <==####################################################
+
+    def add_file(self, parsed_code: Any) -> None:
+        """Buffers the rows of a parsed file and of its functions.
+
+        Args:
+            parsed_code: A `ParsedCode` object without errors.
+        """
+        path: str = parsed_code.file_source
+
+        self.files.append((path, parsed_code.file_dir, parsed_code.content_hash,
+                           *(getattr(parsed_code, column) for column in self.FILE_COLUMNS)))
+
+        for function in parsed_code.functions:
+            record: dict[str, Any] = function.as_dict()
+            self.functions.append((path, function.func_name, parsed_code.content_hash,
+                                   *(record[column] for column in self.FUNCTION_COLUMNS)))
+
+        if len(self.files) >= self.batch_size:
+            self.flush()
+
+    def add_directory(self, compsta: Any) -> None:
+        """Writes the metric summaries of an analyzed directory.
+
+        The content hash of a directory is the hash of the content hashes of
+        its files, so it changes whenever any file is added, removed or edited.
+
+        Args:
+            compsta: A `Compsta` object, after `parse_mean`.
+        """
+        self.flush()
+
+        hashes: list[str] = sorted(f"{file.file_source}:{file.content_hash}"
+                                   for file in compsta.parsed_files)
+        content_hash: str = blake2b("\n".join(hashes).encode(), digest_size=16).hexdigest()
+
+        rows: list[tuple] = []
+        for metric, summary in sorted(compsta.summaries.items()):
+            rows.append((compsta.dir_name, self.COLUMN_NAMES.get(metric, metric), content_hash,
+                         summary.count, summary.mean, summary.std, summary.minimum, summary.maximum,
+                         summary.quantile(0.5), summary.quantile(0.9), summary.quantile(0.99)))
+
+        self.connection.executemany(
+            self.get_upsert("directories", ["path", "metric"], ["content_hash",
+                                                                *self.DIRECTORY_COLUMNS]),
+            rows,
+        )
+        self.connection.commit()
+
+    def flush(self) -> None:
+        """Writes the buffered rows in one transaction."""
+        if not self.files:
+            return
+
+        with self.connection:
+            self.connection.executemany(
+                self.get_upsert("files", ["path"], ["directory", "content_hash",
+                                                    *self.get_names(self.FILE_COLUMNS)]),
+                self.files,
+            )
+
+            # Functions removed from a file that changed
+            self.connection.executemany(
+                "DELETE FROM functions WHERE path = ? AND content_hash != ?",
+                [(row[0], row[2]) for row in self.files],
+            )
+            columns: list[str] = self.get_names(self.FUNCTION_COLUMNS)
+            self.connection.executemany(
+                self.get_upsert("functions", ["path", "function"], ["content_hash", *columns]),
+                self.functions,
+            )
+
+        self.number_of_files += len(self.files)
+        self.files.clear()
+        self.functions.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.connection.close()
+
+    #==> Query methods <==#####################################################
+
+    def query(self, sql: str, params: tuple = ()) -> tuple[list[str], list[tuple]]:
+        """Runs a read query on the store.
+
+        Returns:
+            The column names and the rows of the result.
+        """
+        self.flush()
+        cursor = self.connection.execute(sql, params)
+
+        return [column[0] for column in cursor.description or []], cursor.fetchall()
+
+    def print_query(self, sql: str, params: tuple = ()) -> None:
+        """Prints the result of a query as a table."""
+        columns, rows = self.query(sql, params)
+        border_style: Style = Style(color="#000000", bold=True)
+
+        table = Table(title=f"[bold][#00ffae]{self.db_path}[/]",
+                      box=box.ROUNDED,
+                      show_header=True,
+                      header_style="bold #ffee00",
+                      border_style=border_style,
+                      )
+
+        for index, column in enumerate(columns):
+            table.add_column(column, style="cyan" if index == 0 else "#1cffa0")
+
+        for row in rows:
+            table.add_row(*(f"{value}" for value in row))
+
+        Console().print(table)
@@ -0,0 +1,220 @@
+import math
+from typing import Any, Iterable
+
+class QuantileSketch:
+    """A mergeable quantile sketch with relative accuracy (DDSketch).
+
+    Values are counted in logarithmic buckets: bucket `k` holds the values in
+    (gamma^(k-1), gamma^k], with gamma = (1 + alpha) / (1 - alpha). Every
+    quantile is then returned with a relative error of at most `alpha`, and
+    two sketches with the same `alpha` are merged by adding their bucket
+    counts, so the merge is exact and does not depend on the order.
+
+    Attributes:
+        alpha: Relative accuracy of the quantiles.
+        gamma: Ratio between the bounds of a bucket.
+        zero_count: Number of values too close to zero to have a bucket.
+        positive: Counts of the buckets of the positive values.
+        negative: Counts of the buckets of the absolute negative values.
+        count: Total number of values.
+    """
+
+    MIN_VALUE: float = 1e-9
+
+    def __init__(self, alpha: float = 0.01) -> None:
+        self.alpha     : float = alpha
+        self.gamma     : float = (1 + alpha) / (1 - alpha)
+        self.log_gamma : float = math.log(self.gamma)
+        self.zero_count: int   = 0
+        self.count     : int   = 0
+
+        self.positive: dict[int, int] = dict()
+        self.negative: dict[int, int] = dict()
+
+    def get_key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def get_value(self, key: int) -> float:
+        """Returns the value of a bucket with the lowest relative error."""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float) -> None:
+        if value > self.MIN_VALUE:
+            key: int = self.get_key(value)
+            self.positive[key] = self.positive.get(key, 0) + 1
+        elif value < -self.MIN_VALUE:
+            key = self.get_key(-value)
+            self.negative[key] = self.negative.get(key, 0) + 1
+        else:
+            self.zero_count += 1
+
+        self.count += 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Adds the values of another sketch with the same accuracy."""
+        if other.alpha != self.alpha:
+            raise ValueError(f"Can not merge sketches with alpha {self.alpha} and {other.alpha}")
+
+        for key, count in other.positive.items():
+            self.positive[key] = self.positive.get(key, 0) + count
+        for key, count in other.negative.items():
+            self.negative[key] = self.negative.get(key, 0) + count
+
+        self.zero_count += other.zero_count
+        self.count      += other.count
+
+    def quantile(self, q: float) -> float | None:
+        """Estimates the q-quantile (0 <= q <= 1), or None when empty."""
+        if self.count == 0:
+            return None
+
+        rank      : float = q * (self.count - 1)
+        cumulative: int   = 0
+
+        #==> From the most negative value up to the largest <==#
+        for key in sorted(self.negative, reverse=True):
+            cumulative += self.negative[key]
+            if cumulative > rank:
+                return -self.get_value(key)
+
+        cumulative += self.zero_count
+        if cumulative > rank:
+            return 0.0
+
+        for key in sorted(self.positive):
+            cumulative += self.positive[key]
+            if cumulative > rank:
+                return self.get_value(key)
+
+        return self.get_value(max(self.positive))
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "alpha"   : self.alpha,
+            "zero"    : self.zero_count,
+            "positive": self.positive,
+            "negative": self.negative,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["alpha"])
+
+        # JSON turns the integer keys into strings
+        sketch.positive   = {int(key): count for key, count in data["positive"].items()}
+        sketch.negative   = {int(key): count for key, count in data["negative"].items()}
+        sketch.zero_count = data["zero"]
+        sketch.count      = (sketch.zero_count + sum(sketch.positive.values())
+                             + sum(sketch.negative.values()))
+
+        return sketch
+
+class MetricSummary:
+    """Mergeable summary of the values of one metric.
+
+    Keeps the count, sum, minimum, maximum, the mean and sum of squared
+    deviations (M2) of Welford's algorithm, and a `QuantileSketch`. Two
+    summaries are combined with `merge` (Chan et al. parallel variance), so
+    the summary of a folder is obtained from the summaries of its parts
+    without reading their files again.
+
+    Attributes:
+        count: Number of values.
+        total: Sum of the values.
+        minimum: Smallest value, or None when empty.
+        maximum: Largest value, or None when empty.
+        mean: Running mean of Welford's algorithm.
+        m2: Sum of the squared deviations from the mean.
+        sketch: Quantile sketch of the values.
+    """
+
+    def __init__(self, values: Iterable[float] = (), alpha: float = 0.01) -> None:
+        self.count  : int          = 0
+        self.total  : float        = 0
+        self.minimum: float | None = None
+        self.maximum: float | None = None
+        self.mean   : float        = 0
+        self.m2     : float        = 0
+
+        self.sketch: QuantileSketch = QuantileSketch(alpha)
+
+        for value in values:
+            self.add(value)
+
+    def add(self, value: float) -> None:
+        """Adds one value (Welford's update)."""
+        self.count += 1
+        self.total += value
+
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+        delta: float = value - self.mean
+        self.mean   += delta / self.count
+        self.m2     += delta * (value - self.mean)
+
+        self.sketch.add(value)
+
+    def merge(self, other: "MetricSummary") -> None:
+        """Adds the values summarized by another summary."""
+        if other.count == 0:
+            return
+
+        if self.count == 0:
+            self.minimum, self.maximum = other.minimum, other.maximum
+        else:
+            self.minimum = min(self.minimum, other.minimum)
+            self.maximum = max(self.maximum, other.maximum)
+
+        count: int   = self.count + other.count
+        delta: float = other.mean - self.mean
+
+        self.m2    += other.m2 + delta * delta * self.count * other.count / count
+        self.mean  += delta * other.count / count
+        self.count  = count
+        self.total += other.total
+
+        self.sketch.merge(other.sketch)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance, 0 for less than two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def quantile(self, q: float) -> float | None:
+        """Estimates the q-quantile, clamped to the exact minimum and maximum."""
+        value: float | None = self.sketch.quantile(q)
+
+        if value is None:
+            return None
+
+        return min(max(value, self.minimum), self.maximum)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count"  : self.count,
+            "total"  : self.total,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "mean"   : self.mean,
+            "m2"     : self.m2,
+            "sketch" : self.sketch.as_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "MetricSummary":
+        summary = cls()
+
+        summary.count   = data["count"]
+        summary.total   = data["total"]
+        summary.minimum = data["minimum"]
+        summary.maximum = data["maximum"]
+        summary.mean    = data["mean"]
+        summary.m2      = data["m2"]
+        summary.sketch  = QuantileSketch.from_dict(data["sketch"])
+
+        return summary
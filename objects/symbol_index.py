@@ -0,0 +1,241 @@
+import sqlite3
+from typing       import Any
+from rich.console import Console
+from rich.table   import Table
+from rich.style   import Style
+from rich         import box
+
+class SymbolIndex:
+    """A persistent inverted index of operators, operands and statements.
+
+    Maps every symbol collected by `ParsedCode` to the files and functions
+    where it occurs, together with the occurrence lines and the subset of
+    those lines that are inside a loop. The index is stored in a SQLite file,
+    so it survives between runs and can be updated incrementally: a file is
+    only re-indexed when the hash of its pre-compiled contents changes.
+
+    Attributes:
+        db_path: Path of the SQLite database.
+        connection: Open connection to the database.
+        commit_every: Number of indexed files between commits.
+        pending: Files indexed since the last commit.
+    """
+
+    SCHEMA: list[str] = [
+        """CREATE TABLE IF NOT EXISTS files (
+               id           INTEGER PRIMARY KEY,
+               path         TEXT UNIQUE NOT NULL,
+               content_hash TEXT NOT NULL
+           )""",
+        """CREATE TABLE IF NOT EXISTS occurrences (
+               symbol     TEXT    NOT NULL,
+               kind       TEXT    NOT NULL,
+               file_id    INTEGER NOT NULL REFERENCES files(id),
+               function   TEXT    NOT NULL,
+               lines      TEXT    NOT NULL,
+               loop_lines TEXT    NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS occurrences_symbol ON occurrences(symbol, kind)",
+        "CREATE INDEX IF NOT EXISTS occurrences_file ON occurrences(file_id)",
+    ]
+
+    def __init__(self, db_path: str, commit_every: int = 200) -> None:
+        """Opens (or creates) the index stored in `db_path`.
+
+        Args:
+            db_path: Path of the SQLite database.
+            commit_every: Number of indexed files between commits.
+        """
+        self.db_path     : str                = db_path
+        self.connection  : sqlite3.Connection = sqlite3.connect(db_path)
+        self.commit_every: int                = commit_every
+        self.pending     : int                = 0
+
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+        self.connection.commit()
+
+    def __enter__(self) -> "SymbolIndex":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    #==> Update methods <==####################################################
+
+    def add_file(self, parsed_code: Any) -> bool:
+        """Indexes (or re-indexes) the symbols of a parsed file.
+
+        Args:
+            parsed_code: A `ParsedCode` object without errors.
+
+        Returns:
+            False if the file was already indexed with the same contents.
+        """
+        path: str = parsed_code.file_source
+        row       = self.connection.execute(
+            "SELECT id, content_hash FROM files WHERE path = ?", (path,)
+        ).fetchone()
+
+        if row is not None and row[1] == parsed_code.content_hash:
+            return False
+
+        if row is None:
+            file_id: int = self.connection.execute(
+                "INSERT INTO files (path, content_hash) VALUES (?, ?)",
+                (path, parsed_code.content_hash),
+            ).lastrowid
+        else:
+            file_id = row[0]
+            self.connection.execute(
+                "UPDATE files SET content_hash = ? WHERE id = ?",
+                (parsed_code.content_hash, file_id),
+            )
+            self.connection.execute(
+                "DELETE FROM occurrences WHERE file_id = ?", (file_id,)
+            )
+
+        self.connection.executemany(
+            "INSERT INTO occurrences VALUES (?, ?, ?, ?, ?, ?)",
+            self.get_rows(parsed_code, file_id),
+        )
+
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+
+        return True
+
+    def get_rows(self, parsed_code: Any, file_id: int) -> list[tuple]:
+        """Builds the occurrence rows of a parsed file.
+
+        Global symbols are stored with an empty function name. Symbols are
+        stored as text whatever node value they were collected from.
+        """
+        rows: list[tuple] = []
+
+        scopes: list[tuple] = [
+            ("", {"operator": parsed_code.operators,
+                  "operand" : parsed_code.operands}, {}),
+        ]
+        for function in parsed_code.functions:
+            scopes.append((function.func_name,
+                           {"operator" : function.operators,
+                            "operand"  : function.operands,
+                            "statement": function.statements},
+                           function.in_loop))
+
+        for func_name, kinds, in_loop in scopes:
+            for kind, symbols in kinds.items():
+                for symbol, lines in symbols.items():
+                    loop_lines: list[int] = in_loop.get((kind, symbol), [])
+                    rows.append((str(symbol), kind, file_id, func_name,
+                                 self.join_lines(lines),
+                                 self.join_lines(loop_lines)))
+        return rows
+
+    def remove_file(self, path: str) -> None:
+        """Removes a file and all of its occurrences from the index."""
+        row = self.connection.execute(
+            "SELECT id FROM files WHERE path = ?", (path,)
+        ).fetchone()
+
+        if row is not None:
+            self.connection.execute("DELETE FROM occurrences WHERE file_id = ?", row)
+            self.connection.execute("DELETE FROM files WHERE id = ?", row)
+
+    def commit(self) -> None:
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self) -> None:
+        self.commit()
+        self.connection.close()
+
+    #==> Query methods <==#####################################################
+
+    def find(self, symbol: str, kind: str | None = None,
+             in_loop: bool = False) -> list[tuple[str, str, list[str], list[int]]]:
+        """Finds every occurrence of a symbol in the corpus.
+
+        A symbol can be recorded under several kinds in the same function
+        (e.g. `malloc` as the operator of a call and as an operand of a
+        `Decl`); such rows are grouped, with the union of their lines.
+
+        Args:
+            symbol: Operator, operand or statement to search for.
+            kind: Restrict to "operator", "operand" or "statement".
+            in_loop: Only return occurrences inside a loop.
+
+        Returns:
+            A list of (file, function, kinds, lines) tuples, one per function.
+            When `in_loop` is set, only the lines inside a loop are returned.
+        """
+        query : str       = ("SELECT f.path, o.function, o.kind, o.lines, o.loop_lines "
+                             "FROM occurrences o JOIN files f ON f.id = o.file_id "
+                             "WHERE o.symbol = ?")
+        params: list[Any] = [symbol]
+
+        if kind is not None:
+            query += " AND o.kind = ?"
+            params.append(kind)
+
+        if in_loop:
+            query += " AND o.loop_lines != ''"
+
+        query += " ORDER BY f.path, o.function, o.kind"
+
+        matches: dict[tuple[str, str], tuple[list[str], set[int]]] = dict()
+        for path, function, row_kind, lines, loop_lines in self.connection.execute(query, params):
+            kinds, occurrences = matches.setdefault((path, function), ([], set()))
+            kinds.append(row_kind)
+            occurrences.update(self.split_lines(loop_lines if in_loop else lines))
+
+        return [(path, function, kinds, sorted(occurrences))
+                for (path, function), (kinds, occurrences) in matches.items()]
+
+    def files_with(self, symbol: str, kind: str | None = None,
+                   in_loop: bool = False) -> list[str]:
+        """Returns the files where a symbol occurs, without duplicates."""
+        files: dict[str, None] = dict()
+
+        for path, _, _, _ in self.find(symbol, kind, in_loop):
+            files[path] = None
+
+        return list(files)
+
+    def print_matches(self, symbol: str, kind: str | None = None,
+                      in_loop: bool = False) -> None:
+        """Prints a table with the occurrences of a symbol."""
+        title: str = f"[bold][#00ffae]Occurrences of '{symbol}'[/]"
+        if in_loop:
+            title += " [bold]inside loops[/]"
+
+        border_style: Style = Style(color="#000000", bold=True)
+
+        table = Table(title=title,
+                      box=box.ROUNDED,
+                      show_header=True,
+                      header_style="bold #ffee00",
+                      border_style=border_style,
+                      )
+
+        table.add_column("File", style="cyan")
+        table.add_column("Function", style="#1cffa0")
+        table.add_column("Kind", style="#1cffa0")
+        table.add_column("Lines of Ocurrency", style="#1cffa0", justify="right")
+
+        for path, function, kinds, lines in self.find(symbol, kind, in_loop):
+            table.add_row(path, function or "<global>", ", ".join(kinds), f"{lines}")
+
+        Console().print(table)
+
+    #==> Utils <==#############################################################
+
+    @staticmethod
+    def join_lines(lines: list[int]) -> str:
+        return ",".join(map(str, lines))
+
+    @staticmethod
+    def split_lines(lines: str) -> list[int]:
+        return [int(line) for line in lines.split(",")] if lines else []
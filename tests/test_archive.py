@@ -0,0 +1,30 @@
+import io
+import os
+import sys
+import tarfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.archive import count_files, get_output_names, iter_members
+
+def test_output_names_keep_extension_on_collision():
+    assert get_output_names(["a/sub.zip", "a/sub.tar.gz", "a/other.tgz"]) == \
+        ["sub.zip", "sub.tar.gz", "other"]
+
+def test_output_names_fail_on_same_file_name():
+    with pytest.raises(ValueError):
+        get_output_names(["a/sub.zip", "b/sub.zip"])
+
+def test_tar_member_paths_are_normalized(tmp_path):
+    path: str = str(tmp_path / "sub.tar.gz")
+
+    with tarfile.open(path, "w:gz") as archive:
+        for name in ("./ex1/a.c", "./ex1/a.i"):
+            info      = tarfile.TarInfo(name)
+            info.size = 1
+            archive.addfile(info, io.BytesIO(b"\n"))
+
+    assert [name for name, _ in iter_members(path)] == ["ex1/a.c", "ex1/a.i"]
+    assert count_files(path) == 1
@@ -0,0 +1,45 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Comvis               import ParsedCode
+from objects.symbol_index import SymbolIndex
+
+# Calls through a struct member, an array of pointers and a dereferenced pointer
+SOURCE: str = """struct Ops { int (*fn)(int); };
+int twice(int x) { return 2 * x; }
+int (*table[2])(int);
+int main() {
+    struct Ops o;
+    int (*fp)(int) = twice;
+    int i = 0;
+    o.fn(i);
+    table[0](i);
+    (*fp)(i);
+    return twice(i);
+}
+"""
+
+def parse(directory: str) -> ParsedCode:
+    path: str = os.path.join(directory, "calls.c")
+    with open(path, "w") as file:
+        file.write(SOURCE)
+
+    return ParsedCode("calls", os.path.join(directory, ""), source=SOURCE,
+                      pre_compiled=f'# 1 "{path}"\n{SOURCE}')
+
+def test_struct_member_call_is_named_by_member(tmp_path):
+    parsed_code = parse(str(tmp_path))
+
+    assert not parsed_code.has_errors
+    operators = {symbol for function in parsed_code.functions for symbol in function.operators}
+    assert {"fn", "table", "fp", "twice"} <= operators
+    assert all(isinstance(symbol, str) for symbol in operators)
+
+def test_index_struct_member_call(tmp_path):
+    parsed_code = parse(str(tmp_path))
+
+    with SymbolIndex(str(tmp_path / "index.db")) as index:
+        assert index.add_file(parsed_code)
+        assert index.files_with("fn", "operator") == [parsed_code.file_source]
@@ -1,3 +1,6 @@
+import os
+import sys
+import numpy as np
 from math import log2
 from rich.console import Console
 from rich.table import Table
@@ -5,6 +8,27 @@ from rich.box import ROUNDED
 from rich.style import Style
 
 class HalsteadCalculator:
+	"""Halstead metrics from the operator and operand counts.
+
+	Counts can be typed interactively (`calculate_print`), or given in batch
+	as arrays with one row per program (`calculate_batch`), e.g. to recompute
+	the metrics of historical data without going back to the sources.
+	"""
+
+	COUNTS: list[str] = ["n1", "n2", "N1", "N2"]
+
+	METRICS: list[str] = [
+		"vocabulary",
+		"length",
+		"estimated_len",
+		"volume",
+		"difficulty",
+		"estimated_level",
+		"intelligence",
+		"effort",
+		"time_required",
+		"delivered_bugs",
+	]
 
 	def __init__(self):
 		self.n1: float = 0
@@ -74,6 +98,7 @@ class HalsteadCalculator:
 
 		# Print the table
 		console.print(table)
+
 	def calculate_print(self):
 		self.n1 = int(input("Distinc operators (n1): "))
 		self.n2 = int(input("Distinc operands  (n2): "))
@@ -83,6 +108,131 @@ class HalsteadCalculator:
 		self.calculate_metrics()
 		self.print_metrics()
 
-hals_calculator = HalsteadCalculator()	
-hals_calculator.calculate_print()
+	#==> Batch mode <==########################################################
+
+	@staticmethod
+	def calculate_batch(n1: np.ndarray, n2: np.ndarray,
+	                    N1: np.ndarray, N2: np.ndarray) -> dict[str, np.ndarray]:
+		"""Computes every metric of `calculate_metrics` for arrays of counts.
+
+		Rows where a metric would divide by zero or take the logarithm of zero
+		(n1, n2 or N2 not positive), or with a negative N1, do not raise: their
+		metrics are NaN and they are marked False in the "valid" array.
+
+		Returns:
+			A dictionary with one array per name in `METRICS`, plus "valid".
+		"""
+		n1, n2, N1, N2 = (np.asarray(column, dtype=np.float64) for column in (n1, n2, N1, N2))
+
+		valid: np.ndarray = (n1 > 0) & (n2 > 0) & (N2 > 0) & (N1 >= 0)
+
+		#######################################################################
+		# Invalid rows are computed with n1 = n2 = N2 = 1 and overwritten with
+		# NaN at the end, so no operation ever sees a zero.
+		#######################################################################
+		safe_n1: np.ndarray = np.where(valid, n1, 1)
+		safe_n2: np.ndarray = np.where(valid, n2, 1)
+		safe_N2: np.ndarray = np.where(valid, N2, 1)
+
+		vocabulary     : np.ndarray = n1 + n2
+		length         : np.ndarray = N1 + N2
+		estimated_len  : np.ndarray = safe_n1 * np.log2(safe_n1) + safe_n2 * np.log2(safe_n2)
+		volume         : np.ndarray = length * np.log2(np.where(valid, vocabulary, 2))
+		difficulty     : np.ndarray = (safe_n1 / 2) * (safe_N2 / safe_n2)
+		estimated_level: np.ndarray = 1 / difficulty
+		effort         : np.ndarray = difficulty * volume
+
+		metrics: dict[str, np.ndarray] = {
+			"vocabulary"     : vocabulary,
+			"length"         : length,
+			"estimated_len"  : estimated_len,
+			"volume"         : volume,
+			"difficulty"     : difficulty,
+			"estimated_level": estimated_level,
+			"intelligence"   : estimated_level * volume,
+			"effort"         : effort,
+			"time_required"  : effort / 18,
+			"delivered_bugs" : np.cbrt(effort) ** 2 / 3000,
+		}
+
+		for name in ("estimated_len", "volume", "difficulty", "estimated_level",
+		             "intelligence", "effort", "time_required", "delivered_bugs"):
+			metrics[name][~valid] = np.nan
+
+		metrics["valid"] = valid
+
+		return metrics
+
+	@classmethod
+	def read_counts(cls, path: str) -> dict[str, np.ndarray]:
+		"""Reads the n1, n2, N1 and N2 columns of a CSV, `.npz` or `.npy` file.
+
+		A CSV needs a header with the four column names (other columns are
+		ignored). A `.npz` needs arrays with those names, and a `.npy` an array
+		with the four counts as its columns, in that order.
+		"""
+		if path.endswith(".npz"):
+			with np.load(path) as data:
+				return {name: data[name] for name in cls.COUNTS}
+
+		if path.endswith(".npy"):
+			data: np.ndarray = np.load(path)
+			return {name: data[:, index] for index, name in enumerate(cls.COUNTS)}
+
+		with open(path) as file:
+			header: list[str] = file.readline().strip().split(",")
+
+		missing: list[str] = [name for name in cls.COUNTS if name not in header]
+		if missing:
+			raise ValueError(f"'{path}' has no column {', '.join(missing)}")
+
+		columns: np.ndarray = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2,
+		                                 usecols=[header.index(name) for name in cls.COUNTS])
+
+		return {name: columns[:, index] for index, name in enumerate(cls.COUNTS)}
+
+	@classmethod
+	def write_batch(cls, path: str, counts: dict[str, np.ndarray],
+	                metrics: dict[str, np.ndarray]) -> None:
+		"""Writes the counts and metrics to a CSV or `.npz` file.
+
+		Invalid rows are written with "nan" metrics and valid = 0.
+		"""
+		if os.path.dirname(path):
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+
+		if path.endswith(".npz"):
+			np.savez(path, **counts, **metrics)
+		else:
+			names  : list[str]  = cls.COUNTS + cls.METRICS + ["valid"]
+			columns: np.ndarray = np.column_stack([counts[name] for name in cls.COUNTS] +
+			                                      [metrics[name] for name in cls.METRICS] +
+			                                      [metrics["valid"]])
+
+			np.savetxt(path, columns, delimiter=",", header=",".join(names),
+			           comments="", fmt=["%d"] * 4 + ["%.10g"] * len(cls.METRICS) + ["%d"])
+
+		Console().print(f"Create {path}", style="bold green")
+
+	def calculate_file(self, input_path: str, output_path: str) -> None:
+		"""Batch mode: computes the metrics of every row of a file."""
+		counts : dict[str, np.ndarray] = self.read_counts(input_path)
+		metrics: dict[str, np.ndarray] = self.calculate_batch(**counts)
+
+		self.write_batch(output_path, counts, metrics)
+
+		invalid: int = int((~metrics["valid"]).sum())
+		if invalid:
+			Console().print(f"{invalid} rows with zero counts marked as invalid",
+			                style="bold yellow")
+
+if __name__ == "__main__":
+	hals_calculator = HalsteadCalculator()
+
+	if len(sys.argv) == 3:
+		# python utils/HalCal.py counts.csv metrics.csv
+		hals_calculator.calculate_file(sys.argv[1], sys.argv[2])
+	else:
+		hals_calculator.calculate_print()
+
 
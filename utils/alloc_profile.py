@@ -0,0 +1,305 @@
+import csv
+import gc
+import os
+import sys
+import tracemalloc
+from collections  import defaultdict
+from contextlib   import contextmanager
+from typing       import Any, Iterator
+from pycparser    import c_ast
+from rich.console import Console
+from rich.table   import Table
+from rich.style   import Style
+from rich         import box
+
+class AllocationProfiler:
+    """Memory allocated by every phase of the analysis of a file.
+
+    `ParsedCode` enters `phase` around parsing, visiting, line counting and
+    the aggregation of the metrics. A tracemalloc snapshot is taken before
+    and after each phase; the sites whose memory grew in between give the
+    memory the phase left allocated (e.g. the AST for "parse", the
+    occurrence lists and `Function` objects for "visit"). Memory freed during
+    the phase is ignored, so objects of earlier phases released meanwhile do
+    not hide it. The peak of the phase is measured too, so
+    temporary allocations are not missed.
+
+    The files of a directory are analyzed one by one with `profile_file`,
+    then reported with `print_report` and `export_csv`, and forgotten with
+    `clear`. Tracing is restarted for every file, so the snapshots only hold
+    the allocations of that file and their cost does not grow with the
+    number of files analyzed. Snapshots are still slow: this is a diagnosis
+    mode, not meant for the worker processes of a `BatchRunner`.
+
+    `profile_directory` analyzes one file before tracing starts, so the
+    one-time costs (imports, parser tables, the prelude of the headers, see
+    `utils.prelude`) are not charged to the first file. A file including
+    other headers than the previous ones still pays for their prelude.
+
+    Attributes:
+        top: Allocation sites kept per file and phase, and in the summary.
+        frames: Frames stored per allocation; sites are grouped by the
+            innermost one.
+        phases: (retained bytes, peak bytes) of every phase of the file
+            being analyzed.
+        sites: Retained bytes and blocks per (phase, site) of that file.
+        files: One row per analyzed file (see `FILE_COLUMNS`).
+        file_sites: (file, phase, site, bytes, blocks) of the `top` sites of
+            every file and phase.
+        directory_sites: Retained bytes and blocks per (phase, site) of all
+            the files since the last `clear`.
+    """
+
+    PHASES: list[str] = ["parse", "visit", "lines", "aggregation"]
+
+    ###########################################################################
+    # |> constant: FILE_COLUMNS
+    #
+    # Columns of the per-file CSV after "Filename".
+    ###########################################################################
+    FILE_COLUMNS: list[str] = [
+        "Parse (KB)", "Visit (KB)", "Lines (KB)", "Aggregation (KB)", "Peak (KB)",
+        "AST Nodes", "Symbol Occurrences", "Functions",
+        "Bytes per AST Node", "Bytes per Occurrence",
+    ]
+
+    def __init__(self, top: int = 10, frames: int = 1) -> None:
+        self.top   : int = top
+        self.frames: int = frames
+
+        self.phases         : dict[str, tuple[int, int]]           = dict()
+        self.sites          : dict[tuple[str, str], list[int]]     = defaultdict(lambda: [0, 0])
+        self.files          : list[list[Any]]                      = []
+        self.file_sites     : list[tuple[str, str, str, int, int]] = []
+        self.directory_sites: dict[tuple[str, str], list[int]]     = defaultdict(lambda: [0, 0])
+
+        # Allocations of the profiler itself. They are skipped once grouped
+        # by site: `Snapshot.filter_traces` matches every trace in Python and
+        # would cost more than the analysis.
+        self.ignored: set[str] = {tracemalloc.__file__, __file__}
+
+    def clear(self) -> None:
+        """Forgets the files analyzed so far."""
+        self.files.clear()
+        self.file_sites.clear()
+        self.directory_sites.clear()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Measures the allocations of the code run inside the context."""
+        before: tracemalloc.Snapshot = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        start: int = tracemalloc.get_traced_memory()[0]
+
+        try:
+            yield
+        finally:
+            peak : int                  = tracemalloc.get_traced_memory()[1] - start
+            after: tracemalloc.Snapshot = tracemalloc.take_snapshot()
+
+            retained: int = 0
+            for stat in after.compare_to(before, "lineno"):
+                if stat.size_diff <= 0 or stat.traceback[0].filename in self.ignored:
+                    continue
+
+                site: list[int] = self.sites[(name, get_site(stat.traceback[0]))]
+                site[0]  += stat.size_diff
+                site[1]  += stat.count_diff
+                retained += stat.size_diff
+
+            self.phases[name] = (retained, peak)
+
+    #==> Files <==#############################################################
+
+    def profile_file(self, filename: str, file_dir: str) -> Any:
+        """Analyzes a `.i` file with every phase measured.
+
+        Returns:
+            The `ParsedCode`, or None when it could not be parsed.
+        """
+        from Comvis import ParsedCode  # Comvis imports this module
+
+        self.phases.clear()
+        self.sites.clear()
+        gc.collect()  # Release the previous file before tracing
+
+        tracemalloc.start(self.frames)
+        try:
+            parsed_code: ParsedCode = ParsedCode(filename, file_dir, profiler=self)
+        finally:
+            tracemalloc.stop()
+
+        if parsed_code.has_errors:
+            return None
+
+        nodes      : int = count_nodes(parsed_code.ast)
+        occurrences: int = parsed_code.length
+        retained   : list[int] = [self.phases.get(phase, (0, 0))[0] for phase in self.PHASES]
+        peak       : int       = max((peak for _, peak in self.phases.values()), default=0)
+
+        self.files.append([
+            parsed_code.file_source,
+            *(round(size / 1024, 1) for size in retained),
+            round(peak / 1024, 1),
+            nodes,
+            occurrences,
+            parsed_code.number_of_functions,
+            round(retained[0] / nodes, 1) if nodes else 0,
+            round(retained[1] / occurrences, 1) if occurrences else 0,
+        ])
+
+        for phase in self.PHASES:
+            ranked = sorted(((size, blocks, site) for (name, site), (size, blocks)
+                             in self.sites.items() if name == phase), reverse=True)
+
+            for size, blocks, site in ranked[:self.top]:
+                self.file_sites.append((parsed_code.file_source, phase, site, size, blocks))
+
+        for key, (size, blocks) in self.sites.items():
+            self.directory_sites[key][0] += size
+            self.directory_sites[key][1] += blocks
+
+        return parsed_code
+
+    def get_top_sites(self) -> list[tuple[str, str, int, int]]:
+        """Returns the (phase, site, bytes, blocks) of the `top` sites of all
+        files, largest first."""
+        ranked = sorted(((size, blocks, phase, site) for (phase, site), (size, blocks)
+                         in self.directory_sites.items()), reverse=True)
+
+        return [(phase, site, size, blocks) for size, blocks, phase, site in ranked[:self.top]]
+
+    #==> Report <==############################################################
+
+    def print_report(self, title: str) -> None:
+        """Prints the summary of the files analyzed since the last `clear`."""
+        border_style: Style = Style(color="#000000", bold=True)
+        number      : int   = len(self.files)
+
+        table = Table(title=f"[bold][#00ffae]Allocations: {title} ({number} files)[/]",
+                      box=box.ROUNDED,
+                      show_header=True,
+                      header_style="bold #ffee00",
+                      border_style=border_style,
+                      )
+
+        table.add_column("Measure", style="cyan")
+        table.add_column("Total", style="#1cffa0", justify="right")
+        table.add_column("Mean per file", style="#1cffa0", justify="right")
+
+        for column, header in enumerate(self.FILE_COLUMNS[:-2], 1):
+            total: float = sum(row[column] for row in self.files)
+            table.add_row(header, f"{total:,.1f}".removesuffix(".0"),
+                          f"{total / number if number else 0:,.1f}")
+
+        nodes      : int = sum(row[6] for row in self.files)
+        occurrences: int = sum(row[7] for row in self.files)
+        parse      : float = sum(row[1] for row in self.files) * 1024
+        visit      : float = sum(row[2] for row in self.files) * 1024
+
+        table.add_row("Bytes per AST Node", f"{parse / nodes if nodes else 0:.1f}", "")
+        table.add_row("Bytes per Occurrence", f"{visit / occurrences if occurrences else 0:.1f}", "")
+
+        Console().print(table)
+
+        sites = Table(title=f"[bold][#00ffae]Top {self.top} allocation sites[/]",
+                      box=box.ROUNDED,
+                      show_header=True,
+                      header_style="bold #ffee00",
+                      border_style=border_style,
+                      )
+
+        sites.add_column("Phase", style="cyan")
+        sites.add_column("Site", style="cyan")
+        sites.add_column("KB", style="#1cffa0", justify="right")
+        sites.add_column("Blocks", style="#1cffa0", justify="right")
+
+        for phase, site, size, blocks in self.get_top_sites():
+            sites.add_row(phase, site, f"{size / 1024:,.1f}", str(blocks))
+
+        Console().print(sites)
+
+    def export_csv(self, dir: str, filename: str) -> None:
+        """Exports the per-file measures and the allocation sites.
+
+        Writes `<filename>_alloc.csv` (one row per file) and
+        `<filename>_alloc_sites.csv` (the top sites of every file and phase,
+        then those of the whole directory, with "*" as file).
+
+        Args:
+            dir: Output directory path.
+            filename: Output filename without extension.
+        """
+        file_name: str = f"{dir}{filename}"
+
+        os.makedirs(dir, exist_ok=True)
+
+        with open(f"{file_name}_alloc.csv", mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["Filename"] + self.FILE_COLUMNS)
+            writer.writerows(self.files)
+
+        with open(f"{file_name}_alloc_sites.csv", mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["Filename", "Phase", "Site", "Bytes", "Blocks"])
+            writer.writerows(self.file_sites)
+            writer.writerows(("*", *site) for site in self.get_top_sites())
+
+        Console().print(f"Create CSV: {file_name}_alloc", style="bold green")
+
+def get_site(frame: tracemalloc.Frame) -> str:
+    """Returns `file:line` of a frame, relative to its entry of `sys.path`
+    (e.g. `pycparser/c_parser.py:1234`)."""
+    for entry in sorted(filter(None, sys.path), key=len, reverse=True):
+        if frame.filename.startswith(os.path.join(entry, "")):
+            return f"{os.path.relpath(frame.filename, entry)}:{frame.lineno}"
+
+    return f"{frame.filename}:{frame.lineno}"
+
+def count_nodes(ast: c_ast.Node) -> int:
+    """Counts the nodes of a tree."""
+    number: int              = 0
+    stack : list[c_ast.Node] = [ast]
+
+    while stack:
+        node = stack.pop()
+        number += 1
+        stack.extend(child for _, child in node.children())
+
+    return number
+
+def profile_directory(base_input_dir: str, base_output_dir: str, top: int = 10,
+                      frames: int = 1) -> None:
+    """Profiles the allocations of every directory of `.i` files of a tree.
+
+    Every directory gets a summary table and the CSVs of `export_csv`,
+    under the same relative path as `Compsta.process_directory` uses.
+    """
+    from Comvis import ParsedCode
+
+    console = Console()
+
+    for root, _, files in sorted(os.walk(base_input_dir)):
+        first: str | None = min((file for file in files if file.endswith(".i")), default=None)
+        if first is not None:
+            ParsedCode(first[:-2], root + "/")  # Warm up before tracing
+            break
+
+    profiler = AllocationProfiler(top, frames)
+
+    for root, dirs, files in os.walk(base_input_dir):
+        dirs.sort()
+
+        names: list[str] = sorted(file[:-2] for file in files if file.endswith(".i"))
+        if not names:
+            continue
+
+        console.print(f"\nProfiling: [bold cyan]{root}[/]", style="bold")
+        profiler.clear()
+
+        for name in names:
+            profiler.profile_file(name, root + "/")
+
+        output_dir: str = os.path.join(base_output_dir, os.path.relpath(root, base_input_dir), "")
+        profiler.print_report(os.path.basename(root))
+        profiler.export_csv(output_dir, os.path.basename(root))
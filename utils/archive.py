@@ -0,0 +1,189 @@
+import os
+import tarfile
+import zipfile
+import multiprocessing
+from typing           import Iterator
+from Comvis           import ParsedCode
+from utils.batch      import analyze_file
+from utils.preprocess import Preprocessor
+
+###############################################################################
+# |> constant: ARCHIVE_EXTENSIONS
+#
+# Archives read by `iter_members`. Tar archives may be compressed with gzip,
+# bzip2 or xz.
+###############################################################################
+ARCHIVE_EXTENSIONS: tuple[str, ...] = (".zip", ".tar", ".tar.gz", ".tgz",
+                                       ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+###############################################################################
+# |> constant: ARCHIVE_ERRORS
+#
+# Errors of an archive that cannot be read (missing, truncated or corrupt).
+###############################################################################
+ARCHIVE_ERRORS: tuple[type[Exception], ...] = (OSError, EOFError, zipfile.BadZipFile,
+                                               tarfile.TarError)
+
+def is_archive(path: str) -> bool:
+    return os.path.isfile(path) and path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+def get_archive_name(path: str) -> str:
+    """Returns the file name of an archive without its archive extension."""
+    name: str = os.path.basename(path)
+
+    for extension in sorted(ARCHIVE_EXTENSIONS, key=len, reverse=True):
+        if name.lower().endswith(extension):
+            return name[:-len(extension)]
+
+    return name
+
+def get_output_names(paths: list[str]) -> list[str]:
+    """Returns the output directory name of every archive.
+
+    Archives are named without their archive extension (see
+    `get_archive_name`), unless two of them would share a name (`sub.zip`
+    and `sub.tar.gz`): those keep their extension.
+
+    Raises:
+        ValueError: Two archives have the same file name.
+    """
+    names    : list[str]      = [get_archive_name(path) for path in paths]
+    basenames: list[str]      = [os.path.basename(path) for path in paths]
+    seen     : dict[str, str] = dict()
+
+    for path, basename in zip(paths, basenames):
+        if basename in seen:
+            raise ValueError(f"Archives '{seen[basename]}' and '{path}' would be exported "
+                             f"to the same directory")
+        seen[basename] = path
+
+    return [basename if names.count(name) > 1 else name
+            for name, basename in zip(names, basenames)]
+
+def get_member_path(name: str) -> str:
+    """Normalizes an in-archive path (`./ex1/a.c` becomes `ex1/a.c`)."""
+    return os.path.normpath(name)
+
+def iter_members(path: str) -> Iterator[tuple[str, bytes]]:
+    """Yields (in-archive path, contents) of every regular file of an archive.
+
+    Members are read one at a time, in archive order, and nothing is written
+    to disk. Paths are normalized by `get_member_path`.
+    """
+    if path.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield (get_member_path(info.filename), archive.read(info))
+        return
+
+    with tarfile.open(path, mode="r:*") as archive:
+        for member in archive:
+            if member.isfile():
+                yield (get_member_path(member.name), archive.extractfile(member).read())
+
+def count_files(path: str, preprocessor: Preprocessor | None = None) -> int:
+    """Counts the files `iter_archive` analyzes, from the member names only.
+
+    Every `.c` member is one file; without a `preprocessor`, the `.i`
+    members without a `.c` are reported too. Compressed tar archives are
+    still decompressed to list their members.
+    """
+    if path.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            names: list[str] = [get_member_path(info.filename) for info in archive.infolist()
+                                if not info.is_dir()]
+    else:
+        with tarfile.open(path, mode="r:*") as archive:
+            names = [get_member_path(member.name) for member in archive if member.isfile()]
+
+    stems: dict[str, set[str]] = dict()
+    for name in names:
+        stem, extension = os.path.splitext(name)
+        stems.setdefault(extension, set()).add(stem)
+
+    sources: set[str] = stems.get(".c", set())
+    if preprocessor is not None:
+        return len(sources)
+
+    return len(sources | stems.get(".i", set()))
+
+def iter_archive(path: str, preprocessor: Preprocessor | None = None
+                 ) -> Iterator[tuple[str, ParsedCode | None, str | None]]:
+    """Analyzes the C files of an archive without extracting it.
+
+    With a `preprocessor`, every `.c` member is piped through it as soon as it
+    is read. Without one, a `.c` member is analyzed with the `.i` member of
+    the same name (both are needed: the `.i` is parsed and the `.c` lines are
+    counted); the members left without their pair are reported as errors
+    once the whole archive is read. Files are reported under
+    `<archive path>/<in-archive path>`.
+
+    Yields:
+        One (in-archive directory, parsed_code, error) tuple per file, as
+        `analyze_file` returns them, as soon as the file is completed.
+    """
+    sources     : dict[str, str] = dict()  # Stem -> .c contents
+    pre_compiled: dict[str, str] = dict()  # Stem -> .i contents
+
+    for name, data in iter_members(path):
+        stem, extension = os.path.splitext(name)
+
+        if extension == ".c":
+            sources[stem] = data.decode("utf-8", errors="replace")
+        elif extension == ".i" and preprocessor is None:
+            pre_compiled[stem] = data.decode("utf-8", errors="replace")
+        else:
+            continue
+
+        if stem not in sources or (preprocessor is None and stem not in pre_compiled):
+            continue
+
+        #==> Analyze as soon as the file is complete <==#
+        member_dir: str = os.path.dirname(stem)
+        dir_name  : str = os.path.join(path, member_dir, "")
+
+        parsed_code, error = analyze_file(os.path.basename(stem), dir_name,
+                                          preprocessor=preprocessor,
+                                          source=sources.pop(stem),
+                                          pre_compiled=pre_compiled.pop(stem, None))
+
+        yield (member_dir, parsed_code, error)
+
+    #==> Members without their pair <==#
+    for stem in sorted(sources):
+        yield (os.path.dirname(stem), None, f"{stem}.c has no {stem}.i member")
+
+    for stem in sorted(pre_compiled):
+        yield (os.path.dirname(stem), None, f"{stem}.i has no {stem}.c member")
+
+#==> Worker processes <==######################################################
+
+results_queue: "multiprocessing.Queue | None" = None
+
+def init_worker(queue: "multiprocessing.Queue") -> None:
+    """Pool initializer: the queue the results are streamed to."""
+    global results_queue
+    results_queue = queue
+
+def stream_archive(task: tuple[int, str], preprocessor: Preprocessor | None = None) -> None:
+    """Sends the results of an archive to the queue of `init_worker`.
+
+    Every result is put as `(index, result)` as soon as its file is analyzed,
+    followed by `(index, None)`, so the parent receives the `ParsedCode`
+    objects one by one instead of one pickled list per archive. An archive
+    that cannot be read is reported as an error of its root directory.
+
+    Args:
+        task: (index, path) of the archive.
+        preprocessor: Optional `Preprocessor` of the `.c` members.
+    """
+    index, path = task
+
+    try:
+        for result in iter_archive(path, preprocessor):
+            results_queue.put((index, result))
+    except ARCHIVE_ERRORS as error:
+        results_queue.put((index, ("", None, f"{type(error).__name__}: {error}")))
+
+    results_queue.put((index, None))
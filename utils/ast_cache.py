@@ -0,0 +1,66 @@
+import os
+import pickle
+import zlib
+import pycparser
+from typing    import Any
+from pycparser import c_ast
+
+class ASTCache:
+    """A persistent cache of parsed ASTs, keyed by the hash of the `.i` text.
+
+    Parsing costs far more than visiting, so re-running a changed visitor over
+    a corpus that was already parsed only needs to load the cached trees. The
+    trees are the ones returned by `utils.prelude.PreludeParser`, i.e. without
+    the nodes of the fake-libc headers, pickled and compressed with zlib
+    (about 1.5 KB per student file, loaded roughly 10x faster than parsed).
+
+    Every tree is a file `<directory>/pycparser-<version>/<xx>/<hash>.ast`,
+    written atomically, so several worker processes can share the cache and a
+    new pycparser version never loads trees built by another one.
+
+    Attributes:
+        directory: Root directory of the cache.
+        level: zlib compression level.
+        hits: Trees loaded from the cache.
+        misses: Trees not found (or unreadable) in the cache.
+    """
+
+    def __init__(self, directory: str, level: int = 1) -> None:
+        self.directory: str = directory
+        self.level    : int = level
+        self.hits     : int = 0
+        self.misses   : int = 0
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"pycparser-{pycparser.__version__}",
+                            key[:2], f"{key}.ast")
+
+    def get(self, key: str) -> c_ast.FileAST | None:
+        """Loads the tree of a `.i` hash, or returns None on a miss.
+
+        A corrupted or truncated entry counts as a miss and is overwritten by
+        the next `put`.
+        """
+        try:
+            with open(self.get_path(key), "rb") as file:
+                ast: Any = pickle.loads(zlib.decompress(file.read()))
+
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError, AttributeError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return ast
+
+    def put(self, key: str, ast: c_ast.FileAST) -> None:
+        """Stores the tree of a `.i` hash."""
+        path: str = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        data: bytes = zlib.compress(pickle.dumps(ast, protocol=pickle.HIGHEST_PROTOCOL),
+                                    self.level)
+
+        temporary: str = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
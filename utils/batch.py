@@ -0,0 +1,482 @@
+import os
+import csv
+import time
+import resource
+import multiprocessing
+from multiprocessing.connection import Connection, wait
+from os           import makedirs
+from collections  import deque
+from typing       import Any, Callable
+from rich.console import Console
+from Comvis       import ParsedCode
+from utils.preprocess import Preprocessor
+from objects.function_cache import FunctionCache
+from utils.ast_cache  import ASTCache
+from objects.plugins  import MetricPlugin
+
+###############################################################################
+# |> constant: PATHOLOGICAL
+#
+# Exceptions that mean the input itself is pathological (e.g. a nesting so
+# deep that the recursive visitor blows the stack). Files raising them are
+# quarantined instead of being reported as ordinary errors.
+###############################################################################
+PATHOLOGICAL: tuple[type[BaseException], ...] = (RecursionError, MemoryError)
+
+## ==> Memory helpers <== #####################################################
+
+def read_status_mb(field: str) -> float | None:
+    """Reads a memory field (e.g. VmRSS, VmHWM) of /proc/self/status in MB.
+
+    Returns:
+        The value in MB, or None where /proc is not available.
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    return None
+
+def get_rss_mb() -> float:
+    """Returns the current resident set size of this process in MB."""
+    rss: float | None = read_status_mb("VmRSS")
+
+    return rss if rss is not None else get_peak_rss_mb()
+
+def get_peak_rss_mb() -> float:
+    """Returns the peak resident set size since the last `reset_peak_rss`."""
+    peak: float | None = read_status_mb("VmHWM")
+
+    if peak is not None:
+        return peak
+
+    ###########################################################################
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS. It can not be
+    # reset, so without /proc it is the peak of the whole process lifetime.
+    ###########################################################################
+    maxrss: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if os.uname().sysname == "Darwin" else maxrss / 1024
+
+def reset_peak_rss() -> None:
+    """Resets the peak RSS counter (VmHWM) of this process, where supported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+def analyze_file(filename: str, dir_name: str,
+                 reraise: tuple[type[BaseException], ...] = (),
+                 preprocessor: Preprocessor | None = None,
+                 source: str | None = None, pre_compiled: str | None = None,
+                 function_cache: FunctionCache | None = None,
+                 ast_cache: ASTCache | None = None,
+                 plugins: list[type[MetricPlugin]] | None = None,
+                 sequences: bool = False
+                 ) -> tuple[ParsedCode | None, str | None]:
+    """Analyzes a single `.i` file, recording its peak memory.
+
+    Args:
+        filename: Name of the file without extension.
+        dir_name: Directory containing the file.
+        reraise: Exceptions that are raised instead of reported as errors.
+        preprocessor: Optional `Preprocessor`; the `.c` file is then
+            preprocessed in memory instead of reading the `.i` file.
+        source, pre_compiled: Optional contents of the `.c` and `.i` files
+            when they are not on disk (see `ParsedCode`).
+        function_cache: Optional `FunctionCache` (see `ParsedCode`).
+        ast_cache: Optional `ASTCache` (see `ParsedCode`).
+        plugins: Optional `MetricPlugin` classes (see `ParsedCode`).
+        sequences: Record the token sequences of the functions (see
+            `ParsedCode`).
+
+    Returns:
+        A tuple (parsed_code, error). `parsed_code` is None when the analysis
+        raised an exception, described by `error`.
+    """
+    reset_peak_rss()
+
+    try:
+        parsed_code: ParsedCode = ParsedCode(filename, dir_name, preprocessor,
+                                             source, pre_compiled, function_cache,
+                                             ast_cache, plugins, sequences=sequences)
+
+    except reraise:
+        raise
+
+    except Exception as e:
+        return (None, str(e))
+
+    parsed_code.peak_rss_mb = round(get_peak_rss_mb(), 1)
+
+    return (parsed_code, None)
+
+## ==> Worker <== ##############################################################
+
+def worker_main(connection: Connection, max_files: int, max_rss_mb: float | None,
+                preprocessor: Preprocessor | None = None,
+                function_cache: FunctionCache | None = None,
+                ast_cache: ASTCache | None = None,
+                plugins: list[type[MetricPlugin]] | None = None,
+                sequences: bool = False) -> None:
+    """Main loop of a worker process.
+
+    Receives (filename, dir_name) tasks and sends back
+    (parsed_code, error, quarantine, retire) tuples. The worker retires, i.e.
+    exits after answering, once it analyzed `max_files` files or its RSS is
+    above `max_rss_mb`, so memory fragmentation never accumulates for long. It
+    also retires after a pathological input.
+
+    A `function_cache` is copied, so the worker opens its own connection to
+    the store and flushes it when it retires.
+    """
+    files_done: int = 0
+
+    if function_cache is not None:
+        function_cache = FunctionCache(function_cache.path, function_cache.commit_every,
+                                       function_cache.max_entries)
+
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+
+        try:
+            parsed_code, error = analyze_file(*task, reraise=PATHOLOGICAL,
+                                              preprocessor=preprocessor,
+                                              function_cache=function_cache,
+                                              ast_cache=ast_cache,
+                                              plugins=plugins,
+                                              sequences=sequences)
+            quarantine: bool   = False
+
+        except PATHOLOGICAL as e:
+            parsed_code, error = (None, f"{type(e).__name__}: {e}")
+            quarantine         = True
+
+        files_done += 1
+
+        retire: bool = (quarantine or files_done >= max_files or
+                        (max_rss_mb is not None and get_rss_mb() > max_rss_mb))
+
+        connection.send((parsed_code, error, quarantine, retire))
+
+        if retire:
+            break
+
+    if function_cache is not None:
+        function_cache.close()
+
+    connection.close()
+
+class Worker:
+    """A worker process slot of a lane.
+
+    Attributes:
+        process: The running process, or None before the first task.
+        connection: Parent side of the pipe to the process.
+        task: Index of the task being analyzed, or None when idle.
+        started: Monotonic time when the current task was sent.
+    """
+
+    def __init__(self) -> None:
+        self.process   : multiprocessing.Process | None = None
+        self.connection: Connection | None              = None
+        self.task      : int | None                     = None
+        self.started   : float                          = 0
+
+    def start(self, max_files: int, max_rss_mb: float | None,
+              preprocessor: Preprocessor | None = None,
+              function_cache: FunctionCache | None = None,
+              ast_cache: ASTCache | None = None,
+              plugins: list[type[MetricPlugin]] | None = None,
+              sequences: bool = False) -> None:
+        parent, child = multiprocessing.Pipe()
+
+        self.process    = multiprocessing.Process(target=worker_main,
+                                                  args=(child, max_files, max_rss_mb,
+                                                        preprocessor, function_cache,
+                                                        ast_cache, plugins, sequences),
+                                                  daemon=True)
+        self.process.start()
+        child.close()
+        self.connection = parent
+
+    def stop(self) -> None:
+        """Stops the process, asking it politely first."""
+        if self.process is None:
+            return
+
+        try:
+            self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+        self.connection.close()
+        self.process    = None
+        self.connection = None
+
+    def kill(self) -> None:
+        """Kills the process immediately, e.g. when its task timed out."""
+        if self.process is None:
+            return
+
+        self.process.kill()
+        self.process.join()
+
+        self.connection.close()
+        self.process    = None
+        self.connection = None
+
+class Lane:
+    """A group of workers with its own queue of tasks.
+
+    Attributes:
+        name: Name of the lane, for messages.
+        workers: Worker slots; their number is the lane concurrency.
+        queue: Indexes of the tasks waiting for a worker.
+    """
+
+    def __init__(self, name: str, size: int) -> None:
+        self.name   : str          = name
+        self.workers: list[Worker] = [Worker() for _ in range(size)]
+        self.queue  : deque[int]   = deque()
+
+## ==> Runner <== ##############################################################
+
+class BatchRunner:
+    """Analyzes files in recycled worker processes under a memory budget.
+
+    Workers are restarted after `max_files_per_worker` files, or as soon as
+    their RSS is above `max_rss_mb`. Files whose `.i` is larger than
+    `huge_file_mb` go to a separate lane with `huge_workers` workers, so a few
+    huge ASTs never run side by side with the whole pool. Results come back
+    without their AST, which keeps the parent process small on long batches.
+
+    Every file can also be given a `timeout`. A file that times out, crashes
+    its worker (e.g. a stack overflow in pycparser) or raises one of the
+    `PATHOLOGICAL` exceptions is added to `quarantine` with the reason, its
+    worker is replaced, and the rest of the batch goes on at full throughput.
+
+    Use it as a context manager and pass it to `Compsta` (or
+    `Compsta.process_directory`), which then records the peak RSS of every
+    file in its output.
+
+    Attributes:
+        workers: Number of workers of the normal lane.
+        max_files_per_worker: Files analyzed by a worker before it restarts.
+        max_rss_mb: RSS threshold that makes a worker restart.
+        huge_file_mb: Size of the `.i` file above which it is sent to the
+            huge lane. None disables the huge lane.
+        huge_workers: Number of workers of the huge lane.
+        timeout: Maximum time in seconds to analyze one file. None disables it.
+        lanes: The normal lane and, if enabled, the huge lane.
+        restarts: Number of worker restarts.
+        quarantine: List of (file, reason) of the quarantined files.
+        busy_seconds: Total time the workers spent on tasks (see
+            `utils.telemetry`).
+        preprocessor: Optional `Preprocessor`. Workers then preprocess the
+            `.c` files themselves and pipe the output into the parser.
+        function_cache: Optional `FunctionCache`. Every worker keeps its own
+            copy, sharing the persistent store if the cache has one.
+        ast_cache: Optional `ASTCache` shared by the workers.
+        plugins: Optional `MetricPlugin` classes run by the workers.
+        sequences: Whether the workers record the token sequences of the
+            functions (see `ParsedCode`).
+    """
+
+    def __init__(self,
+                 workers             : int | None                      = None,
+                 max_files_per_worker: int                             = 200,
+                 max_rss_mb          : float | None                    = None,
+                 huge_file_mb        : float | None                    = None,
+                 huge_workers        : int                             = 1,
+                 timeout             : float | None                    = None,
+                 preprocessor        : Preprocessor | None             = None,
+                 function_cache      : FunctionCache | None            = None,
+                 ast_cache           : ASTCache | None                 = None,
+                 plugins             : list[type[MetricPlugin]] | None = None,
+                 sequences           : bool                            = False) -> None:
+        self.workers             : int                             = workers or os.cpu_count() or 1
+        self.max_files_per_worker: int                             = max_files_per_worker
+        self.max_rss_mb          : float | None                    = max_rss_mb
+        self.huge_file_mb        : float | None                    = huge_file_mb
+        self.huge_workers        : int                             = huge_workers
+        self.timeout             : float | None                    = timeout
+        self.preprocessor        : Preprocessor | None             = preprocessor
+        self.function_cache      : FunctionCache | None            = function_cache
+        self.ast_cache           : ASTCache | None                 = ast_cache
+        self.plugins             : list[type[MetricPlugin]] | None = plugins
+        self.sequences           : bool                            = sequences
+        self.restarts            : int                             = 0
+        self.busy_seconds        : float                           = 0
+
+        self.quarantine: list[tuple[str, str]] = list()
+
+        self.lanes: list[Lane] = [Lane("normal", self.workers)]
+        if huge_file_mb is not None:
+            self.lanes.append(Lane("huge", huge_workers))
+
+    def __enter__(self) -> "BatchRunner":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stops every worker."""
+        for lane in self.lanes:
+            for worker in lane.workers:
+                worker.stop()
+
+    def get_lane(self, filename: str, dir_name: str) -> Lane:
+        """Chooses the lane of a file by the size of its `.i` (or `.c`)."""
+        if self.huge_file_mb is None:
+            return self.lanes[0]
+
+        try:
+            size_mb: float = os.path.getsize(self.get_path((filename, dir_name))) / (1024 * 1024)
+        except OSError:
+            return self.lanes[0]
+
+        return self.lanes[1] if size_mb > self.huge_file_mb else self.lanes[0]
+
+    def run(self, tasks: list[tuple[str, str]],
+            on_result: Callable[[ParsedCode | None, str | None], None] | None = None
+            ) -> list[tuple[ParsedCode | None, str | None]]:
+        """Analyzes a list of files.
+
+        Args:
+            tasks: List of (filename, dir_name) tuples, as `ParsedCode` takes.
+            on_result: Optional callback receiving (parsed_code, error) as
+                soon as each file is done, in completion order.
+
+        Returns:
+            A list of (parsed_code, error) tuples in the order of `tasks`.
+        """
+        results: list[tuple[ParsedCode | None, str | None]] = [(None, None)] * len(tasks)
+
+        for index, task in enumerate(tasks):
+            self.get_lane(*task).queue.append(index)
+
+        busy: dict[Connection, Worker] = dict()
+
+        while True:
+            #==> Give a task to every idle worker <==#
+            for lane in self.lanes:
+                for worker in lane.workers:
+                    if worker.task is not None or not lane.queue:
+                        continue
+
+                    if worker.process is None:
+                        worker.start(self.max_files_per_worker, self.max_rss_mb,
+                                     self.preprocessor, self.function_cache,
+                                     self.ast_cache, self.plugins, self.sequences)
+
+                    worker.task    = lane.queue.popleft()
+                    worker.started = time.monotonic()
+                    worker.connection.send(tasks[worker.task])
+                    busy[worker.connection] = worker
+
+            if not busy:
+                break
+
+            #==> Collect answers <==#
+            for connection in wait(list(busy), self.get_wait_timeout(busy)):
+                worker = busy.pop(connection)
+                results[worker.task] = self.receive(worker, tasks[worker.task])
+                self.finish(worker, results[worker.task], on_result)
+
+            #==> Kill the workers whose task timed out <==#
+            if self.timeout is not None:
+                for connection, worker in list(busy.items()):
+                    if time.monotonic() - worker.started < self.timeout:
+                        continue
+
+                    reason: str = f"timeout after {self.timeout:g}s"
+                    worker.kill()
+                    self.restarts += 1
+                    self.add_quarantine(tasks[worker.task], reason)
+
+                    results[worker.task] = (None, reason)
+                    self.finish(worker, results[worker.task], on_result)
+                    del busy[connection]
+
+        return results
+
+    def finish(self, worker: Worker, result: tuple[ParsedCode | None, str | None],
+               on_result: Callable[[ParsedCode | None, str | None], None] | None) -> None:
+        """Frees a worker after its task, accounting its busy time."""
+        self.busy_seconds += time.monotonic() - worker.started
+        worker.task        = None
+
+        if on_result is not None:
+            on_result(*result)
+
+    def get_wait_timeout(self, busy: dict[Connection, Worker]) -> float | None:
+        """Returns how long to wait until the oldest running task times out."""
+        if self.timeout is None:
+            return None
+
+        oldest: float = min(worker.started for worker in busy.values())
+
+        return max(0, oldest + self.timeout - time.monotonic())
+
+    def receive(self, worker: Worker,
+                task: tuple[str, str]) -> tuple[ParsedCode | None, str | None]:
+        """Receives the answer of a worker, restarting it when it retires."""
+        try:
+            parsed_code, error, quarantine, retire = worker.connection.recv()
+
+        except EOFError:
+            worker.process.join(timeout=1)
+            exitcode = worker.process.exitcode
+            parsed_code, error, quarantine, retire = (
+                None, f"worker crashed (exit code {exitcode})", True, True)
+
+        if quarantine:
+            self.add_quarantine(task, error)
+
+        if retire:
+            worker.stop()
+            self.restarts += 1
+
+        return (parsed_code, error)
+
+    def get_path(self, task: tuple[str, str]) -> str:
+        """Returns the path of the file read by a task."""
+        filename, dir_name = task
+        extension: str     = ".c" if self.preprocessor is not None else ".i"
+
+        return f"{dir_name}{filename}{extension}"
+
+    def add_quarantine(self, task: tuple[str, str], reason: str) -> None:
+        self.quarantine.append((self.get_path(task), reason))
+
+    def export_quarantine(self, dir: str, filename: str = "quarantine") -> None:
+        """Exports the quarantined files and their reasons to a CSV file.
+
+        Args:
+            dir: Output directory path.
+            filename: Output filename without extension.
+        """
+        file_name: str = f"{dir}{filename}"
+
+        makedirs(dir, exist_ok=True)
+
+        with open(f"{file_name}.csv", mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["File", "Reason"])
+            writer.writerows(self.quarantine)
+
+        Console().print(f"Create CSV: {file_name} ({len(self.quarantine)} quarantined)",
+                        style="bold yellow")
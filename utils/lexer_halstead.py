@@ -0,0 +1,624 @@
+import csv
+import os
+import re
+import time
+import numpy as np
+from typing       import Any, Iterator
+from pycparser    import c_lexer
+from rich.console import Console
+from rich.table   import Table
+from rich.style   import Style
+from rich         import box
+from Comvis         import ParsedCode
+from utils.HalCal   import HalsteadCalculator
+
+###############################################################################
+# |> constant: TOKEN_PATTERN
+#
+# The token definitions of pycparser's `CLexer`, compiled into one regular
+# expression. PLY tries the alternatives of its master pattern in definition
+# order for every token (~12 µs per token); with the frequent tokens first,
+# the same definitions are matched about 8x faster.
+###############################################################################
+_C = c_lexer.CLexer
+
+_PUNCTUATORS: list[str] = sorted(
+    [value for name, value in vars(_C).items()
+     if name.startswith("t_") and isinstance(value, str)
+     and name not in ("t_ignore", "t_ppline_ignore", "t_pppragma_ignore", "t_STRING_LITERAL")]
+    + [r"\{", r"\}"],
+    key=lambda pattern: -len(pattern.replace("\\", "")),
+)
+
+TOKEN_PATTERN: re.Pattern = re.compile("|".join([
+    r"(?P<space>\s+)",
+    rf"(?P<string>(?:L|u8|u|U)?{_C.string_literal})",
+    rf"(?P<char>(?:L|u8|u|U)?{_C.char_const})",
+    rf"(?P<id>{_C.identifier})",
+    rf"(?P<float>{_C.hex_floating_constant}|{_C.floating_constant})",
+    rf"(?P<int>(?:{_C.hex_constant}|{_C.bin_constant}|{_C.octal_constant}|"
+    rf"{_C.decimal_constant})(?![0-9a-zA-Z_]))",
+    rf"(?P<op>{'|'.join(_PUNCTUATORS)})",
+]))
+
+LINE_MARKER: re.Pattern = re.compile(r'^#\s*(?:line\s+)?\d+\s+"([^"]*)".*$', re.MULTILINE)
+
+HEADER_TYPEDEF: re.Pattern = re.compile(r"\btypedef\b[^;{}]*?\b([a-zA-Z_]\w*)\s*;")
+
+###############################################################################
+# |> variable: HEADER_TYPEDEFS
+#
+# Typedef names of the header regions of a file, keyed by the text of those
+# regions: files including the same headers are scanned once.
+###############################################################################
+HEADER_TYPEDEFS: dict[str, frozenset[str]] = dict()
+
+KEYWORDS: set[str] = set(_C.keyword_map) | set(getattr(_C, "keyword_map_new", {}))
+
+###############################################################################
+# |> constant: TYPE_KEYWORDS
+#
+# Keywords that start a declaration or a type name (besides typedef names).
+###############################################################################
+TYPE_KEYWORDS: set[str] = {
+    "void", "char", "short", "int", "long", "float", "double", "signed", "unsigned",
+    "_Bool", "_Complex", "__int128", "const", "volatile", "restrict", "static",
+    "extern", "auto", "register", "inline", "struct", "union", "enum",
+}
+
+QUALIFIERS: set[str] = {"const", "volatile", "restrict", "static", "extern", "auto",
+                        "register", "inline"}
+
+###############################################################################
+# |> constant: OPERATOR_KEYWORDS
+#
+# Keywords counted as operators, named as `ParsedCode.extract_operator` names
+# them. `switch`, `case`, `break`, `continue`, `goto` and `else` are not
+# Halstead operators there either.
+###############################################################################
+OPERATOR_KEYWORDS: dict[str, str] = {
+    "if"    : "if",
+    "for"   : "for",
+    "while" : "while",
+    "do"    : "doWhile",
+    "return": "return",
+    "sizeof": "sizeof",
+}
+
+###############################################################################
+# |> constant: IGNORED_PUNCTUATORS
+#
+# Punctuators that are not operators: `?:` only counts for cognitive
+# complexity, and `]` closes the `[]` operator.
+###############################################################################
+IGNORED_PUNCTUATORS: set[str] = {";", ",", "(", ")", "{", "}", "]", "?", ":", "..."}
+
+class LexedCode:
+    """Approximate Halstead counts of a `.i` file, from its tokens only.
+
+    A triage mode for very large corpora: the file is split by its line
+    markers, only the lines of the main file are tokenized (the fake-libc
+    headers are only scanned for their typedef names), and every token is
+    classified with the conventions of `ParsedCode.extract_operator` and
+    `get_node_value`, without building an AST:
+
+    - `if`, `for`, `while`, `do` (as "doWhile"), `return` and `sizeof` are
+      operators, and so are the C operators, `[` (as "[]"), `.` and `->`
+      (both as "->"), postfix `++`/`--` (as "p++"/"p--"), `typedef` and the
+      type of a cast ("int", "int*").
+    - Identifiers and constants are operands. A called function is an
+      operator, and also an operand inside a declaration or the arguments of
+      another call. Typedef names, keywords, labels, enumerator names and the
+      header and parameters of a function definition are not counted.
+    - Distinct counts are summed per function, as in `ParsedCode`: file-level
+      declarations count in the function defined before them.
+
+    The counts are therefore close to, not equal to, those of `ParsedCode`;
+    `LexerAccuracy` measures the difference on a reference corpus.
+
+    Attributes:
+        filename: Name of the file without extension.
+        file_dir: Directory containing the file.
+        file_pre_compiled: Path of the `.i` file.
+        main_file: Path of the main file, from the first line marker.
+        typedefs: Typedef names declared so far.
+        scopes: One (operators, operands) pair of occurrence counts per
+            function, the first one for the declarations before any function.
+        n1, n2, N1, N2: Halstead counts.
+    """
+
+    def __init__(self, filename: str, file_dir: str, pre_compiled: str | None = None) -> None:
+        """Tokenizes and counts a `.i` file.
+
+        Args:
+            filename: Name of the file, without extension.
+            file_dir: Directory containing the file.
+            pre_compiled: Optional contents of the `.i` file, read from disk
+                when None.
+        """
+        self.filename         : str = filename
+        self.file_dir         : str = os.path.join(file_dir, "")
+        self.file_pre_compiled: str = f"{self.file_dir}{filename}.i"
+        self.main_file        : str = ""
+
+        self.typedefs: set[str]                                    = set()
+        self.scopes  : list[tuple[dict[str, int], dict[str, int]]] = [({}, {})]
+
+        self.n1: int = 0
+        self.n2: int = 0
+        self.N1: int = 0
+        self.N2: int = 0
+
+        if pre_compiled is None:
+            with open(self.file_pre_compiled) as file:
+                pre_compiled = file.read()
+
+        self.count(self.tokenize(self.get_main_text(pre_compiled)))
+
+        for operators, operands in self.scopes:
+            self.n1 += len(operators)
+            self.n2 += len(operands)
+            self.N1 += sum(operators.values())
+            self.N2 += sum(operands.values())
+
+    #==> Tokens <==############################################################
+
+    def get_main_text(self, text: str) -> str:
+        """Returns the lines of the main file, collecting the typedef names of
+        the other regions."""
+        main_parts  : list[str] = []
+        other_parts : list[str] = []
+        current_file: str       = ""
+        position    : int       = 0
+
+        for marker in LINE_MARKER.finditer(text):
+            parts: list[str] = main_parts if current_file == self.main_file else other_parts
+            parts.append(text[position:marker.start()])
+
+            current_file   = marker.group(1)
+            self.main_file = self.main_file or current_file
+            position       = marker.end()
+
+        (main_parts if current_file == self.main_file else other_parts).append(text[position:])
+
+        headers : str                   = "".join(other_parts)
+        typedefs: frozenset[str] | None = HEADER_TYPEDEFS.get(headers)
+        if typedefs is None:
+            typedefs = HEADER_TYPEDEFS[headers] = frozenset(HEADER_TYPEDEF.findall(headers))
+
+        self.typedefs.update(typedefs)
+
+        return "".join(main_parts)
+
+    @staticmethod
+    def tokenize(text: str) -> list[tuple[str, str]]:
+        """Returns the (kind, value) of every token. Kinds are "id", "keyword",
+        "const", "string" and "op"."""
+        tokens: list[tuple[str, str]] = []
+
+        for match in TOKEN_PATTERN.finditer(text):
+            kind : str = match.lastgroup
+            value: str = match.group()
+
+            if kind == "space":
+                continue
+            if kind == "id":
+                kind = "keyword" if value in KEYWORDS else "id"
+            elif kind in ("char", "float", "int"):
+                kind = "const"
+
+            tokens.append((kind, value))
+
+        return tokens
+
+    #==> Counting <==##########################################################
+
+    def add(self, index: int, value: str) -> None:
+        """Adds an occurrence to the operators (0) or operands (1) of the
+        current scope."""
+        counts: dict[str, int] = self.scopes[-1][index]
+        counts[value] = counts.get(value, 0) + 1
+
+    def is_type_start(self, token: tuple[str, str]) -> bool:
+        kind, value = token
+        return (kind == "keyword" and value in TYPE_KEYWORDS) or (kind == "id" and value in self.typedefs)
+
+    @staticmethod
+    def find_closing(tokens: list[tuple[str, str]], start: int) -> int:
+        """Returns the index of the `)` matching the `(` at `start`."""
+        depth: int = 0
+
+        for index in range(start, len(tokens)):
+            value: str = tokens[index][1]
+            if value == "(":
+                depth += 1
+            elif value == ")":
+                depth -= 1
+                if depth == 0:
+                    return index
+
+        return len(tokens) - 1
+
+    @staticmethod
+    def find_function_body(tokens: list[tuple[str, str]], start: int) -> int | None:
+        """Returns the index of the `{` of a function definition starting at
+        `start`, or None for any other file-level declaration."""
+        parens: int = 0
+
+        for index in range(start, len(tokens)):
+            value: str = tokens[index][1]
+
+            if value == "(":
+                parens += 1
+            elif value == ")":
+                parens -= 1
+            elif parens == 0:
+                if value == "{":
+                    return index if index > start and tokens[index - 1][1] == ")" else None
+                if value in (";", "="):
+                    return None
+
+        return None
+
+    def count(self, tokens: list[tuple[str, str]]) -> None:
+        """Classifies every token into the operators and operands of its scope."""
+        depth          : int        = 0      # Brace depth
+        parens         : list[str]  = []     # Kind of every open parenthesis
+        do_depths      : list[int]  = []     # Brace depth of every open `do`
+        enum_depth     : int | None = None   # Brace depth inside an enum body
+        statement_start: bool       = True
+        in_declaration : bool       = False
+
+        index: int = 0
+        while index < len(tokens):
+            kind, value = tokens[index]
+            previous: tuple[str, str] = tokens[index - 1] if index > 0 else ("op", ";")
+            following: tuple[str, str] = tokens[index + 1] if index + 1 < len(tokens) else ("op", ";")
+
+            #==> File-level declarations and function definitions <==#
+            if depth == 0 and statement_start:
+                body: int | None = self.find_function_body(tokens, index)
+                if body is not None:
+                    self.scopes.append(({}, {}))
+                    depth, index = 1, body + 1
+                    parens.clear()
+                    continue
+
+            if statement_start:
+                in_declaration = self.is_type_start((kind, value))
+            starts_statement: bool = False
+
+            if kind == "keyword":
+                if value == "typedef":
+                    index = self.count_typedef(tokens, index)
+                    statement_start = True
+                    continue
+
+                if value == "goto":
+                    index += 2  # The label
+                    continue
+
+                if value == "do":
+                    do_depths.append(depth)
+
+                elif value == "while" and do_depths and do_depths[-1] == depth and \
+                        previous[1] in ("}", ";"):
+                    do_depths.pop()  # The `while` of a do-while
+                    index += 1
+                    continue
+
+                if value in OPERATOR_KEYWORDS:
+                    self.add(0, OPERATOR_KEYWORDS[value])
+                    starts_statement = value == "do"
+
+            elif kind == "id":
+                if value in self.typedefs:
+                    pass
+
+                elif enum_depth == depth and previous[1] in ("{", ","):
+                    pass  # Enumerator name
+
+                elif previous[1] == "enum":
+                    pass  # Enum tag
+
+                elif statement_start and following[1] == ":" and not parens:
+                    starts_statement = True  # Label
+
+                elif following[1] == "(" and depth > 0:
+                    self.add(0, value)  # Called function
+                    if in_declaration or "call" in parens:
+                        self.add(1, value)
+
+                else:
+                    self.add(1, value)
+
+            elif kind == "string":
+                #==> Adjacent literals are one constant, as pycparser joins them <==#
+                while index + 1 < len(tokens) and tokens[index + 1][0] == "string":
+                    index += 1
+                    value  = value[:-1] + tokens[index][1][1:]
+                self.add(1, value)
+
+            elif kind == "const":
+                self.add(1, value)
+
+            #==> Punctuators <==#
+            elif value == "(":
+                if previous[1] in ("if", "for", "while", "switch", "sizeof"):
+                    parens.append(previous[1])
+                    starts_statement = previous[1] == "for"
+
+                elif previous[0] == "id" and previous[1] not in self.typedefs:
+                    parens.append("call" if depth > 0 else "declarator")
+
+                elif previous[1] not in (")", "]") and previous[0] not in ("const", "string") \
+                        and self.is_type_start(following):
+                    parens.append("cast")
+                    self.count_cast(tokens, index)
+
+                else:
+                    parens.append("group")
+
+            elif value == ")":
+                if parens:
+                    parens.pop()
+
+            elif value == "{":
+                if previous[1] == "enum" or (index > 1 and tokens[index - 2][1] == "enum"):
+                    enum_depth = depth + 1
+                depth += 1
+                starts_statement = True
+
+            elif value == "}":
+                if enum_depth == depth:
+                    enum_depth = None
+                depth -= 1
+                starts_statement = True
+
+            elif value == ";":
+                starts_statement = not parens or parens[-1] == "for"
+
+            elif value == "=" and enum_depth == depth:
+                pass  # Enumerator value
+
+            elif value in ("++", "--"):
+                postfix: bool = previous[0] in ("id", "const") or previous[1] in (")", "]")
+                self.add(0, f"p{value}" if postfix else value)
+
+            elif value == "[":
+                self.add(0, "[]")
+
+            elif value == ".":
+                self.add(0, "->")
+
+            elif value not in IGNORED_PUNCTUATORS:
+                self.add(0, value)
+
+            statement_start = starts_statement
+            index += 1
+
+    def count_typedef(self, tokens: list[tuple[str, str]], start: int) -> int:
+        """Counts a typedef as `ParsedCode.visit_Typedef` does: the `typedef`
+        operator and the new name, without the declared type.
+
+        Returns:
+            The index after the typedef.
+        """
+        braces: int        = 0
+        name  : str | None = None
+        index : int        = start  # `typedef` may be the last token
+
+        for index in range(start + 1, len(tokens)):
+            kind, value = tokens[index]
+
+            if value == "{":
+                braces += 1
+            elif value == "}":
+                braces -= 1
+            elif braces == 0 and kind == "id":
+                name = value
+            elif braces == 0 and value == ";":
+                break
+
+        self.add(0, "typedef")
+        if name is not None:
+            self.add(1, name)
+            self.typedefs.add(name)
+
+        return index + 1
+
+    def count_cast(self, tokens: list[tuple[str, str]], start: int) -> None:
+        """Counts the operator of a cast, named as `ParsedCode.extract_operator`
+        names it. The `*` of a pointer cast is also counted, by the caller."""
+        end  : int       = self.find_closing(tokens, start)
+        names: list[str] = [value for kind, value in tokens[start + 1:end]
+                            if kind in ("keyword", "id") and value not in QUALIFIERS]
+
+        if not names or names[0] in ("struct", "union", "enum"):
+            self.add(0, "")
+        else:
+            pointer: bool = any(value == "*" for _, value in tokens[start + 1:end])
+            self.add(0, names[0] + ("*" if pointer else ""))
+
+#==> Corpus <==################################################################
+
+def iter_files(base_dir: str) -> Iterator[tuple[str, str]]:
+    """Yields (directory, filename without extension) of every `.i` file of a
+    tree, in a deterministic order."""
+    for root, dirs, files in os.walk(base_dir):
+        dirs.sort()
+
+        for file in sorted(files):
+            if file.endswith(".i"):
+                yield (root, file[:-2])
+
+def lex_directory(base_dir: str, output_path: str, chunk_size: int = 1000) -> int:
+    """Writes the approximate Halstead metrics of every `.i` file of a tree.
+
+    Rows are written every `chunk_size` files, with the metrics of the chunk
+    computed at once by `HalsteadCalculator.calculate_batch`, so memory stays
+    constant however large the corpus is.
+
+    Returns:
+        The number of files written.
+    """
+    header: list[str] = ["Path"] + HalsteadCalculator.COUNTS + HalsteadCalculator.METRICS
+    number: int       = 0
+
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    with open(output_path, mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+
+        chunk: list[LexedCode] = []
+        for root, filename in iter_files(base_dir):
+            try:
+                chunk.append(LexedCode(filename, root))
+            except Exception as e:
+                Console().print(f"ERROR PROCESSING '{filename}': {type(e).__name__}: {e}",
+                                style="bold yellow")
+
+            if len(chunk) >= chunk_size:
+                number += write_chunk(writer, chunk)
+                chunk.clear()
+
+        number += write_chunk(writer, chunk)
+
+    Console().print(f"Create CSV: {output_path} ({number} files)", style="bold green")
+
+    return number
+
+def write_chunk(writer: Any, chunk: list[LexedCode]) -> int:
+    if not chunk:
+        return 0
+
+    counts : dict[str, np.ndarray] = {name: np.array([getattr(code, name) for code in chunk])
+                                      for name in HalsteadCalculator.COUNTS}
+    metrics: dict[str, np.ndarray] = HalsteadCalculator.calculate_batch(**counts)
+
+    for row, code in enumerate(chunk):
+        writer.writerow([code.file_pre_compiled] +
+                        [int(counts[name][row]) for name in HalsteadCalculator.COUNTS] +
+                        [round(float(metrics[name][row]), 2) for name in HalsteadCalculator.METRICS])
+
+    return len(chunk)
+
+#==> Accuracy <==##############################################################
+
+class LexerAccuracy:
+    """Error of `LexedCode` against `ParsedCode` on a reference corpus.
+
+    Every `.i` file of the corpus is analyzed in both modes, and every metric
+    of `METRICS` is compared: the report gives the mean, median and maximum
+    relative error, the share of files within 10% of the AST value, and the
+    time spent by each mode.
+
+    Attributes:
+        base_dir: Root of the reference corpus.
+        rows: Per file: path, then (AST, lexer) value of every metric.
+        ast_seconds, lexer_seconds: Total analysis time of each mode.
+        skipped: Files that could not be analyzed in AST or lexer mode.
+    """
+
+    METRICS: list[str] = ["n1", "n2", "N1", "N2", "volume", "difficulty", "effort"]
+
+    def __init__(self, base_dir: str) -> None:
+        self.base_dir     : str             = base_dir
+        self.rows         : list[list[Any]] = []
+        self.ast_seconds  : float           = 0
+        self.lexer_seconds: float           = 0
+        self.skipped      : int             = 0
+
+        self.compare()
+
+    def compare(self) -> None:
+        for root, filename in iter_files(self.base_dir):
+            started: float = time.perf_counter()
+            try:
+                parsed: ParsedCode = ParsedCode(filename, os.path.join(root, ""))
+            except Exception:
+                parsed = None
+            self.ast_seconds += time.perf_counter() - started
+
+            started = time.perf_counter()
+            try:
+                lexed: LexedCode | None = LexedCode(filename, root)
+            except Exception as e:
+                Console().print(f"ERROR PROCESSING '{filename}': {type(e).__name__}: {e}",
+                                style="bold yellow")
+                lexed = None
+            self.lexer_seconds += time.perf_counter() - started
+
+            if parsed is None or parsed.has_errors or lexed is None:
+                self.skipped += 1
+                continue
+
+            metrics: dict[str, np.ndarray] = HalsteadCalculator.calculate_batch(
+                *(np.array([getattr(lexed, name)]) for name in HalsteadCalculator.COUNTS)
+            )
+
+            row: list[Any] = [lexed.file_pre_compiled]
+            for name in self.METRICS:
+                approximate: float = getattr(lexed, name) if name in HalsteadCalculator.COUNTS \
+                                     else float(metrics[name][0])
+                row += [getattr(parsed, name), approximate]
+
+            self.rows.append(row)
+
+    def get_errors(self, metric: str) -> np.ndarray:
+        """Returns the relative error of a metric for every file."""
+        column : int        = 1 + 2 * self.METRICS.index(metric)
+        exact  : np.ndarray = np.array([row[column] for row in self.rows], dtype=np.float64)
+        approx : np.ndarray = np.array([row[column + 1] for row in self.rows], dtype=np.float64)
+
+        return np.abs(approx - exact) / np.maximum(np.abs(exact), 1e-12)
+
+    def print_report(self) -> None:
+        border_style: Style = Style(color="#000000", bold=True)
+
+        table = Table(title=f"[bold][#00ffae]Lexer mode accuracy: {self.base_dir}[/]",
+                      box=box.ROUNDED,
+                      show_header=True,
+                      header_style="bold #ffee00",
+                      border_style=border_style,
+                      )
+
+        table.add_column("Metric", style="cyan")
+        for header in ("Mean error", "Median error", "Max error", "Within 10%"):
+            table.add_column(header, style="#1cffa0", justify="right")
+
+        for metric in self.METRICS:
+            errors: np.ndarray = self.get_errors(metric) if self.rows else np.zeros(1)
+            table.add_row(metric, f"{errors.mean():.1%}", f"{np.median(errors):.1%}",
+                          f"{errors.max():.1%}", f"{(errors <= 0.1).mean():.0%}")
+
+        Console().print(table)
+
+        speedup: float = self.ast_seconds / self.lexer_seconds if self.lexer_seconds else 0
+        Console().print(f"Files: {len(self.rows)} (skipped {self.skipped}) | "
+                        f"AST: {self.ast_seconds:.2f}s | lexer: {self.lexer_seconds:.2f}s | "
+                        f"speedup: {speedup:.1f}x", style="bold", highlight=False)
+
+    def export_csv(self, dir: str, filename: str) -> None:
+        """Exports the AST and lexer values of every file to a CSV file.
+
+        Args:
+            dir: Output directory path.
+            filename: Output filename without extension.
+        """
+        file_name: str = f"{dir}{filename}"
+
+        os.makedirs(dir, exist_ok=True)
+
+        header: list[str] = ["Path"]
+        for metric in self.METRICS:
+            header += [f"{metric} (ast)", f"{metric} (lexer)"]
+
+        with open(f"{file_name}.csv", mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            writer.writerows(self.rows)
+
+        Console().print(f"Create CSV: {file_name}", style="bold green")
@@ -0,0 +1,174 @@
+import re
+from hashlib   import blake2b
+from pycparser import c_parser, c_ast, plyparser
+
+###############################################################################
+# |> constant: LINE_MARKER
+#
+# Matches the line markers emitted by `gcc -E`, e.g.:
+#
+#   # 1 "Examples/sort.c"
+#   # 2 "../pycparser-main/utils/fake_libc_include/stdio.h" 2
+###############################################################################
+LINE_MARKER = re.compile(r'^#\s*(?:line\s+)?(\d+)\s+"([^"]*)"')
+
+class PreludeParser(c_parser.CParser):
+    """A CParser that caches the typedef scope of the fake-libc prelude.
+
+    Every `.i` produced with `fake_libc_include` starts with the same block of
+    typedefs and declarations coming from the headers. This parser splits that
+    block (the *prelude*) from the student's code, parses each distinct
+    prelude only once and starts parsing every following file from the cached
+    typedef scope, so only the student's own code is lexed and parsed.
+
+    The nodes of the prelude are never part of the returned AST. They would be
+    discarded by `ParsedCode.is_real_node` anyway.
+
+    Attributes:
+        scopes: Typedef scopes keyed by prelude hash. A `None` value marks a
+            prelude that could not be parsed on its own.
+        hits: Number of files parsed from a cached prelude scope.
+        misses: Number of preludes parsed from scratch.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+
+        self.scopes: dict[str, dict[str, bool] | None] = dict()
+        self.hits  : int = 0
+        self.misses: int = 0
+
+    def parse_text(self, text: str, filename: str = "") -> c_ast.FileAST:
+        """Parses a preprocessed translation unit, skipping its header prelude.
+
+        Falls back to a full parse when the file has no prelude or when its
+        prelude can not be parsed on its own.
+
+        Args:
+            text: Contents of the `.i` file.
+            filename: Name of the `.i` file, used in error messages.
+
+        Returns:
+            The AST of the code that follows the prelude.
+        """
+        prelude, body = self.split_prelude(text)
+
+        if not prelude:
+            return self.parse(text, filename)
+
+        key  : str                    = self.prelude_key(prelude)
+        scope: dict[str, bool] | None = self.get_scope(key, prelude, filename)
+
+        if scope is None:
+            return self.parse(text, filename)
+
+        return self.parse_from_scope(body, filename, scope)
+
+    def parse_from_scope(self, text: str, filename: str,
+                         scope: dict[str, bool]) -> c_ast.FileAST:
+        """Parses `text` starting from an already populated typedef scope.
+
+        Mirrors `CParser.parse`, which always resets the scope stack.
+        """
+        self.clex.filename = filename
+        self.clex.reset_lineno()
+        self._scope_stack = [dict(scope)]
+        self._last_yielded_token = None
+
+        return self.cparser.parse(input=text, lexer=self.clex)
+
+    def get_scope(self, key: str, prelude: str,
+                  filename: str) -> dict[str, bool] | None:
+        """Returns the typedef scope of a prelude, parsing it on a cache miss."""
+        if key in self.scopes:
+            self.hits += 1
+            return self.scopes[key]
+
+        self.misses += 1
+        try:
+            self.parse(prelude, filename)
+            self.scopes[key] = dict(self._scope_stack[0])
+
+        except plyparser.ParseError:
+            self.scopes[key] = None
+
+        return self.scopes[key]
+
+    ## ==> Prelude methods <== ################################################
+
+    @staticmethod
+    def split_prelude(text: str) -> tuple[str, str]:
+        """Splits a preprocessed file into its header prelude and its body.
+
+        The main file is the one named by the first line marker. The prelude
+        ends at the last line marker before the first line of real code that
+        belongs to the main file, so the body still starts with a line marker
+        and keeps the original coordinates.
+
+        Args:
+            text: Contents of the `.i` file.
+
+        Returns:
+            A tuple (prelude, body). The prelude is empty when there is
+            nothing to skip.
+        """
+        main_file   : str | None = None
+        current_file: str | None = None
+        body_start  : int        = 0
+        offset      : int        = 0
+
+        for line in text.splitlines(keepends=True):
+            marker = LINE_MARKER.match(line)
+
+            if marker is not None:
+                current_file = marker.group(2)
+                if main_file is None:
+                    main_file = current_file
+                body_start = offset
+
+            elif line.strip() and current_file == main_file:
+                return (text[:body_start], text[body_start:])
+
+            offset += len(line)
+
+        return ("", text)
+
+    @staticmethod
+    def prelude_key(prelude: str) -> str:
+        """Hashes a prelude ignoring the markers that name the main file.
+
+        Two files that include the same headers in the same order share a key
+        even though they live in different paths.
+        """
+        digest   : blake2b    = blake2b(digest_size=16)
+        main_file: str | None = None
+
+        for line in prelude.splitlines(keepends=True):
+            marker = LINE_MARKER.match(line)
+
+            if marker is not None:
+                if main_file is None:
+                    main_file = marker.group(2)
+                if marker.group(2) == main_file:
+                    continue
+
+            digest.update(line.encode())
+
+        return digest.hexdigest()
+
+###############################################################################
+# |> variable: _parser
+#
+# Shared parser instance. Building the PLY tables is expensive, and the cached
+# scopes are only useful if the same instance parses every file.
+###############################################################################
+_parser: PreludeParser | None = None
+
+def get_parser() -> PreludeParser:
+    """Returns the process-wide `PreludeParser`, creating it on first use."""
+    global _parser
+
+    if _parser is None:
+        _parser = PreludeParser()
+
+    return _parser
@@ -0,0 +1,97 @@
+import os
+import subprocess
+from utils.prelude import LINE_MARKER
+
+class PreprocessError(Exception):
+    """Raised when the preprocessor fails on a source file."""
+
+def rename_main_file(text: str, name: str) -> str:
+    """Renames the main file in the line markers of a preprocessed text.
+
+    `ParsedCode` only counts the nodes whose coordinates name its `.c` file,
+    so text preprocessed from stdin (`"<stdin>"`) or under another path must
+    name the file it is analyzed as. The main file is the one named by the
+    first line marker.
+    """
+    lines    : list[str]  = text.splitlines(keepends=True)
+    main_file: str | None = None
+
+    for index, line in enumerate(lines):
+        marker = LINE_MARKER.match(line)
+        if marker is None:
+            continue
+
+        if main_file is None:
+            main_file = marker.group(2)
+
+        if marker.group(2) == main_file:
+            start, end   = marker.span(2)
+            lines[index] = f"{line[:start]}{name}{line[end:]}"
+
+    return "".join(lines)
+
+class Preprocessor:
+    """Runs `gcc -E` on a source file and returns its output as text.
+
+    The output is piped straight into the parser instead of being written as
+    a `.i` file by the `Makefile` and read back, which saves a write and a
+    read per file (most noticeable on network file systems). The flags are
+    the ones of the `Makefile`: the standard headers are replaced by the fake
+    libc headers of pycparser.
+
+    Attributes:
+        fake_headers: Directory of the fake libc headers.
+        cc: Preprocessor command.
+        flags: Extra flags passed after the default ones.
+        write_i: Whether the `.i` file is also written next to the source.
+    """
+
+    def __init__(self, fake_headers: str, cc: str = "gcc", flags: list[str] | None = None,
+                 write_i: bool = False) -> None:
+        self.fake_headers: str       = fake_headers
+        self.cc          : str       = cc
+        self.flags       : list[str] = flags if flags is not None else []
+        self.write_i     : bool      = write_i
+
+    def get_command(self, source: str) -> list[str]:
+        return [self.cc, "-E", "-nostdinc", f"-I{self.fake_headers}", *self.flags, source]
+
+    def run(self, source: str, output: str | None = None, text: str | None = None) -> str:
+        """Preprocesses a source file.
+
+        Args:
+            source: Path of the `.c` file.
+            output: Path of the `.i` file, written only when `write_i` is set.
+            text: Contents of the `.c` file when it is not on disk (e.g. an
+                archive member). It is piped to the preprocessor, so only
+                the fake libc headers can be included, and the line markers
+                are renamed to `source`.
+
+        Returns:
+            The preprocessed text.
+
+        Raises:
+            PreprocessError: If the preprocessor exits with an error.
+        """
+        if text is None:
+            command: list[str] = self.get_command(source)
+        else:
+            command = self.get_command("-")[:-1] + ["-x", "c", "-"]
+
+        process = subprocess.run(command, input=text, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE, text=True)
+
+        if process.returncode != 0:
+            raise PreprocessError(f"{self.cc} -E failed on '{source}': "
+                                  f"{process.stderr.strip()}")
+
+        if text is not None:
+            return rename_main_file(process.stdout, source)
+
+        if self.write_i and output is not None:
+            temporary: str = f"{output}.{os.getpid()}.tmp"
+            with open(temporary, "w") as file:
+                file.write(process.stdout)
+            os.replace(temporary, output)
+
+        return process.stdout
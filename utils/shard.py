@@ -0,0 +1,123 @@
+import os
+import json
+from hashlib import blake2b
+from typing  import Any
+
+class Shard:
+    """One of N deterministic partitions of a corpus.
+
+    A file belongs to shard `index` (1-based) when the hash of its path
+    relative to `base_dir` modulo `count` is `index - 1`. The hash only
+    depends on the relative path, so every machine agrees on the partition
+    regardless of where the corpus is mounted.
+
+    Attributes:
+        index: Shard number, from 1 to `count`.
+        count: Total number of shards.
+        base_dir: Root of the corpus; paths are hashed relative to it.
+    """
+
+    MANIFEST: str = "shard.json"
+
+    def __init__(self, index: int, count: int, base_dir: str) -> None:
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"Invalid shard {index}/{count}")
+
+        self.index   : int = index
+        self.count   : int = count
+        self.base_dir: str = base_dir
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    @classmethod
+    def parse(cls, spec: str, base_dir: str) -> "Shard":
+        """Creates a shard from an `i/N` specification (e.g. "2/8").
+
+        Raises:
+            ValueError: If the specification is malformed or out of range.
+        """
+        try:
+            index, count = (int(part) for part in spec.split("/"))
+        except ValueError:
+            raise ValueError(f"Invalid shard '{spec}', expected i/N (e.g. 1/4)")
+
+        return cls(index, count, base_dir)
+
+    @staticmethod
+    def bucket(relative_path: str, count: int) -> int:
+        """Returns the 0-based shard of a relative path."""
+        key   : bytes = relative_path.replace(os.sep, "/").encode()
+        digest: bytes = blake2b(key, digest_size=8).digest()
+
+        return int.from_bytes(digest, "big") % count
+
+    def contains(self, path: str) -> bool:
+        """Checks if a file belongs to this shard."""
+        relative_path: str = os.path.relpath(path, self.base_dir)
+
+        return self.bucket(relative_path, self.count) == self.index - 1
+
+    #==> Manifest <==##########################################################
+
+    def write_manifest(self, output_dir: str, plugins: list[str] | None = None,
+                       line_profiles: bool = False) -> None:
+        """Records which shard produced an output tree.
+
+        Args:
+            output_dir: Output directory of the shard.
+            plugins: Specs of the `MetricPlugin` classes of the run (see
+                `objects.plugins.load_plugin`), whose columns the merge
+                must read back.
+            line_profiles: Whether every directory has a
+                `<name>_line_profiles.npz` (see
+                `objects.line_profile.export_line_profiles`).
+        """
+        os.makedirs(output_dir, exist_ok=True)
+
+        manifest: dict[str, Any] = {
+            "index"        : self.index,
+            "count"        : self.count,
+            "name"         : os.path.basename(os.path.normpath(self.base_dir)),
+            "plugins"      : plugins or [],
+            "line_profiles": line_profiles,
+        }
+
+        with open(os.path.join(output_dir, self.MANIFEST), "w") as file:
+            json.dump(manifest, file)
+
+    @classmethod
+    def read_manifests(cls, output_dirs: list[str]) -> list[dict[str, Any]]:
+        """Reads and validates the manifests of the outputs of a sharded run.
+
+        Raises:
+            ValueError: If a manifest is missing, if the shards come from runs
+                with different counts or plugins, or if a shard is missing or
+                repeated.
+        """
+        manifests: list[dict[str, Any]] = []
+
+        for output_dir in output_dirs:
+            path: str = os.path.join(output_dir, cls.MANIFEST)
+            if not os.path.isfile(path):
+                raise ValueError(f"'{output_dir}' has no {cls.MANIFEST}, "
+                                 "it is not the output of a sharded run")
+
+            with open(path) as file:
+                manifests.append(json.load(file))
+
+        counts : set[int]  = {manifest["count"] for manifest in manifests}
+        indexes: list[int] = sorted(manifest["index"] for manifest in manifests)
+
+        if len(counts) != 1:
+            raise ValueError(f"Shards come from runs with different counts: {sorted(counts)}")
+
+        plugins: set[tuple[str, ...]] = {tuple(manifest.get("plugins", []))
+                                         for manifest in manifests}
+        if len(plugins) != 1:
+            raise ValueError(f"Shards come from runs with different plugins: {sorted(plugins)}")
+
+        if indexes != list(range(1, counts.pop() + 1)):
+            raise ValueError(f"Shards {indexes} do not cover the whole corpus exactly once")
+
+        return manifests
@@ -0,0 +1,364 @@
+import csv
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from typing       import Any, Callable
+from rich.console import Console
+from rich.table   import Table
+from rich.style   import Style
+from rich         import box
+
+#==> Generators <==############################################################
+#
+# Every generator returns a translation unit without `#include`, so it can be
+# parsed without preprocessing. The size of the text grows linearly with `n`.
+###############################################################################
+
+def generate_functions(n: int) -> str:
+    """`n` small functions, each calling the previous one."""
+    functions: list[str] = []
+
+    for index in range(n):
+        call: str = f"    total += f{index - 1}(x - 1);\n" if index else ""
+        functions.append(f"int f{index}(int x) {{\n"
+                         f"    int total = x * {index};\n"
+                         f"{call}"
+                         f"    if (total > {index}) total -= 1;\n"
+                         f"    return total;\n"
+                         f"}}\n")
+
+    return "\n".join(functions)
+
+def generate_nesting(n: int) -> str:
+    """One function with `n` nested `if`, `for` and `while` blocks.
+
+    Lines are not indented by depth, which would make the text quadratic.
+    """
+    lines: list[str] = ["int main() {", "int s = 0;"]
+
+    for depth in range(n):
+        lines += [(f"if (s < {depth}) {{",
+                   f"for (int i{depth} = 0; i{depth} < 2; i{depth}++) {{",
+                   f"while (s > {depth}) {{")[depth % 3],
+                  "s++;"]
+
+    lines += ["}"] * n
+    lines += ["return s;", "}"]
+
+    return "\n".join(lines) + "\n"
+
+def generate_expression(n: int) -> str:
+    """One statement with an expression of `n` operands."""
+    operators: str = "+-*/"
+    terms    : str = " ".join(f"a{index % 16} {operators[index % 4]}" for index in range(n))
+
+    return ("".join(f"int a{index} = {index + 1};\n" for index in range(16)) +
+            f"int main() {{\n    int x = {terms} 1;\n    return x;\n}}\n")
+
+def generate_file(n: int, prefix: str = "g") -> str:
+    """About `n` lines of functions with loops, branches, arrays and calls,
+    named `<prefix>0`, `<prefix>1`, ..."""
+    functions: list[str] = ["int table[64];"]
+
+    for index in range((n + 13) // 14):
+        call: str = f" + {prefix}{index - 1}(v, n - 1)" if index else ""
+        functions.append(f"int {prefix}{index}(int *v, int n) {{\n"
+                         f"    int acc = 0;\n"
+                         f"    for (int k = 0; k < n; k++) {{\n"
+                         f"        if (v[k] % 2 == 0) acc += v[k] * {index};\n"
+                         f"        else acc -= table[k % 64];\n"
+                         f"    }}\n"
+                         f"    while (acc > 1000) acc /= 2;\n"
+                         f"    switch (acc % 3) {{\n"
+                         f"        case 0: acc++; break;\n"
+                         f"        case 1: acc--; break;\n"
+                         f"        default: break;\n"
+                         f"    }}\n"
+                         f"    return acc{call};\n"
+                         f"}}")
+
+    return "\n".join(functions) + "\n"
+
+###############################################################################
+# |> constant: SHAPES
+#
+# Shapes of the `ParsedCode` cases, by name.
+#
+# Items: Tuple (generator, default sizes). Nesting and expression sizes stay
+# below the depth where the recursive visit exceeds the recursion limit
+# (about 200 nested blocks, or 1000 operands in a `BinaryOp` chain).
+###############################################################################
+SHAPES: dict[str, tuple[Callable[[int], str], list[int]]] = {
+    "functions" : (generate_functions,  [64, 128, 256, 512, 1024]),
+    "nesting"   : (generate_nesting,    [8, 16, 32, 64, 128]),
+    "expression": (generate_expression, [32, 64, 128, 256, 512]),
+    "file"      : (generate_file,       [500, 1000, 2000, 4000, 8000]),
+}
+
+# Files of the `Compsta` case, each a `generate_file(FILE_LINES)`.
+DIRECTORY_SIZES: list[int] = [8, 16, 32, 64, 128]
+FILE_LINES     : int       = 100
+
+# Largest sizes the exponents are fitted on. The fixed cost per input hides
+# a superlinear term at the small sizes, so fitting them too would lower it.
+FIT_POINTS: int = 3
+
+def fit_exponent(sizes: list[int], values: list[float]) -> float:
+    """Returns `k` of the least-squares fit of `values ~ c * sizes ** k`."""
+    values_array: np.ndarray = np.maximum(np.asarray(values, dtype=np.float64), 1e-9)
+
+    return float(np.polyfit(np.log(sizes), np.log(values_array), 1)[0])
+
+class StressResult:
+    """Measures of one case of the suite at every size.
+
+    Attributes:
+        target: "ParsedCode" or "Compsta".
+        shape: Name of the generated input.
+        sizes: Sizes measured, until the first error.
+        seconds: Best analysis time of every size, without the baseline.
+        peak_bytes: Peak traced memory of every size, without the baseline.
+        time_exponent, memory_exponent: Fitted growth exponents.
+        error: Error raised by the first failing size, if any.
+    """
+
+    def __init__(self, target: str, shape: str) -> None:
+        self.target: str = target
+        self.shape : str = shape
+
+        self.sizes     : list[int]   = []
+        self.seconds   : list[float] = []
+        self.peak_bytes: list[float] = []
+
+        self.time_exponent  : float      = 0
+        self.memory_exponent: float      = 0
+        self.error          : str | None = None
+
+class StressSuite:
+    """Asymptotic regression checks of the analyzer.
+
+    Translation units are generated at geometric sizes for every shape of
+    `SHAPES` (many functions, deep nesting, long expressions, large files),
+    and directories of a growing number of files are generated for
+    `Compsta`. Each one is analyzed `repeat` times: the best time and the
+    peak memory (under tracemalloc, in a separate run) are measured, the cost
+    of a minimal input is subtracted, and a power law is fitted to the
+    growth over the `FIT_POINTS` largest sizes.
+
+    A case fails when a fitted exponent is above its threshold (e.g. 1.3 for
+    a linear analysis: noise stays well below it, a quadratic step does not)
+    or when a size raises an error (e.g. `RecursionError`).
+
+    Attributes:
+        shapes: Names of the `ParsedCode` shapes to run.
+        repeat: Runs per size; the fastest one is kept.
+        time_threshold, memory_threshold: Maximum exponents.
+        directory_sizes: File counts of the `Compsta` case, or None to skip it.
+        results: One `StressResult` per case, after `run`.
+    """
+
+    def __init__(self, shapes: list[str] | None = None, repeat: int = 3,
+                 time_threshold: float = 1.3, memory_threshold: float = 1.2,
+                 directory_sizes: list[int] | None = DIRECTORY_SIZES) -> None:
+        self.shapes          : list[str]        = shapes if shapes is not None else list(SHAPES)
+        self.repeat          : int              = repeat
+        self.time_threshold  : float            = time_threshold
+        self.memory_threshold: float            = memory_threshold
+        self.directory_sizes : list[int] | None = directory_sizes
+
+        self.results: list[StressResult] = []
+
+        for shape in self.shapes:
+            if shape not in SHAPES:
+                raise ValueError(f"Unknown shape '{shape}' (shapes: {', '.join(SHAPES)})")
+
+    def measure(self, build: Callable[[], Any]) -> tuple[float, int]:
+        """Returns the best time of `repeat` calls of `build`, and the peak
+        memory traced during one more call.
+
+        Like `timeit`, the cyclic garbage collector is disabled while timing:
+        its full collections land on a few sizes only and would bend the fit.
+        """
+        seconds: float = float("inf")
+
+        for _ in range(self.repeat):
+            gc.collect()
+            gc.disable()
+            try:
+                start: float = time.perf_counter()
+                build()
+                seconds = min(seconds, time.perf_counter() - start)
+            finally:
+                gc.enable()
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            build()
+            peak: int = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return seconds, peak
+
+    def run_case(self, result: StressResult, sizes: list[int],
+                 build: Callable[[int], Callable[[], Any]], baseline: Callable[[], Any]) -> None:
+        """Measures a case at every size, then fits its exponents."""
+        base_seconds, base_peak = self.measure(baseline)
+
+        for size in sizes:
+            try:
+                seconds, peak = self.measure(build(size))
+            except (RecursionError, MemoryError, ValueError) as e:
+                result.error = f"{type(e).__name__} at size {size}" + (f" ({e})" if str(e) else "")
+                break
+
+            result.sizes.append(size)
+            result.seconds.append(max(seconds - base_seconds, 0))
+            result.peak_bytes.append(max(peak - base_peak, 0))
+
+        if len(result.sizes) >= 2:
+            result.time_exponent   = fit_exponent(result.sizes[-FIT_POINTS:],
+                                                  result.seconds[-FIT_POINTS:])
+            result.memory_exponent = fit_exponent(result.sizes[-FIT_POINTS:],
+                                                  result.peak_bytes[-FIT_POINTS:])
+
+        self.results.append(result)
+
+    def run(self, console: Console | None = None) -> None:
+        """Runs every case of the suite."""
+        from Comvis  import ParsedCode  # The analyzer modules import utils
+        from Compsta import Compsta
+
+        console = console or Console()
+
+        # A failed analysis is not a fast one: `ParsedCode` reports parse
+        # errors in `has_errors` and `Compsta` skips such files, so the
+        # results are checked and a failure ends the case.
+        def parse(source: str) -> Callable[[], Any]:
+            def build() -> ParsedCode:
+                parsed_code = ParsedCode("stress", "stress/", source=source,
+                                         pre_compiled=f'# 1 "stress.c"\n{source}')
+                if parsed_code.has_errors:
+                    raise ValueError("the generated file could not be parsed")
+                return parsed_code
+
+            return build
+
+        for shape in self.shapes:
+            console.print(f"Stress: [bold cyan]ParsedCode / {shape}[/]", style="bold")
+            generator, sizes = SHAPES[shape]
+            self.run_case(StressResult("ParsedCode", shape), sizes,
+                          lambda size: parse(generator(size)),
+                          parse("int main() { return 0; }\n"))
+
+        if self.directory_sizes is None:
+            return
+
+        console.print("Stress: [bold cyan]Compsta / directory[/]", style="bold")
+        with tempfile.TemporaryDirectory() as directory:
+            empty: str = os.path.join(directory, "empty", "")
+            os.makedirs(empty)
+
+            def analyze(size: int) -> Callable[[], Any]:
+                path: str = os.path.join(directory, str(size), "")
+                os.makedirs(path, exist_ok=True)
+
+                for index in range(size):
+                    source: str = generate_file(FILE_LINES, prefix=f"file{index}_g")
+                    with open(f"{path}file{index}.c", "w") as file:
+                        file.write(source)
+                    with open(f"{path}file{index}.i", "w") as file:
+                        file.write(f'# 1 "{path}file{index}.c"\n{source}')
+
+                def build() -> Compsta:
+                    compsta = Compsta(path)
+                    if len(compsta.parsed_files) != size:
+                        raise ValueError(f"{len(compsta.parsed_files)} of {size} files analyzed")
+                    return compsta
+
+                return build
+
+            self.run_case(StressResult("Compsta", "directory"), self.directory_sizes,
+                          analyze, lambda: Compsta(empty))
+
+    #==> Report <==############################################################
+
+    def get_status(self, result: StressResult) -> str:
+        if result.error is not None:
+            return "error"
+        if len(result.sizes) < 2:
+            return "skipped"
+        if (result.time_exponent > self.time_threshold
+                or result.memory_exponent > self.memory_threshold):
+            return "failed"
+
+        return "passed"
+
+    @property
+    def passed(self) -> bool:
+        return all(self.get_status(result) == "passed" for result in self.results)
+
+    def print_report(self) -> None:
+        """Prints the fitted exponents of every case."""
+        border_style: Style = Style(color="#000000", bold=True)
+        styles      : dict[str, str] = {"passed": "bold green", "failed": "bold red",
+                                        "error": "bold red", "skipped": "bold yellow"}
+
+        table = Table(title=f"[bold][#00ffae]Growth exponents (thresholds: time "
+                            f"{self.time_threshold}, memory {self.memory_threshold})[/]",
+                      box=box.ROUNDED,
+                      show_header=True,
+                      header_style="bold #ffee00",
+                      border_style=border_style,
+                      )
+
+        table.add_column("Target", style="cyan")
+        table.add_column("Shape", style="cyan")
+        table.add_column("Sizes", style="#1cffa0")
+        table.add_column("Largest (s)", style="#1cffa0", justify="right")
+        table.add_column("Largest (MB)", style="#1cffa0", justify="right")
+        table.add_column("Time exp.", style="#1cffa0", justify="right")
+        table.add_column("Memory exp.", style="#1cffa0", justify="right")
+        table.add_column("Status")
+
+        for result in self.results:
+            status: str = self.get_status(result)
+            sizes : str = (f"{result.sizes[0]}..{result.sizes[-1]}" if result.sizes else "-")
+
+            table.add_row(result.target, result.shape, sizes,
+                          f"{result.seconds[-1]:.3f}" if result.sizes else "-",
+                          f"{result.peak_bytes[-1] / 2**20:.1f}" if result.sizes else "-",
+                          f"{result.time_exponent:.2f}",
+                          f"{result.memory_exponent:.2f}",
+                          f"[{styles[status]}]{result.error or status}[/]")
+
+        Console().print(table)
+
+    def export_csv(self, dir: str, filename: str) -> None:
+        """Exports the measures of every size to a CSV file.
+
+        Args:
+            dir: Output directory path.
+            filename: Output filename without extension.
+        """
+        file_name: str = f"{dir}{filename}"
+
+        os.makedirs(dir, exist_ok=True)
+
+        with open(f"{file_name}.csv", mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["Target", "Shape", "Size", "Seconds", "Peak Bytes",
+                             "Time Exponent", "Memory Exponent", "Status"])
+
+            for result in self.results:
+                for size, seconds, peak in zip(result.sizes, result.seconds, result.peak_bytes):
+                    writer.writerow([result.target, result.shape, size, round(seconds, 6), peak,
+                                     round(result.time_exponent, 3),
+                                     round(result.memory_exponent, 3),
+                                     self.get_status(result)])
+
+        Console().print(f"Create CSV: {file_name}", style="bold green")
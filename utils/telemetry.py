@@ -0,0 +1,256 @@
+import os
+import time
+import threading
+from typing       import Any
+from rich.console import Console
+
+class Telemetry:
+    """Live throughput counters of a batch run.
+
+    `Compsta` reports every analyzed file with `file_done`. Every `interval`
+    seconds a progress line (files/sec, ETA, worker utilization, prelude
+    cache hit rate, errors) is printed, and the same counters are written to
+    `textfile` in the Prometheus text exposition format, e.g. for the
+    textfile collector of node_exporter. The file is replaced atomically, so
+    a scraper never reads it half written.
+
+    Used as a context manager, a timer thread reports even when no file
+    completes (e.g. a worker stuck on a huge file), so a stalled run shows
+    a falling rate instead of going silent.
+
+    Attributes:
+        textfile: Path of the metrics textfile, or None.
+        interval: Minimum seconds between two reports.
+        show: Whether the progress line is printed.
+        runner: Optional `BatchRunner`, source of the utilization, restarts
+            and quarantine counters.
+        started: Monotonic time of the start of the run.
+        files_total: Number of files expected (for the ETA).
+        files_done: Number of files analyzed, with or without errors.
+        files_failed: Files that raised an error or could not be parsed.
+        cache_hits, cache_misses: Prelude cache lookups (see `utils.prelude`).
+        ast_hits, ast_misses: AST cache lookups (see `utils.ast_cache`).
+        functions: Functions of the analyzed files.
+        functions_reused: Functions restored from the function cache (see
+            `objects.function_cache`).
+        busy_seconds: Analysis time of the files analyzed in this process.
+        lock: Guards the counters and the reports, which the timer thread
+            reads.
+        timer: Thread reporting every `interval` seconds, while the context
+            is open.
+    """
+
+    PREFIX: str = "complexity_analyzer"
+
+    def __init__(self, textfile: str | None = None, interval: float = 10.0,
+                 show: bool = True) -> None:
+        self.textfile: str | None = textfile
+        self.interval: float      = interval
+        self.show    : bool       = show
+        self.runner  : Any        = None
+
+        self.started    : float = time.monotonic()
+        self.last_report: float = self.started
+
+        self.files_total : int   = 0
+        self.files_done  : int   = 0
+        self.files_failed: int   = 0
+        self.cache_hits  : int   = 0
+        self.cache_misses: int   = 0
+        self.busy_seconds: float = 0
+
+        self.ast_hits  : int = 0
+        self.ast_misses: int = 0
+
+        self.functions       : int = 0
+        self.functions_reused: int = 0
+
+        self.lock   : threading.Lock          = threading.Lock()
+        self.stopped: threading.Event         = threading.Event()
+        self.timer  : threading.Thread | None = None
+
+    def __enter__(self) -> "Telemetry":
+        self.timer = threading.Thread(target=self.run_timer, daemon=True)
+        self.timer.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    #==> Counters <==##########################################################
+
+    def expect(self, files: int) -> None:
+        """Adds files to the number of files expected in the run."""
+        with self.lock:
+            self.files_total += files
+
+    def attach(self, runner: Any) -> None:
+        """Reads worker utilization and quarantine from a `BatchRunner`."""
+        self.runner = runner
+
+    def file_done(self, parsed_code: Any, error: str | None, seconds: float = 0) -> None:
+        """Counts an analyzed file and reports if the interval elapsed.
+
+        Args:
+            parsed_code: The `ParsedCode`, or None when the analysis failed.
+            error: Error of a failed analysis.
+            seconds: Analysis time, when the file was analyzed in this process.
+        """
+        with self.lock:
+            self.files_done   += 1
+            self.busy_seconds += seconds
+
+            if error is not None or parsed_code is None or parsed_code.has_errors:
+                self.files_failed += 1
+
+            if parsed_code is not None:
+                self.functions        += parsed_code.number_of_functions
+                self.functions_reused += parsed_code.function_cache_hits
+
+                if parsed_code.ast_cache_hit is not None:
+                    self.ast_hits   += parsed_code.ast_cache_hit
+                    self.ast_misses += not parsed_code.ast_cache_hit
+
+            if parsed_code is not None and parsed_code.prelude_cache_hit is not None:
+                if parsed_code.prelude_cache_hit:
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+
+        self.report()  # Takes the lock itself
+
+    #==> Derived values <==####################################################
+
+    def get_elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def get_rate(self) -> float:
+        """Files per second since the start of the run."""
+        elapsed: float = self.get_elapsed()
+
+        return self.files_done / elapsed if elapsed > 0 else 0.0
+
+    def get_eta(self) -> float | None:
+        """Seconds left at the current rate, or None when unknown."""
+        rate: float = self.get_rate()
+        if rate == 0 or self.files_total == 0:
+            return None
+
+        return max(self.files_total - self.files_done, 0) / rate
+
+    def get_utilization(self) -> float:
+        """Fraction of the worker time spent analyzing files."""
+        if self.runner is not None:
+            busy   : float = self.runner.busy_seconds
+            workers: int   = sum(len(lane.workers) for lane in self.runner.lanes)
+        else:
+            busy, workers = self.busy_seconds, 1
+
+        elapsed: float = self.get_elapsed()
+
+        return min(busy / (workers * elapsed), 1.0) if elapsed > 0 else 0.0
+
+    def get_hit_rate(self) -> float:
+        lookups: int = self.cache_hits + self.cache_misses
+
+        return self.cache_hits / lookups if lookups else 0.0
+
+    #==> Report <==############################################################
+
+    def report(self, force: bool = False) -> None:
+        """Prints the progress line and writes the textfile, if `interval`
+        seconds passed since the last report."""
+        with self.lock:
+            now: float = time.monotonic()
+            if not force and now - self.last_report < self.interval:
+                return
+
+            self.last_report = now
+
+            if self.show:
+                self.print_progress()
+            if self.textfile is not None:
+                self.write_textfile()
+
+    def run_timer(self) -> None:
+        """Reports every `interval` seconds until `close`."""
+        while not self.stopped.wait(self.interval):
+            self.report()
+
+    def print_progress(self) -> None:
+        eta    : float | None = self.get_eta()
+        total  : str          = f"/{self.files_total}" if self.files_total else ""
+        eta_str: str          = "?"
+
+        if eta is not None:
+            eta_str = time.strftime("%H:%M:%S", time.gmtime(eta))
+
+        reused: str = ""
+        if self.ast_hits + self.ast_misses:
+            reused += f"ast {self.ast_hits / (self.ast_hits + self.ast_misses):.0%} | "
+        if self.functions_reused:
+            reused += f"reused {self.functions_reused / self.functions:.0%} | "
+
+        Console().print(f"[{self.files_done}{total} files] "
+                        f"{self.get_rate():.1f} files/s | ETA {eta_str} | "
+                        f"workers {self.get_utilization():.0%} | "
+                        f"cache {self.get_hit_rate():.0%} | {reused}"
+                        f"errors {self.files_failed}",
+                        style="bold magenta", highlight=False, soft_wrap=True)
+
+    def get_metrics(self) -> list[tuple[str, str, str, float]]:
+        """Returns the exported metrics as (name, type, help, value)."""
+        metrics: list[tuple[str, str, str, float]] = [
+            ("files_total", "gauge", "Files expected in the run", self.files_total),
+            ("files_done_total", "counter", "Files analyzed", self.files_done),
+            ("files_failed_total", "counter", "Files with errors", self.files_failed),
+            ("files_per_second", "gauge", "Files analyzed per second", self.get_rate()),
+            ("eta_seconds", "gauge", "Estimated seconds left", self.get_eta() or 0),
+            ("worker_utilization", "gauge", "Fraction of worker time spent analyzing",
+             self.get_utilization()),
+            ("prelude_cache_hits_total", "counter", "Prelude cache hits", self.cache_hits),
+            ("prelude_cache_misses_total", "counter", "Prelude cache misses", self.cache_misses),
+            ("ast_cache_hits_total", "counter", "ASTs loaded from the AST cache", self.ast_hits),
+            ("ast_cache_misses_total", "counter", "ASTs parsed and stored in the AST cache",
+             self.ast_misses),
+            ("functions_total", "counter", "Functions analyzed", self.functions),
+            ("functions_reused_total", "counter", "Functions reused from the function cache",
+             self.functions_reused),
+            ("elapsed_seconds", "gauge", "Seconds since the start of the run",
+             self.get_elapsed()),
+        ]
+
+        if self.runner is not None:
+            metrics += [
+                ("worker_restarts_total", "counter", "Worker restarts", self.runner.restarts),
+                ("files_quarantined_total", "counter", "Quarantined files",
+                 len(self.runner.quarantine)),
+            ]
+
+        return metrics
+
+    def write_textfile(self) -> None:
+        """Writes the counters in the Prometheus text format, atomically."""
+        lines: list[str] = []
+        for name, kind, description, value in self.get_metrics():
+            lines.append(f"# HELP {self.PREFIX}_{name} {description}")
+            lines.append(f"# TYPE {self.PREFIX}_{name} {kind}")
+            lines.append(f"{self.PREFIX}_{name} {value}")
+
+        if os.path.dirname(self.textfile):
+            os.makedirs(os.path.dirname(self.textfile), exist_ok=True)
+
+        temporary: str = f"{self.textfile}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            file.write("\n".join(lines) + "\n")
+
+        os.replace(temporary, self.textfile)
+
+    def close(self) -> None:
+        """Stops the timer and writes the final report."""
+        self.stopped.set()
+        if self.timer is not None:
+            self.timer.join()
+            self.timer = None
+
+        self.report(force=True)